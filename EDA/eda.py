@@ -13,14 +13,19 @@ TÉCNICAS DE EDA APLICADAS:
 """
 
 # Importação de bibliotecas
+import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy import stats
 import warnings
 warnings.filterwarnings('ignore')
 
+# Cálculos compartilhados com metricas_eda (JSON/relatório), na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metricas import preparar_censo, corrigir_censo, estatisticas_censo, inconsistencias_censo
+
 # Configurações de visualização
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
@@ -67,16 +72,14 @@ print(df.dtypes)
 print("\n--- 2.5. Nomes das Colunas ---")
 print(df.columns.tolist())
 
-# Renomear colunas para facilitar análise
-df.columns = ['Ano', 'Municipio', 'Domicilios', 'Moradores', 'Media_Moradores']
+# Renomear colunas e converter Media_Moradores de string (formato brasileiro com vírgula) para float
+df = preparar_censo(df)
 
 print("\n✓ Colunas renomeadas para facilitar análise:")
 print(df.columns.tolist())
 
-# Converter Media_Moradores de string (formato brasileiro com vírgula) para float
 print("\n--- 2.6. Conversão de Tipos de Dados ---")
 print("Convertendo 'Media_Moradores' de string para numérico...")
-df['Media_Moradores'] = df['Media_Moradores'].str.replace(',', '.').astype(float, errors='ignore')
 print("✓ Conversão concluída!")
 
 # ============================================================================
@@ -105,11 +108,9 @@ print(registros_nulos[['Municipio', 'Domicilios', 'Moradores', 'Media_Moradores'
 
 # CORREÇÃO: Calcular média manualmente onde está ausente
 print("\n--- 3.4. CORREÇÃO: Calculando Média de Moradores Manualmente ---")
-df['Media_Moradores_Calculada'] = df['Moradores'] / df['Domicilios']
-# Preencher valores NaN com a média calculada
-df['Media_Moradores'] = df['Media_Moradores'].fillna(df['Media_Moradores_Calculada'])
-# Garantir que todos os valores são numéricos
-df['Media_Moradores'] = pd.to_numeric(df['Media_Moradores'], errors='coerce')
+# Preencher valores NaN com a média calculada (Moradores / Domicilios)
+df = corrigir_censo(df)
+estatisticas = estatisticas_censo(df)
 print(f"✓ Médias calculadas e preenchidas!")
 
 # Verificar se ainda há nulos
@@ -127,17 +128,17 @@ print("\n--- 4.1. Estatísticas Descritivas das Variáveis Numéricas ---")
 print(df.describe())
 
 print("\n--- 4.2. Estatísticas Adicionais ---")
-print(f"\nMediana de Domicílios: {df['Domicilios'].median():,.2f}")
-print(f"Mediana de Moradores: {df['Moradores'].median():,.2f}")
-print(f"Mediana da Média de Moradores: {df['Media_Moradores'].median():.2f}")
+print(f"\nMediana de Domicílios: {estatisticas['Domicilios']['mediana']:,.2f}")
+print(f"Mediana de Moradores: {estatisticas['Moradores']['mediana']:,.2f}")
+print(f"Mediana da Média de Moradores: {estatisticas['Media_Moradores']['mediana']:.2f}")
 
-print(f"\nDesvio Padrão de Domicílios: {df['Domicilios'].std():,.2f}")
-print(f"Desvio Padrão de Moradores: {df['Moradores'].std():,.2f}")
-print(f"Desvio Padrão da Média de Moradores: {df['Media_Moradores'].std():.2f}")
+print(f"\nDesvio Padrão de Domicílios: {estatisticas['Domicilios']['desvio_padrao']:,.2f}")
+print(f"Desvio Padrão de Moradores: {estatisticas['Moradores']['desvio_padrao']:,.2f}")
+print(f"Desvio Padrão da Média de Moradores: {estatisticas['Media_Moradores']['desvio_padrao']:.2f}")
 
-print(f"\nCoeficiente de Variação (CV) - Domicílios: {(df['Domicilios'].std() / df['Domicilios'].mean()) * 100:.2f}%")
-print(f"Coeficiente de Variação (CV) - Moradores: {(df['Moradores'].std() / df['Moradores'].mean()) * 100:.2f}%")
-print(f"Coeficiente de Variação (CV) - Média Moradores: {(df['Media_Moradores'].std() / df['Media_Moradores'].mean()) * 100:.2f}%")
+print(f"\nCoeficiente de Variação (CV) - Domicílios: {estatisticas['Domicilios']['cv_percentual']:.2f}%")
+print(f"Coeficiente de Variação (CV) - Moradores: {estatisticas['Moradores']['cv_percentual']:.2f}%")
+print(f"Coeficiente de Variação (CV) - Média Moradores: {estatisticas['Media_Moradores']['cv_percentual']:.2f}%")
 
 # ============================================================================
 # 5. ANÁLISE DE DISTRIBUIÇÃO
@@ -222,27 +223,20 @@ plt.show()
 print("\n--- 6.2. Detecção de Outliers pelo Método IQR ---")
 
 def detectar_outliers_iqr(coluna, nome):
-    Q1 = coluna.quantile(0.25)
-    Q3 = coluna.quantile(0.75)
-    IQR = Q3 - Q1
-    limite_inferior = Q1 - 1.5 * IQR
-    limite_superior = Q3 + 1.5 * IQR
-    
-    outliers = coluna[(coluna < limite_inferior) | (coluna > limite_superior)]
+    limites = estatisticas[coluna]
+    total = limites['outliers_iqr']
     
     print(f"\n{nome}:")
-    print(f"  Q1 (25%): {Q1:,.2f}")
-    print(f"  Q3 (75%): {Q3:,.2f}")
-    print(f"  IQR: {IQR:,.2f}")
-    print(f"  Limite Inferior: {limite_inferior:,.2f}")
-    print(f"  Limite Superior: {limite_superior:,.2f}")
-    print(f"  Total de Outliers: {len(outliers)} ({len(outliers)/len(coluna)*100:.2f}%)")
-    
-    return outliers
+    print(f"  Q1 (25%): {limites['q1']:,.2f}")
+    print(f"  Q3 (75%): {limites['q3']:,.2f}")
+    print(f"  IQR: {limites['iqr']:,.2f}")
+    print(f"  Limite Inferior: {limites['limite_inferior']:,.2f}")
+    print(f"  Limite Superior: {limites['limite_superior']:,.2f}")
+    print(f"  Total de Outliers: {total} ({total/len(df)*100:.2f}%)")
 
-outliers_domicilios = detectar_outliers_iqr(df['Domicilios'], 'Domicílios')
-outliers_moradores = detectar_outliers_iqr(df['Moradores'], 'Moradores')
-outliers_media = detectar_outliers_iqr(df['Media_Moradores'], 'Média de Moradores')
+detectar_outliers_iqr('Domicilios', 'Domicílios')
+detectar_outliers_iqr('Moradores', 'Moradores')
+detectar_outliers_iqr('Media_Moradores', 'Média de Moradores')
 
 print("\n--- 6.3. Municípios com Maior Número de Domicílios (Top 10) ---")
 top_10_domicilios = df.nlargest(10, 'Domicilios')[['Municipio', 'Domicilios', 'Moradores', 'Media_Moradores']]
@@ -309,8 +303,7 @@ print("8. ANÁLISE DE CONSISTÊNCIA DOS DADOS")
 print("="*80)
 
 print("\n--- 8.1. Verificando Coerência: Média Calculada vs Média Fornecida ---")
-df['Diferenca_Media'] = abs(df['Media_Moradores'] - df['Media_Moradores_Calculada'])
-inconsistencias = df[df['Diferenca_Media'] > 0.01]
+inconsistencias = inconsistencias_censo(df)
 
 print(f"\nTotal de inconsistências (diferença > 0.01): {len(inconsistencias)}")
 
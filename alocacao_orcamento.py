@@ -0,0 +1,239 @@
+"""
+================================================================================
+ALOCAÇÃO ÓTIMA DO ORÇAMENTO DE CAMPANHAS (PROGRAMAÇÃO LINEAR / INTEIRA MISTA)
+================================================================================
+
+Transforma a resposta histórica de cada segmento (campanha × canal × região,
+opcionalmente × categoria) num programa linear e o resolve com o HiGHS do
+SciPy, em processo:
+
+1. Resposta por segmento: lucro incremental médio de uma venda com campanha
+   sobre a média sem campanha na mesma célula (canal × região × ...),
+   encolhido em direção à média da campanha quando há poucas vendas.
+2. Investimento histórico estimado: `taxa_investimento` × faturamento das
+   vendas com campanha do segmento (a base não registra o gasto real).
+3. Retorno por R$ = lucro incremental / investimento histórico, com retornos
+   decrescentes: a capacidade do segmento (`fator_capacidade` × investimento
+   histórico) é dividida em `n_faixas` faixas, cada uma rendendo
+   `decaimento` vezes a anterior. O objetivo é o lucro líquido do gasto.
+
+Restrições: orçamento total, teto de cada faixa e limites opcionais por
+valor de dimensão (ex.: {('canal_venda', 'App'): 20000}). No modo inteiro
+cada segmento ativado paga um custo fixo, tem investimento mínimo e o número
+de segmentos ativos pode ser limitado; os preços-sombra saem do LP com as
+ativações fixadas na solução inteira.
+================================================================================
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+from consulta_lazy import derivar_coluna
+
+DIMENSOES_ALOCACAO = ('campanha', 'canal_venda', 'regiao')
+CAMPANHA_BASE = 'Nenhuma'
+
+
+class ErroOtimizacao(RuntimeError):
+    """O solver não encontrou solução ótima (inviável, ilimitado ou limite de tempo)."""
+
+
+class ErroDimensoes(ValueError):
+    """Dimensões de segmento inválidas (sem campanha ou coluna inexistente)."""
+
+
+# ============================================================================
+# 1. RESPOSTA HISTÓRICA POR SEGMENTO
+# ============================================================================
+
+def resposta_segmentos(df, dimensoes=DIMENSOES_ALOCACAO, taxa_investimento=0.05, tau=10.0):
+    """Tabela por segmento com vendas, lucro incremental e retorno por R$ investido."""
+    dimensoes = list(dimensoes)
+    if 'campanha' not in dimensoes:
+        raise ErroDimensoes(f"As dimensões do segmento precisam incluir 'campanha': {dimensoes}")
+    desconhecidas = [d for d in dimensoes if d not in df.columns]
+    if desconhecidas:
+        raise ErroDimensoes(f"Dimensões desconhecidas: {', '.join(desconhecidas)}")
+    celula = [d for d in dimensoes if d != 'campanha']
+    lucro = pd.Series(derivar_coluna(df, 'lucro'), index=df.index)
+    sem_campanha = df['campanha'] == CAMPANHA_BASE
+
+    # Lucro médio sem campanha em cada célula; células sem base (ou segmento só por
+    # campanha, sem célula) usam a média geral
+    referencia = np.full(len(df), lucro[sem_campanha].mean())
+    if celula:
+        base = lucro[sem_campanha].groupby([df.loc[sem_campanha, d] for d in celula]).mean()
+        chaves = pd.MultiIndex.from_frame(df[celula]) if len(celula) > 1 else pd.Index(df[celula[0]])
+        por_celula = base.reindex(chaves).to_numpy()
+        referencia = np.where(np.isnan(por_celula), referencia, por_celula)
+
+    com = df.loc[~sem_campanha, dimensoes].assign(
+        incremento=(lucro.to_numpy() - referencia)[~sem_campanha.to_numpy()],
+        faturamento=df.loc[~sem_campanha, 'valor_total'])
+    segmentos = com.groupby(dimensoes, observed=True).agg(
+        vendas=('incremento', 'size'), incremento_medio=('incremento', 'mean'),
+        faturamento=('faturamento', 'sum'))
+
+    # Encolhimento para a média da campanha: segmentos com poucas vendas são ruidosos
+    media_campanha = com.groupby('campanha')['incremento'].mean()
+    prior = media_campanha.reindex(segmentos.index.get_level_values('campanha')).to_numpy()
+    n = segmentos['vendas'].to_numpy()
+    segmentos['incremento_medio'] = (n * segmentos['incremento_medio'] + tau * prior) / (n + tau)
+    segmentos['investimento_historico'] = taxa_investimento * segmentos['faturamento']
+    segmentos['retorno_por_real'] = (segmentos['incremento_medio'] * n
+                                     / segmentos['investimento_historico'])
+    return segmentos
+
+
+# ============================================================================
+# 2. MODELO E SOLUÇÃO
+# ============================================================================
+
+def _matriz_limites(segmentos, limites, n_faixas):
+    """Uma linha por limite de dimensão, cobrindo todas as faixas dos segmentos atingidos."""
+    A = np.zeros((len(limites), len(segmentos) * n_faixas))
+    for i, (dimensao, valor) in enumerate(limites):
+        atingidos = segmentos.index.get_level_values(dimensao) == valor
+        A[i] = np.repeat(atingidos.astype(float), n_faixas)
+    return A, [f"{dimensao}={valor}" for dimensao, valor in limites]
+
+
+def otimizar_alocacao(segmentos, orcamento=None, limites=None, n_faixas=5,
+                      decaimento=0.8, fator_capacidade=3.0, inteiro=False,
+                      custo_ativacao=0.0, investimento_minimo=0.0, max_segmentos=None):
+    """Resolve a alocação; retorna (alocacao por segmento, precos_sombra, resumo).
+
+    `orcamento` None redistribui o investimento histórico estimado.
+    """
+    limites = dict(limites or {})
+    n_seg = len(segmentos)
+    orcamento = float(segmentos['investimento_historico'].sum() if orcamento is None else orcamento)
+
+    # Variáveis x[s, k]: investimento na faixa k do segmento s (ordem segmento-major)
+    capacidade = fator_capacidade * segmentos['investimento_historico'].to_numpy() / n_faixas
+    retorno = segmentos['retorno_por_real'].to_numpy()[:, None] * decaimento ** np.arange(n_faixas)
+    c = -(retorno - 1.0).ravel()  # minimização do lucro líquido com sinal trocado
+    teto = np.repeat(capacidade, n_faixas)
+
+    A_limites, nomes_limites = _matriz_limites(segmentos, limites, n_faixas)
+    A = sparse.vstack([sparse.csr_matrix(np.ones((1, n_seg * n_faixas))),
+                       sparse.csr_matrix(A_limites)]).tocsr()
+    b = np.r_[orcamento, list(limites.values())]
+    nomes = ['orcamento', *nomes_limites]
+
+    inicio = time.perf_counter()
+    ativos = None
+    if inteiro:
+        ativos = _resolver_inteiro(c, A, b, teto, n_seg, n_faixas, custo_ativacao,
+                                   investimento_minimo, max_segmentos)
+        teto = np.where(np.repeat(ativos, n_faixas), teto, 0.0)
+
+    # LP final (no modo inteiro, com as ativações fixadas) fornece os duais
+    resultado = linprog(c, A_ub=A, b_ub=b, bounds=np.column_stack([np.zeros_like(teto), teto]),
+                        method='highs')
+    if resultado.status != 0:
+        raise ErroOtimizacao(resultado.message)
+    decorrido = time.perf_counter() - inicio
+
+    x = resultado.x.reshape(n_seg, n_faixas)
+    alocacao = segmentos[['vendas', 'retorno_por_real', 'investimento_historico']].copy()
+    alocacao['investimento'] = x.sum(axis=1)
+    alocacao['lucro_incremental'] = (x * retorno).sum(axis=1)
+    alocacao['lucro_liquido'] = alocacao['lucro_incremental'] - alocacao['investimento']
+    # Dual do teto da última faixa: lucro líquido por R$ 1 a mais de capacidade no segmento
+    alocacao['preco_sombra_capacidade'] = 0.0 - resultado.upper.marginals.reshape(n_seg, n_faixas)[:, -1]
+    if ativos is not None:
+        alocacao['ativo'] = ativos
+
+    precos_sombra = pd.DataFrame({
+        'limite': b,
+        'utilizado': A @ resultado.x,
+        # Lucro líquido adicional por R$ 1 a mais no lado direito da restrição
+        'preco_sombra': 0.0 - resultado.ineqlin.marginals,
+    }, index=pd.Index(nomes, name='restricao'))
+
+    lucro_liquido = -resultado.fun - (custo_ativacao * ativos.sum() if ativos is not None else 0.0)
+    resumo = {
+        'orcamento': orcamento,
+        'investido': float(resultado.x.sum()),
+        'lucro_incremental': float(alocacao['lucro_incremental'].sum()),
+        'lucro_liquido': float(lucro_liquido),
+        'segmentos_com_investimento': int((alocacao['investimento'] > 1e-6).sum()),
+        'variaveis': int(len(c) + (n_seg if inteiro else 0)),
+        'segundos': decorrido,
+    }
+    return alocacao.sort_values('investimento', ascending=False), precos_sombra, resumo
+
+
+def _resolver_inteiro(c, A, b, teto, n_seg, n_faixas, custo_ativacao,
+                      investimento_minimo, max_segmentos):
+    """MIP com ativação binária por segmento; retorna o vetor booleano de ativos."""
+    n_x = n_seg * n_faixas
+    custo = np.r_[c, np.full(n_seg, custo_ativacao)]
+    integralidade = np.r_[np.zeros(n_x), np.ones(n_seg)]
+
+    # Segmento de cada variável x e matriz que soma as faixas de cada segmento
+    soma_faixas = sparse.kron(sparse.eye(n_seg), np.ones((1, n_faixas)), format='csr')
+    restricoes = [
+        LinearConstraint(sparse.hstack([A, sparse.csr_matrix((A.shape[0], n_seg))]), -np.inf, b),
+        # x[s, k] <= teto[s, k] · y[s]
+        LinearConstraint(sparse.hstack([sparse.eye(n_x), -sparse.diags(teto) @ soma_faixas.T]),
+                         -np.inf, 0.0),
+        # soma_k x[s, k] >= investimento_minimo · y[s]
+        LinearConstraint(sparse.hstack([soma_faixas, -investimento_minimo * sparse.eye(n_seg)]),
+                         0.0, np.inf),
+    ]
+    if max_segmentos is not None:
+        restricoes.append(LinearConstraint(
+            np.r_[np.zeros(n_x), np.ones(n_seg)][None, :], -np.inf, max_segmentos))
+
+    resultado = milp(custo, constraints=restricoes, integrality=integralidade,
+                     bounds=Bounds(0, np.r_[teto, np.ones(n_seg)]))
+    if resultado.status != 0:
+        raise ErroOtimizacao(resultado.message)
+    return resultado.x[n_x:] > 0.5
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from ingestao import carregar_vendas
+
+    parser = argparse.ArgumentParser(description='Alocação ótima do orçamento de campanhas')
+    parser.add_argument('--orcamento', type=float, default=None,
+                        help='orçamento total em R$ (padrão: investimento histórico estimado)')
+    parser.add_argument('--dimensoes', default=','.join(DIMENSOES_ALOCACAO),
+                        help='dimensões do segmento, sempre incluindo campanha')
+    parser.add_argument('--inteiro', action='store_true', help='ativação binária por segmento (MIP)')
+    parser.add_argument('--custo-ativacao', type=float, default=0.0)
+    parser.add_argument('--investimento-minimo', type=float, default=0.0)
+    parser.add_argument('--max-segmentos', type=int, default=None)
+    args = parser.parse_args()
+
+    df = carregar_vendas()
+    try:
+        segmentos = resposta_segmentos(df, [d.strip() for d in args.dimensoes.split(',') if d.strip()])
+    except ErroDimensoes as erro:
+        parser.error(str(erro))
+    alocacao, precos_sombra, resumo = otimizar_alocacao(
+        segmentos, args.orcamento, inteiro=args.inteiro, custo_ativacao=args.custo_ativacao,
+        investimento_minimo=args.investimento_minimo, max_segmentos=args.max_segmentos)
+
+    print("="*80)
+    print("ALOCAÇÃO ÓTIMA DO ORÇAMENTO DE CAMPANHAS")
+    print("="*80)
+    print(f"Segmentos: {len(segmentos)} | Variáveis: {resumo['variaveis']} | "
+          f"Solução em {resumo['segundos'] * 1000:.0f} ms")
+    print(f"Orçamento:          R$ {resumo['orcamento']:,.2f}")
+    print(f"Investido:          R$ {resumo['investido']:,.2f}")
+    print(f"Lucro incremental:  R$ {resumo['lucro_incremental']:,.2f}")
+    print(f"Lucro líquido:      R$ {resumo['lucro_liquido']:,.2f}")
+
+    print("\nMaiores investimentos:")
+    print(alocacao.head(10).round(2).to_string())
+    print("\nPreços-sombra das restrições:")
+    print(precos_sombra.round(4).to_string())
@@ -0,0 +1,415 @@
+"""
+================================================================================
+CONSULTAS APROXIMADAS COM AMOSTRAS ESTRATIFICADAS E INTERVALOS DE CONFIANÇA
+================================================================================
+
+Mantém uma amostra reservatório (algoritmo R) de até `capacidade` vendas por
+estrato canal × região × categoria, junto com o número exato de vendas de
+cada estrato. A amostra é atualizada extrato a extrato e gravada em disco;
+extratos novos são apenas acrescentados, sem reler o histórico.
+
+As métricas agrupadas das análises descritiva e diagnóstica são estimadas a
+partir da amostra (estimador de expansão estratificado; médias e margens
+como estimadores de razão), com variância linearizada e correção de
+população finita. Cada estimativa vem com a meia-largura do intervalo de
+confiança (colunas *_erro).
+
+Alvos:
+- latência: `capacidade` (vendas guardadas por estrato);
+- precisão: `erro_alvo` (meia-largura relativa máxima). Uma tabela que não
+  atinge o alvo é recalculada de forma exata, numa passada pela fonte.
+
+Estratos com até `capacidade` vendas ficam inteiros na amostra: suas
+estimativas são exatas (erro zero) automaticamente.
+================================================================================
+"""
+
+import os
+import pickle
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from consulta_lazy import derivar_coluna, vendas
+
+DIMENSOES_ESTRATO = ('canal_venda', 'regiao', 'categoria_produto')
+COLUNAS_AMOSTRA = ('quantidade', 'valor_total', 'custo_total', 'satisfacao_cliente', 'campanha')
+ARQUIVO_AMOSTRA = 'vendas_amostra.pkl'
+
+
+# ============================================================================
+# 1. AMOSTRA RESERVATÓRIO ESTRATIFICADA
+# ============================================================================
+
+class AmostraEstratificada:
+    """Reservatórios por estrato com as contagens exatas da população."""
+
+    def __init__(self, capacidade=2000, dimensoes=DIMENSOES_ESTRATO, semente=42):
+        self.capacidade = capacidade
+        self.dimensoes = list(dimensoes)
+        self.rng = np.random.default_rng(semente)
+        self.estratos = {}
+        self.chaves = []
+        self.populacao = np.zeros(0, dtype=np.int64)
+        self.dados = {c: np.zeros((0, capacidade), dtype=object if c == 'campanha' else float)
+                      for c in COLUNAS_AMOSTRA}
+        self.arquivos = {}
+        self.recorte = '(tudo)'
+
+    def _crescer(self, n):
+        falta = n - len(self.populacao)
+        if falta <= 0:
+            return
+        falta = max(falta, len(self.populacao))
+        self.populacao = np.concatenate([self.populacao, np.zeros(falta, dtype=np.int64)])
+        for c, atual in self.dados.items():
+            self.dados[c] = np.concatenate([atual, np.zeros((falta, self.capacidade), dtype=atual.dtype)])
+
+    def atualizar(self, lote):
+        """Passa um lote de vendas pelos reservatórios (ordem de chegada preservada)."""
+        if len(lote) == 0:
+            return self
+        codigos, unicos = pd.MultiIndex.from_frame(lote[self.dimensoes]).factorize()
+        ids = np.array([self.estratos.setdefault(tuple(map(str, u)), len(self.estratos))
+                        for u in unicos], dtype=np.intp)
+        self.chaves = list(self.estratos)
+        self._crescer(len(self.estratos))
+        colunas = {c: lote[c].to_numpy(dtype=object if c == 'campanha' else float)
+                   for c in COLUNAS_AMOSTRA}
+
+        ordem = np.argsort(codigos, kind='stable')
+        inicios = np.r_[0, np.flatnonzero(np.diff(codigos[ordem])) + 1, len(ordem)]
+        for a, b in zip(inicios[:-1], inicios[1:]):
+            linhas = ordem[a:b]
+            estrato = ids[codigos[linhas[0]]]
+            vistos = self.populacao[estrato]
+            # Posição global de cada linha no fluxo do estrato
+            t = vistos + np.arange(len(linhas))
+            destino = np.where(t < self.capacidade, t,
+                               (self.rng.random(len(linhas)) * (t + 1)).astype(np.int64))
+            aceitas = destino < self.capacidade
+            # Mesma vaga sorteada duas vezes no lote: vale a última linha, como no algoritmo sequencial
+            destino, linhas = destino[aceitas][::-1], linhas[aceitas][::-1]
+            destino, primeira = np.unique(destino, return_index=True)
+            linhas = linhas[primeira]
+            for c, valores in colunas.items():
+                self.dados[c][estrato, destino] = valores[linhas]
+            self.populacao[estrato] += b - a
+        return self
+
+    @property
+    def tamanhos(self):
+        """Vendas guardadas por estrato."""
+        return np.minimum(self.populacao[:len(self.chaves)], self.capacidade)
+
+    def linhas(self):
+        """Amostra como DataFrame; `_estrato` indexa populacao e tamanhos."""
+        n = self.tamanhos
+        estrato = np.repeat(np.arange(len(n)), n)
+        posicao = np.concatenate([np.arange(k) for k in n]) if len(n) else np.zeros(0, dtype=int)
+        df = pd.DataFrame({d: np.array([k[i] for k in self.chaves], dtype=object)[estrato]
+                           for i, d in enumerate(self.dimensoes)})
+        for c, valores in self.dados.items():
+            df[c] = valores[estrato, posicao]
+        df['campanha'] = df['campanha'].astype(str)
+        df['_estrato'] = estrato
+        return df
+
+    def salvar(self, caminho=ARQUIVO_AMOSTRA):
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+        return caminho
+
+    @staticmethod
+    def carregar(caminho=ARQUIVO_AMOSTRA):
+        with open(caminho, 'rb') as f:
+            return pickle.load(f)
+
+
+def _assinatura(caminho):
+    info = os.stat(caminho)
+    return info.st_size, info.st_mtime_ns
+
+
+def manter_amostra(fonte=None, capacidade=2000, recorte=None, caminho=ARQUIVO_AMOSTRA):
+    """Carrega a amostra gravada e acrescenta só os extratos novos; refaz se algo mudou."""
+    import ingestao
+    import particoes
+
+    fonte = ingestao.fonte_padrao() if fonte is None else fonte
+    recorte = particoes.Recorte.do_ambiente() if recorte is None else recorte
+    if particoes.e_particionado(fonte):
+        arquivos = particoes.podar(fonte, recorte)
+    else:
+        arquivos = ingestao.listar_arquivos(fonte)
+
+    amostra = None
+    if caminho and os.path.exists(caminho):
+        amostra = AmostraEstratificada.carregar(caminho)
+        alterados = [a for a, assinatura in amostra.arquivos.items()
+                     if a not in arquivos or not os.path.exists(a) or _assinatura(a) != assinatura]
+        if amostra.capacidade != capacidade or alterados or amostra.recorte != repr(recorte):
+            amostra = None
+    if amostra is None:
+        amostra = AmostraEstratificada(capacidade)
+        amostra.recorte = repr(recorte)
+
+    novos = [a for a in arquivos if a not in amostra.arquivos]
+    for arquivo in novos:
+        amostra.atualizar(ingestao.ler_arquivo(arquivo, None if recorte.vazio else recorte))
+        amostra.arquivos[arquivo] = _assinatura(arquivo)
+    if novos and caminho:
+        amostra.salvar(caminho)
+    return amostra
+
+
+# ============================================================================
+# 2. ESTIMADORES COM INTERVALO DE CONFIANÇA
+# ============================================================================
+
+def _valores(linhas, alvo):
+    if alvo is None:
+        return np.ones(len(linhas))
+    if alvo in linhas.columns:
+        return linhas[alvo].to_numpy(dtype=float)
+    return np.asarray(derivar_coluna(linhas, alvo), dtype=float)
+
+
+def estimar(amostra, agrupar=(), medidas=None, confianca=0.95, linhas=None):
+    """Estimativas agrupadas a partir da amostra.
+
+    `medidas` mapeia saída -> (função, alvo), com função em 'sum', 'mean',
+    'count' ou 'razao' (alvo = (numerador, denominador)). Devolve um
+    DataFrame com a estimativa, a meia-largura do IC (<saida>_erro) e a
+    coluna `exato`.
+    """
+    linhas = amostra.linhas() if linhas is None else linhas
+    agrupar = list(agrupar)
+    z_critico = NormalDist().inv_cdf(0.5 + confianca / 2)
+
+    N = amostra.populacao[:len(amostra.chaves)].astype(float)
+    n = amostra.tamanhos.astype(float)
+    H = len(N)
+    estrato = linhas['_estrato'].to_numpy()
+    peso = N / np.maximum(n, 1)
+    # N_h² (1 - f_h) / n_h / (n_h - 1): zero nos estratos guardados inteiros
+    fator = np.where(n > 1, N ** 2 * (1 - n / np.maximum(N, 1)) / np.maximum(n, 1) / np.maximum(n - 1, 1), 0.0)
+
+    if agrupar:
+        codigos, grupos = pd.MultiIndex.from_frame(linhas[agrupar]).factorize()
+        G = len(grupos)
+    else:
+        codigos, grupos, G = np.zeros(len(linhas), dtype=np.intp), None, 1
+    celula = codigos * H + estrato
+
+    def somar(v):
+        return np.bincount(celula, weights=v, minlength=G * H).reshape(G, H)
+
+    def variancia(soma_z, soma_z2):
+        s2 = soma_z2 - soma_z ** 2 / np.maximum(n, 1)
+        return (fator * s2).sum(axis=1)
+
+    resultado = {}
+    for saida, (funcao, alvo) in (medidas or {}).items():
+        if funcao in ('sum', 'count'):
+            y = _valores(linhas, alvo if funcao == 'sum' else None)
+            estimativa = (somar(y) * peso).sum(axis=1)
+            var = variancia(somar(y), somar(y * y))
+        else:
+            numerador, denominador = (alvo, None) if funcao == 'mean' else alvo
+            y, x = _valores(linhas, numerador), _valores(linhas, denominador)
+            Sy, Sx = somar(y), somar(x)
+            Y, X = (Sy * peso).sum(axis=1), (Sx * peso).sum(axis=1)
+            R = np.divide(Y, X, out=np.full(G, np.nan), where=X != 0)
+            # Linearização: z = (y - R x) / X̂ dentro do grupo
+            Sz = (Sy - R[:, None] * Sx) / X[:, None]
+            Sz2 = (somar(y * y) - 2 * R[:, None] * somar(x * y) + R[:, None] ** 2 * somar(x * x)) / X[:, None] ** 2
+            estimativa, var = R, variancia(Sz, Sz2)
+        resultado[saida] = estimativa
+        resultado[f'{saida}_erro'] = z_critico * np.sqrt(np.maximum(var, 0.0))
+
+    tabela = pd.DataFrame(resultado)
+    estratos_completos = n >= N
+    if agrupar and set(agrupar) <= set(amostra.dimensoes):
+        presentes = somar(np.ones(len(linhas))) > 0
+        tabela['exato'] = ~(presentes & ~estratos_completos).any(axis=1)
+    else:
+        tabela['exato'] = bool(estratos_completos.all())
+    if agrupar:
+        tabela.index = grupos.set_names(agrupar) if len(agrupar) > 1 else grupos.get_level_values(0).rename(agrupar[0])
+        tabela = tabela.sort_index()
+    return tabela
+
+
+def _exato(fonte, agrupar, medidas):
+    """Mesmas medidas calculadas numa passada exata pela fonte (fallback)."""
+    agregacoes = {}
+    for saida, (funcao, alvo) in medidas.items():
+        if funcao == 'razao':
+            agregacoes[f'_{saida}_num'] = (alvo[0], 'sum')
+            agregacoes[f'_{saida}_den'] = (alvo[1], 'sum')
+        elif funcao == 'count':
+            agregacoes[saida] = ('valor_total', 'count')
+        else:
+            agregacoes[saida] = (alvo, funcao)
+    # O recorte do ambiente (VENDAS_DE/ATE/ONDE) é aplicado pela própria consulta
+    consulta = vendas(fonte).agrupar(*agrupar).agregar(**agregacoes).coletar()
+    tabela = pd.DataFrame(index=consulta.index)
+    for saida, (funcao, _) in medidas.items():
+        if funcao == 'razao':
+            tabela[saida] = consulta[f'_{saida}_num'] / consulta[f'_{saida}_den']
+        else:
+            tabela[saida] = consulta[saida]
+        tabela[f'{saida}_erro'] = 0.0
+    tabela['exato'] = True
+    return tabela
+
+
+def consultar(amostra, agrupar=(), medidas=None, confianca=0.95, erro_alvo=None,
+              fonte=None, linhas=None):
+    """estimar() com fallback exato quando o erro relativo passa de `erro_alvo`.
+
+    Retorna (tabela, recalculada_exata).
+    """
+    tabela = estimar(amostra, agrupar, medidas, confianca, linhas)
+    if erro_alvo is None:
+        return tabela, False
+    relativos = [tabela[f'{s}_erro'] / tabela[s].abs() for s in medidas]
+    pior = pd.concat(relativos, axis=1).max(axis=1).max()
+    if pior > erro_alvo:
+        return _exato(fonte, agrupar, medidas), True
+    return tabela, False
+
+
+# ============================================================================
+# 3. MÉTRICAS APROXIMADAS DAS ANÁLISES DESCRITIVA E DIAGNÓSTICA
+# ============================================================================
+
+def _tabela(tabela):
+    from metricas import _tabela as tabela_nativa
+    return tabela_nativa(tabela.drop(columns='exato').round(6))
+
+
+def _cabecalho(amostra, confianca, erro_alvo):
+    return {
+        'modo': 'aproximado',
+        'confianca': confianca,
+        'erro_alvo': erro_alvo,
+        'linhas_populacao': int(amostra.populacao.sum()),
+        'linhas_amostra': int(amostra.tamanhos.sum()),
+        'estratos': len(amostra.chaves),
+        'estratos_exatos': int((amostra.tamanhos >= amostra.populacao[:len(amostra.chaves)]).sum()),
+    }
+
+
+def metricas_descritiva_aproximada(amostra, confianca=0.95, erro_alvo=None, fonte=None):
+    linhas = amostra.linhas()
+    recalculadas = []
+
+    def consulta(nome, agrupar, medidas):
+        tabela, exata = consultar(amostra, agrupar, medidas, confianca, erro_alvo, fonte, linhas)
+        if exata:
+            recalculadas.append(nome)
+        return tabela
+
+    geral = consulta('geral', (), {
+        'faturamento_total': ('sum', 'valor_total'), 'ticket_medio': ('mean', 'valor_total'),
+        'satisfacao_media': ('mean', 'satisfacao_cliente'), 'total_transacoes': ('count', None)})
+    canal = consulta('por_canal', ['canal_venda'], {
+        'valor_total': ('sum', 'valor_total'), 'quantidade': ('sum', 'quantidade')})
+    regiao = consulta('por_regiao', ['regiao'], {'valor_total': ('sum', 'valor_total')})
+    categoria = consulta('por_categoria', ['categoria_produto'], {
+        'valor_total': ('sum', 'valor_total'), 'quantidade': ('sum', 'quantidade'),
+        'margem_lucro': ('razao', ('lucro', 'valor_total'))})
+    for coluna in ('margem_lucro', 'margem_lucro_erro'):
+        categoria[coluna] *= 100
+
+    resultado = _cabecalho(amostra, confianca, erro_alvo)
+    resultado.update({k: float(v) for k, v in geral.drop(columns='exato').iloc[0].items()})
+    resultado['total_transacoes'] = int(round(resultado['total_transacoes']))
+    resultado.update({
+        'por_canal': _tabela(canal.sort_values('valor_total', ascending=False)),
+        'por_regiao': _tabela(regiao.sort_values('valor_total', ascending=False)),
+        'por_categoria': _tabela(categoria.sort_values('valor_total', ascending=False)),
+        'produto_mais_vendido': str(categoria['quantidade'].idxmax()),
+        'tabelas_recalculadas_exatas': recalculadas,
+    })
+    return resultado
+
+
+def metricas_diagnostica_aproximada(amostra, confianca=0.95, erro_alvo=None, fonte=None):
+    linhas = amostra.linhas()
+    recalculadas = []
+    medidas = {
+        'lucro_total': ('sum', 'lucro'), 'lucro_medio': ('mean', 'lucro'),
+        'margem_media': ('mean', 'margem_lucro'), 'satisfacao_media': ('mean', 'satisfacao_cliente'),
+        'valor_total': ('sum', 'valor_total'),
+    }
+
+    def consulta(nome, agrupar):
+        tabela, exata = consultar(amostra, agrupar, medidas, confianca, erro_alvo, fonte, linhas)
+        if exata:
+            recalculadas.append(nome)
+        return tabela
+
+    geral = consulta('geral', ())
+    canal, categoria = consulta('por_canal', ['canal_venda']), consulta('por_categoria', ['categoria_produto'])
+    campanha, regiao = consulta('por_campanha', ['campanha']), consulta('por_regiao', ['regiao'])
+
+    resultado = _cabecalho(amostra, confianca, erro_alvo)
+    resultado.update({k: float(v) for k, v in geral.drop(columns='exato').iloc[0].items()
+                      if not k.startswith('valor_total')})
+    resultado.update({
+        'por_canal': _tabela(canal),
+        'por_categoria': _tabela(categoria),
+        'por_campanha': _tabela(campanha.sort_values('lucro_total', ascending=False)),
+        'melhor_canal': str(canal['lucro_total'].idxmax()),
+        'pior_canal': str(canal['lucro_total'].idxmin()),
+        'melhor_categoria': str(categoria['lucro_total'].idxmax()),
+        'melhor_regiao': str(regiao['lucro_total'].idxmax()),
+        'tabelas_recalculadas_exatas': recalculadas,
+    })
+    return resultado
+
+
+METRICAS_APROXIMADAS = {
+    'descritiva': metricas_descritiva_aproximada,
+    'diagnostica': metricas_diagnostica_aproximada,
+}
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    from ingestao import carregar_vendas
+
+    fonte = sys.argv[1] if len(sys.argv) > 1 else None
+    capacidade = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print("="*80)
+    print("CONSULTA APROXIMADA x EXATA - LUCRO POR CANAL")
+    print("="*80)
+
+    inicio = time.perf_counter()
+    amostra = manter_amostra(fonte, capacidade, caminho=None)
+    print(f"Amostra: {amostra.tamanhos.sum()} de {amostra.populacao.sum()} vendas "
+          f"em {len(amostra.chaves)} estratos ({time.perf_counter() - inicio:.2f}s)")
+
+    medidas = {'lucro_total': ('sum', 'lucro'), 'satisfacao_media': ('mean', 'satisfacao_cliente')}
+    inicio = time.perf_counter()
+    aproximada = estimar(amostra, ['canal_venda'], medidas)
+    tempo_aproximado = time.perf_counter() - inicio
+
+    df = carregar_vendas(fonte)
+    inicio = time.perf_counter()
+    exata = vendas(df).agrupar('canal_venda').agregar(
+        lucro_total=('lucro', 'sum'), satisfacao_media=('satisfacao_cliente', 'mean')).coletar()
+    tempo_exato = time.perf_counter() - inicio
+
+    comparacao = aproximada.join(exata, rsuffix='_exato')
+    print(comparacao.round(2).to_string())
+    print(f"\nTempo aproximado: {tempo_aproximado * 1000:.1f} ms | exato (em memória): {tempo_exato * 1000:.1f} ms")
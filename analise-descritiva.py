@@ -1,20 +1,17 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
+from ingestao import carregar_vendas
+from metricas import calcular_descritiva
 
 # Configurar estilo dos gráficos
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
-# Carregar dados
-df = pd.read_csv('vendas_rede_varejo.csv', sep=';', decimal=',')
-
-# Converter data para datetime
-df['data_venda'] = pd.to_datetime(df['data_venda'])
-
-# Limpar nomes das colunas (remover espaços)
-df.columns = df.columns.str.strip()
+# Carregar dados (arquivo, glob ou manifesto definido em VENDAS_FONTE; datas já convertidas)
+df = carregar_vendas()
+# Números e tabelas calculados uma vez, os mesmos de metricas_descritiva (JSON/relatório)
+calculo = calcular_descritiva(df)
 
 print("="*60)
 print("ANÁLISE DE VENDAS - REDE DE VAREJO")
@@ -23,10 +20,10 @@ print("="*60)
 # 1. FATURAMENTO MÉDIO DIÁRIO
 print("\n1. FATURAMENTO MÉDIO DIÁRIO")
 print("-"*60)
-faturamento_diario = df.groupby('data_venda')['valor_total'].sum()
+faturamento_diario = calculo['faturamento_diario']
 media_diaria = faturamento_diario.mean()
 print(f"Faturamento médio diário: R$ {media_diaria:,.2f}")
-print(f"Faturamento total: R$ {df['valor_total'].sum():,.2f}")
+print(f"Faturamento total: R$ {calculo['faturamento_total']:,.2f}")
 print(f"Número de dias com vendas: {len(faturamento_diario)}")
 
 # 2. GRÁFICO: DISTRIBUIÇÃO POR CANAL DE VENDA
@@ -34,10 +31,7 @@ print("\n2. Gerando gráfico de distribuição por canal de venda...")
 fig, axes = plt.subplots(2, 2, figsize=(15, 12))
 
 # Canal de venda - Quantidade
-canal_vendas = df.groupby('canal_venda').agg({
-    'valor_total': 'sum',
-    'quantidade': 'sum'
-}).sort_values('valor_total', ascending=False)
+canal_vendas = calculo['canal']
 
 axes[0, 0].bar(canal_vendas.index, canal_vendas['valor_total'], color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
 axes[0, 0].set_title('Faturamento por Canal de Venda', fontsize=14, fontweight='bold')
@@ -49,7 +43,7 @@ for i, v in enumerate(canal_vendas['valor_total']):
 
 # 3. GRÁFICO: DISTRIBUIÇÃO POR REGIÃO
 print("3. Gerando gráfico de distribuição por região...")
-regiao_vendas = df.groupby('regiao')['valor_total'].sum().sort_values(ascending=False)
+regiao_vendas = calculo['regiao']
 
 axes[0, 1].barh(regiao_vendas.index, regiao_vendas.values, color=['#95E1D3', '#F38181', '#EAFFD0', '#FCE38A', '#AA96DA'])
 axes[0, 1].set_title('Faturamento por Região', fontsize=14, fontweight='bold')
@@ -61,13 +55,7 @@ for i, v in enumerate(regiao_vendas.values):
 # 4. CATEGORIAS MAIS VENDIDAS
 print("\n4. CATEGORIAS MAIS VENDIDAS")
 print("-"*60)
-categorias = df.groupby('categoria_produto').agg({
-    'valor_total': 'sum',
-    'quantidade': 'sum',
-    'custo_total': 'sum'
-}).sort_values('valor_total', ascending=False)
-
-categorias['margem_lucro'] = ((categorias['valor_total'] - categorias['custo_total']) / categorias['valor_total'] * 100)
+categorias = calculo['categorias']
 
 print(categorias)
 print(f"\nMargem de lucro média geral: {categorias['margem_lucro'].mean():.2f}%")
@@ -87,22 +75,23 @@ axes[1, 1].hist(df['satisfacao_cliente'], bins=20, color='#6C5CE7', edgecolor='b
 axes[1, 1].set_title('Distribuição de Satisfação do Cliente', fontsize=14, fontweight='bold')
 axes[1, 1].set_xlabel('Nota de Satisfação')
 axes[1, 1].set_ylabel('Frequência')
-axes[1, 1].axvline(df['satisfacao_cliente'].mean(), color='red', linestyle='--', linewidth=2, label=f'Média: {df["satisfacao_cliente"].mean():.2f}')
+axes[1, 1].axvline(calculo['satisfacao_media'], color='red', linestyle='--', linewidth=2, label=f"Média: {calculo['satisfacao_media']:.2f}")
 axes[1, 1].legend()
 axes[1, 1].grid(axis='y', alpha=0.3)
 
 plt.tight_layout()
 plt.savefig('analise_vendas.png', dpi=300, bbox_inches='tight')
+plt.close(fig)
 print("\nGráficos salvos em 'analise_vendas.png'")
 
 # ESTATÍSTICAS ADICIONAIS
 print("\n" + "="*60)
 print("ESTATÍSTICAS ADICIONAIS")
 print("="*60)
-print(f"\nSatisfação média dos clientes: {df['satisfacao_cliente'].mean():.2f}")
-print(f"Ticket médio: R$ {df['valor_total'].mean():,.2f}")
-print(f"Total de transações: {len(df)}")
-print(f"Produto mais vendido: {df.groupby('categoria_produto')['quantidade'].sum().idxmax()}")
+print(f"\nSatisfação média dos clientes: {calculo['satisfacao_media']:.2f}")
+print(f"Ticket médio: R$ {calculo['ticket_medio']:,.2f}")
+print(f"Total de transações: {calculo['total_transacoes']}")
+print(f"Produto mais vendido: {calculo['produto_mais_vendido']}")
 
 # Margem de lucro por categoria
 print("\n" + "-"*60)
@@ -1,8 +1,9 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy import stats
+from ingestao import carregar_vendas
+from metricas import calcular_diagnostica
+from testes_significancia import testar_tudo
 
 # Configurações de visualização
 plt.style.use('seaborn-v0_8-darkgrid')
@@ -10,15 +11,13 @@ sns.set_palette("husl")
 plt.rcParams['figure.figsize'] = (12, 6)
 plt.rcParams['font.size'] = 10
 
-# Carregar dados
-df = pd.read_csv('vendas_rede_varejo.csv', sep=';', decimal=',')
+# Carregar dados (arquivo, glob ou manifesto definido em VENDAS_FONTE; datas já convertidas)
+df = carregar_vendas()
 
-# Converter data para datetime
-df['data_venda'] = pd.to_datetime(df['data_venda'])
-
-# Calcular lucro
-df['lucro'] = df['valor_total'] - df['custo_total']
-df['margem_lucro'] = (df['lucro'] / df['valor_total']) * 100
+# Lucro, correlações e tabelas calculados uma vez, os mesmos de metricas_diagnostica (JSON/relatório)
+calculo = calcular_diagnostica(df)
+df['lucro'] = calculo['lucro']
+df['margem_lucro'] = calculo['margem_lucro']
 
 print("="*80)
 print("ANÁLISE DIAGNÓSTICA DE VENDAS")
@@ -44,28 +43,21 @@ print("\n" + "="*80)
 print("2. MATRIZ DE CORRELAÇÃO - FATORES QUE IMPACTAM O LUCRO")
 print("="*80)
 
-# Selecionar variáveis numéricas para correlação
-variaveis_correlacao = ['lucro', 'quantidade', 'preco_unitario', 
-                        'valor_total', 'custo_total', 'satisfacao_cliente']
-df_corr = df[variaveis_correlacao].copy()
-
-# Calcular matriz de correlação
-correlacao = df_corr.corr()
+# Matriz de correlação (lucro, quantidade, preço, valor, custo e satisfação)
+correlacao = calculo['correlacao']
 
 # Exibir correlações com lucro
 print("\nCorrelação com LUCRO:")
 print("-" * 50)
-corr_lucro = correlacao['lucro'].sort_values(ascending=False)
-for var, valor in corr_lucro.items():
-    if var != 'lucro':
-        interpretacao = ""
-        if abs(valor) > 0.7:
-            interpretacao = "FORTE"
-        elif abs(valor) > 0.4:
-            interpretacao = "MODERADA"
-        else:
-            interpretacao = "FRACA"
-        print(f"{var:25s}: {valor:6.3f}  ({interpretacao})")
+for var, valor in calculo['correlacao_lucro'].items():
+    interpretacao = ""
+    if abs(valor) > 0.7:
+        interpretacao = "FORTE"
+    elif abs(valor) > 0.4:
+        interpretacao = "MODERADA"
+    else:
+        interpretacao = "FRACA"
+    print(f"{var:25s}: {valor:6.3f}  ({interpretacao})")
 
 # ============================================================================
 # 3. MAPA DE CALOR DE CORRELAÇÃO
@@ -98,12 +90,11 @@ print("\n" + "="*80)
 print("4. ANÁLISE: SATISFAÇÃO DO CLIENTE × VALOR TOTAL")
 print("="*80)
 
-# Calcular correlação
-corr_satisfacao_valor = df['satisfacao_cliente'].corr(df['valor_total'])
+# Correlação e teste de significância (Pearson)
+corr_satisfacao_valor = calculo['correlacao_satisfacao_valor']
 print(f"\nCorrelação Satisfação × Valor Total: {corr_satisfacao_valor:.3f}")
 
-# Teste de significância
-statistic, p_value = stats.pearsonr(df['satisfacao_cliente'], df['valor_total'])
+p_value = calculo['p_valor_satisfacao_valor']
 print(f"P-valor: {p_value:.4f}")
 if p_value < 0.05:
     print("✓ Correlação estatisticamente significativa (p < 0.05)")
@@ -152,32 +143,28 @@ print("\n" + "="*80)
 print("5. ANÁLISE POR CANAL DE VENDA")
 print("="*80)
 
-analise_canal = df.groupby('canal_venda').agg({
-    'lucro': ['sum', 'mean'],
-    'margem_lucro': 'mean',
-    'satisfacao_cliente': 'mean',
-    'valor_total': 'sum'
-}).round(2)
+analise_canal = calculo['por_canal'][['lucro_total', 'lucro_medio', 'margem_media',
+                                      'satisfacao_media', 'valor_total']].round(2)
 
 print("\n", analise_canal)
 
 # Gráfico comparativo
-axes = plt.subplots(2, 2, figsize=(14, 10))
+fig, axes = plt.subplots(2, 2, figsize=(14, 10))
 
 # Lucro total por canal
-df.groupby('canal_venda')['lucro'].sum().plot(kind='bar', ax=axes[0, 0], color='steelblue')
+analise_canal['lucro_total'].plot(kind='bar', ax=axes[0, 0], color='steelblue')
 axes[0, 0].set_title('Lucro Total por Canal', fontweight='bold')
 axes[0, 0].set_ylabel('Lucro (R$)')
-axes[0, 0].tick_params(axis='x', rotation=45)fig, 
+axes[0, 0].tick_params(axis='x', rotation=45)
 
 # Margem de lucro por canal
-df.groupby('canal_venda')['margem_lucro'].mean().plot(kind='bar', ax=axes[0, 1], color='coral')
+analise_canal['margem_media'].plot(kind='bar', ax=axes[0, 1], color='coral')
 axes[0, 1].set_title('Margem de Lucro Média por Canal (%)', fontweight='bold')
 axes[0, 1].set_ylabel('Margem (%)')
 axes[0, 1].tick_params(axis='x', rotation=45)
 
 # Satisfação por canal
-df.groupby('canal_venda')['satisfacao_cliente'].mean().plot(kind='bar', ax=axes[1, 0], color='lightgreen')
+analise_canal['satisfacao_media'].plot(kind='bar', ax=axes[1, 0], color='lightgreen')
 axes[1, 0].set_title('Satisfação Média por Canal', fontweight='bold')
 axes[1, 0].set_ylabel('Satisfação (1-10)')
 axes[1, 0].axhline(y=df['satisfacao_cliente'].mean(), color='r', linestyle='--', label='Média Geral')
@@ -209,12 +196,8 @@ print("\n" + "="*80)
 print("6. ANÁLISE POR CATEGORIA DE PRODUTO")
 print("="*80)
 
-analise_categoria = df.groupby('categoria_produto').agg({
-    'lucro': ['sum', 'mean'],
-    'margem_lucro': 'mean',
-    'satisfacao_cliente': 'mean',
-    'quantidade': 'sum'
-}).round(2)
+analise_categoria = calculo['por_categoria'][['lucro_total', 'lucro_medio', 'margem_media',
+                                              'satisfacao_media', 'quantidade']].round(2)
 
 print("\n", analise_categoria)
 
@@ -225,30 +208,40 @@ print("\n" + "="*80)
 print("7. IMPACTO DAS CAMPANHAS NO LUCRO E SATISFAÇÃO")
 print("="*80)
 
-analise_campanha = df.groupby('campanha').agg({
-    'lucro': ['sum', 'mean'],
-    'satisfacao_cliente': 'mean',
-    'valor_total': 'sum'
-}).round(2)
+analise_campanha = calculo['por_campanha'][['lucro_total', 'lucro_medio', 'satisfacao_media',
+                                            'valor_total']].round(2)
 
-print("\n", analise_campanha.sort_values(('lucro', 'sum'), ascending=False))
+print("\n", analise_campanha)
 
 # ============================================================================
-# 8. INSIGHTS E RECOMENDAÇÕES
+# 8. SIGNIFICÂNCIA ESTATÍSTICA DAS COMPARAÇÕES ENTRE GRUPOS
 # ============================================================================
 print("\n" + "="*80)
-print("8. PRINCIPAIS INSIGHTS")
+print("8. SIGNIFICÂNCIA ESTATÍSTICA (ANOVA, KRUSKAL-WALLIS E PARES)")
 print("="*80)
 
-# Melhor e pior canal
-melhor_canal = df.groupby('canal_venda')['lucro'].sum().idxmax()
-pior_canal = df.groupby('canal_venda')['lucro'].sum().idxmin()
+testes_globais, testes_pares = testar_tudo(df)
+print(f"\nTestes executados: {2 * len(testes_globais)} globais, {2 * len(testes_pares)} pareados")
+print("Correção para comparações múltiplas: Holm\n")
+print(testes_globais[['dimensao', 'medida', 'p_anova_ajustado', 'p_kruskal_ajustado']]
+      .round(4).to_string(index=False))
 
-# Categoria mais lucrativa
-melhor_categoria = df.groupby('categoria_produto')['lucro'].sum().idxmax()
+pares_significativos = testes_pares[testes_pares['p_welch_ajustado'] < 0.05]
+print(f"\nPares com diferença significativa (Welch, p ajustado < 0.05): {len(pares_significativos)}")
+for _, par in pares_significativos.iterrows():
+    print(f"  ✓ {par['dimensao']}/{par['medida']}: {par['grupo_a']} vs {par['grupo_b']} "
+          f"(diferença {par['diferenca']:,.2f}; p = {par['p_welch_ajustado']:.4f})")
+
+# ============================================================================
+# 9. INSIGHTS E RECOMENDAÇÕES
+# ============================================================================
+print("\n" + "="*80)
+print("9. PRINCIPAIS INSIGHTS")
+print("="*80)
 
-# Região mais lucrativa
-melhor_regiao = df.groupby('regiao')['lucro'].sum().idxmax()
+melhor_canal = calculo['melhor_canal']
+melhor_categoria = calculo['melhor_categoria']
+melhor_regiao = calculo['melhor_regiao']
 
 print(f"\n✓ Canal mais lucrativo: {melhor_canal}")
 print(f"✓ Categoria mais lucrativa: {melhor_categoria}")
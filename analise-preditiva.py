@@ -2,18 +2,15 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+from ingestao import carregar_vendas
+from metricas import calcular_preditiva
 
 # Configurações de visualização
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
-# Carregar dados
-df = pd.read_csv('vendas_rede_varejo.csv', sep=';', decimal=',')
-df['data_venda'] = pd.to_datetime(df['data_venda'])
-df.columns = df.columns.str.strip()
+# Carregar dados (arquivo, glob ou manifesto definido em VENDAS_FONTE; datas já convertidas)
+df = carregar_vendas()
 
 print("="*80)
 print("ANÁLISE PREDITIVA DE VENDAS")
@@ -26,23 +23,16 @@ print("\n" + "="*80)
 print("1. PREPARAÇÃO DOS DADOS")
 print("="*80)
 
-# Criar variável dummy para campanha
-df['tem_campanha'] = (df['campanha'] != 'Nenhuma').astype(int)
-
-# Preparar dados
-X = df[['quantidade', 'preco_unitario', 'tem_campanha']]
-y = df['valor_total']
-
-# Dividir em treino e teste (80/20)
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+# Dummy de campanha, divisão treino/teste (80/20), ajuste e métricas: os mesmos de
+# metricas_preditiva (JSON/relatório)
+calculo = calcular_preditiva(df)
+modelo = calculo['modelo']
+X_train, X_test = calculo['X_train'], calculo['X_test']
+y_train, y_test = calculo['y_train'], calculo['y_test']
 
 print(f"Conjunto de treino: {len(X_train)} registros")
 print(f"Conjunto de teste: {len(X_test)} registros")
 
-# Treinar o modelo
-modelo = LinearRegression()
-modelo.fit(X_train, y_train)
-
 print("\n" + "="*80)
 print("2. COEFICIENTES DO MODELO")
 print("="*80)
@@ -58,13 +48,8 @@ print("\n" + "="*80)
 print("3. AVALIAÇÃO DO MODELO")
 print("="*80)
 
-# Fazer as previsões
-y_pred = modelo.predict(X_test)
-
-# Calcular as métricas
-r2 = r2_score(y_test, y_pred)
-mae = mean_absolute_error(y_test, y_pred)
-rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+y_pred = calculo['y_pred']
+r2, mae, rmse = calculo['r2'], calculo['mae'], calculo['rmse']
 
 print(f"R² (Coef. Determinação): {r2:.4f}")
 print(f"MAE (Erro Abs. Médio):   R$ {mae:,.2f}")
@@ -1,23 +1,19 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.linear_model import LinearRegression
 import warnings
+from ingestao import carregar_vendas
+from metricas import calcular_prescritiva
 warnings.filterwarnings('ignore')
 
 # Configurações de visualização
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
-# Carregar dados
-df = pd.read_csv('vendas_rede_varejo.csv', sep=';', decimal=',')
-df['data_venda'] = pd.to_datetime(df['data_venda'])
-df.columns = df.columns.str.strip()
-
-# Calcular lucro
-df['lucro'] = df['valor_total'] - df['custo_total']
-df['margem_lucro'] = (df['lucro'] / df['valor_total']) * 100
+# Carregar dados (arquivo, glob ou manifesto definido em VENDAS_FONTE; datas já convertidas)
+df = carregar_vendas()
+# Cenário, modelo, grade de simulação e alocação: os mesmos de metricas_prescritiva (JSON/relatório)
+calculo = calcular_prescritiva(df)
 
 print("="*80)
 print("ANÁLISE PRESCRITIVA DE VENDAS")
@@ -29,9 +25,10 @@ print("="*80)
 print("\n" + "="*80)
 print("1. CENÁRIO ATUAL")
 print("="*80)
-print(f"Faturamento Total:     R$ {df['valor_total'].sum():,.2f}")
-print(f"Lucro Total:           R$ {df['lucro'].sum():,.2f}")
-print(f"Margem de Lucro Média: {df['margem_lucro'].mean():.2f}%")
+cenario_atual = calculo['cenario']
+print(f"Faturamento Total:     R$ {cenario_atual['faturamento']:,.2f}")
+print(f"Lucro Total:           R$ {cenario_atual['lucro']:,.2f}")
+print(f"Margem de Lucro Média: {cenario_atual['margem_lucro']:.2f}%")
 
 # ============================================================================
 # 2. MODELO PREDITIVO
@@ -40,15 +37,7 @@ print("\n" + "="*80)
 print("2. TREINAMENTO DO MODELO")
 print("="*80)
 
-df['tem_campanha'] = (df['campanha'] != 'Nenhuma').astype(int)
-
-X = df[['quantidade', 'preco_unitario', 'tem_campanha']]
-y = df['valor_total']
-
-modelo = LinearRegression()
-modelo.fit(X, y)
-
-print(f"✓ Modelo treinado (R² = {modelo.score(X, y):.4f})")
+print(f"✓ Modelo treinado (R² = {calculo['r2_modelo']:.4f})")
 
 # ============================================================================
 # 3. SIMULAÇÃO DE CENÁRIOS
@@ -57,24 +46,14 @@ print("\n" + "="*80)
 print("3. SIMULAÇÃO: MATRIZ QUANTIDADE × PREÇO")
 print("="*80)
 
-# Criar grade de simulação
-qtd_range = np.linspace(5, 30, 20)
-preco_range = np.linspace(100, 3000, 20)
-matriz_lucro = np.zeros((len(preco_range), len(qtd_range)))
-
-for i, preco in enumerate(preco_range):
-    for j, qtd in enumerate(qtd_range):
-        entrada = np.array([[qtd, preco, 1]])
-        valor_previsto = modelo.predict(entrada)[0]
-        custo_estimado = qtd * preco * 0.6
-        lucro = valor_previsto - custo_estimado
-        matriz_lucro[i, j] = lucro
-
-# Encontrar combinação ótima
-idx_max = np.unravel_index(matriz_lucro.argmax(), matriz_lucro.shape)
-preco_otimo = preco_range[idx_max[0]]
-qtd_otima = qtd_range[idx_max[1]]
-lucro_maximo = matriz_lucro[idx_max]
+# Grade 20 × 20 com campanha; lucro = valor previsto - custo estimado (60%)
+qtd_range, preco_range = calculo['qtd_range'], calculo['preco_range']
+matriz_lucro = calculo['matriz_lucro']
+
+# Combinação ótima
+preco_otimo = calculo['preco_otimo']
+qtd_otima = calculo['quantidade_otima']
+lucro_maximo = calculo['lucro_maximo_previsto']
 
 print(f"Combinação Ótima:")
 print(f"  • Quantidade:     {qtd_otima:.0f} unidades")
@@ -82,10 +61,35 @@ print(f"  • Preço:          R$ {preco_otimo:.2f}")
 print(f"  • Lucro Previsto: R$ {lucro_maximo:.2f}")
 
 # ============================================================================
-# 4. VISUALIZAÇÃO
+# 4. ALOCAÇÃO ÓTIMA DO ORÇAMENTO DE CAMPANHAS
+# ============================================================================
+print("\n" + "="*80)
+print("4. ALOCAÇÃO ÓTIMA DO ORÇAMENTO (CAMPANHA × CANAL × REGIÃO)")
+print("="*80)
+
+# Programa linear sobre a resposta histórica de cada segmento (ver alocacao_orcamento.py)
+segmentos = calculo['segmentos']
+precos_sombra, resumo = calculo['precos_sombra'], calculo['alocacao_resumo']
+
+print(f"Segmentos avaliados: {len(segmentos)} ({resumo['variaveis']} variáveis, "
+      f"{resumo['segundos'] * 1000:.0f} ms)")
+print(f"Orçamento (investimento histórico estimado): R$ {resumo['orcamento']:,.2f}")
+print(f"Investimento recomendado:                    R$ {resumo['investido']:,.2f}")
+print(f"Lucro líquido esperado:                      R$ {resumo['lucro_liquido']:,.2f}")
+print(f"Preço-sombra do orçamento: R$ {precos_sombra.loc['orcamento', 'preco_sombra']:.2f} "
+      f"por R$ 1 adicional")
+
+print("\nSegmentos que recebem investimento:")
+investidos = calculo['investidos']
+for (campanha, canal, regiao), linha in investidos.iterrows():
+    print(f"  • {campanha:20s} {canal:12s} {regiao:13s} R$ {linha['investimento']:>10,.2f} "
+          f"→ lucro incremental R$ {linha['lucro_incremental']:>10,.2f}")
+
+# ============================================================================
+# 5. VISUALIZAÇÃO
 # ============================================================================
 print("\n" + "="*80)
-print("4. GERANDO GRÁFICO")
+print("5. GERANDO GRÁFICO")
 print("="*80)
 
 # Heatmap - Matriz Quantidade × Preço (usando imshow)
@@ -0,0 +1,318 @@
+"""
+================================================================================
+LINHA DE COMANDO DAS ANÁLISES DE VENDAS
+================================================================================
+
+Uso:
+    python analise.py descritiva  [--no-plots] [--json] [--fonte ARQUIVO|GLOB]
+    python analise.py diagnostica [--no-plots] ...
+    python analise.py preditiva   [--no-plots] ...
+    python analise.py prescritiva [--no-plots] ...
+    python analise.py eda         [--no-plots] ...
+    python analise.py relatorio   [--no-plots] [--saida DIRETORIO]
+
+Recorte (todas as análises de vendas e o relatório):
+    --from 2025-10 --to 2025-12 --where regiao=Sul --where campanha!=Nenhuma
+
+Modo aproximado (descritiva e diagnóstica, somente métricas):
+    --aproximado [--amostra-por-estrato N] [--erro-alvo 0.02] [--confianca 0.95]
+Estimativas com intervalo de confiança a partir de amostras estratificadas
+mantidas em vendas_amostra.pkl (ver amostragem.py).
+
+Com --fonte apontando para um armazenamento particionado (particoes.py), as
+partições que não podem casar com o recorte são descartadas pelos mapas de
+zona antes de qualquer leitura; nas demais fontes o recorte filtra as linhas.
+
+Sem --no-plots, o subcomando roda o script original (analise-<nome>.py ou
+EDA/eda.py). Com --no-plots, só as métricas são calculadas (metricas.py):
+matplotlib e seaborn nunca são importados, e sklearn/scipy só quando a
+análise escolhida precisa deles.
+
+Este módulo importa apenas a biblioteca padrão no topo; todo o resto é
+importado dentro do subcomando. Antes de o cronômetro de importação parar,
+as dependências da análise escolhida são importadas explicitamente (as do
+topo do script, lidas pela AST, ou as que metricas.py importa sob demanda),
+para que a medição inclua matplotlib, seaborn, sklearn e scipy quando forem
+usados. --orcamento-importacao MS compara esse tempo contra um orçamento e
+termina com código 3 se ele for estourado; --tempo mostra as medições.
+Uma fonte ou recorte sem nenhuma venda termina com código 4 e uma mensagem,
+sem rodar a análise.
+================================================================================
+"""
+
+import time
+
+_INICIO = time.perf_counter()
+
+import argparse
+import ast
+import contextlib
+import importlib
+import json
+import os
+import runpy
+import sys
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+ANALISES = ('descritiva', 'diagnostica', 'preditiva', 'prescritiva', 'eda')
+MODULOS_PESADOS = ('matplotlib', 'seaborn', 'sklearn', 'scipy')
+
+# Módulos que cada função de metricas.py importa sob demanda
+DEPENDENCIAS_METRICAS = {
+    'descritiva': (),
+    'diagnostica': ('scipy.stats',),
+    'preditiva': ('sklearn.linear_model', 'sklearn.metrics', 'sklearn.model_selection'),
+    'prescritiva': ('sklearn.linear_model', 'alocacao_orcamento'),
+    'eda': (),
+}
+
+
+# ============================================================================
+# 1. MEDIÇÃO DE INICIALIZAÇÃO
+# ============================================================================
+
+class Cronometro:
+    """Separa o tempo de importação do tempo de cálculo de um subcomando."""
+
+    def __init__(self):
+        self.importacao = None
+        self.total = None
+
+    def fim_importacao(self):
+        self.importacao = time.perf_counter() - _INICIO
+
+    def fim(self):
+        self.total = time.perf_counter() - _INICIO
+
+    def resumo(self):
+        pesados = [m for m in MODULOS_PESADOS if m in sys.modules]
+        return (f"Importações: {self.importacao * 1000:.0f} ms | "
+                f"Total: {self.total * 1000:.0f} ms | "
+                f"Módulos pesados carregados: {', '.join(pesados) or 'nenhum'}")
+
+
+def _caminho_script(nome):
+    if nome == 'eda':
+        return os.path.join(DIRETORIO, 'EDA', 'eda.py')
+    return os.path.join(DIRETORIO, f'analise-{nome}.py')
+
+
+def _importacoes_do_script(caminho):
+    """Módulos importados no topo de um script, lidos pela AST sem executá-lo."""
+    with open(caminho, encoding='utf-8') as f:
+        arvore = ast.parse(f.read(), caminho)
+    for no in arvore.body:
+        if isinstance(no, ast.Import):
+            yield from (alias.name for alias in no.names)
+        elif isinstance(no, ast.ImportFrom) and no.level == 0:
+            yield no.module
+            # 'from scipy import stats': o submódulo também faz parte da conta
+            yield from (f"{no.module}.{alias.name}" for alias in no.names)
+
+
+def importar_dependencias(modulos):
+    """Importa os módulos (ignorando nomes que não são submódulos) antes de parar o cronômetro."""
+    for modulo in modulos:
+        try:
+            importlib.import_module(modulo)
+        except ModuleNotFoundError:
+            if '.' not in modulo or modulo.rpartition('.')[0] not in sys.modules:
+                raise
+
+
+class SemVendas(Exception):
+    """A fonte (ou o recorte pedido) não tem nenhuma venda para analisar."""
+
+
+def _exigir_vendas(n_vendas):
+    if n_vendas == 0:
+        import particoes
+        from ingestao import fonte_padrao
+
+        raise SemVendas(f"Nenhuma venda no recorte {particoes.Recorte.do_ambiente()!r} "
+                        f"da fonte '{fonte_padrao()}'")
+
+
+def _contar_vendas():
+    # Contagem preguiçosa: poda partições e lê uma coluna só
+    from consulta_lazy import vendas
+
+    contagem = vendas().agregar(n=('quantidade', 'count')).coletar()
+    # Sem nenhuma linha lida, a agregação total volta sem linhas
+    return int(contagem['n'].iloc[0]) if len(contagem) else 0
+
+
+@contextlib.contextmanager
+def _ambiente(**variaveis):
+    """Define as variáveis não nulas durante o bloco e restaura os valores anteriores."""
+    variaveis = {k: v for k, v in variaveis.items() if v is not None}
+    anteriores = {k: os.environ.get(k) for k in variaveis}
+    os.environ.update(variaveis)
+    try:
+        yield
+    finally:
+        for variavel, anterior in anteriores.items():
+            if anterior is None:
+                os.environ.pop(variavel, None)
+            else:
+                os.environ[variavel] = anterior
+
+
+# ============================================================================
+# 2. SUBCOMANDOS
+# ============================================================================
+
+def _imprimir(titulo, metricas, nivel=0):
+    if nivel == 0:
+        print("=" * 80)
+        print(titulo)
+        print("=" * 80)
+    recuo = "  " * nivel
+    for chave, valor in metricas.items():
+        if isinstance(valor, dict):
+            print(f"\n{recuo}{chave}:" if nivel == 0 else f"{recuo}{chave}:")
+            _imprimir(None, valor, nivel + 1)
+        elif isinstance(valor, float):
+            print(f"{recuo}{chave:30s}: {valor:,.4f}")
+        else:
+            print(f"{recuo}{chave:30s}: {valor}")
+
+
+def executar_metricas(nome, args, cronometro):
+    from ingestao import carregar_vendas
+    import metricas
+
+    if nome == 'eda':
+        importar_dependencias(DEPENDENCIAS_METRICAS[nome])
+        cronometro.fim_importacao()
+        resultado = metricas.metricas_eda(os.path.join(DIRETORIO, metricas.ARQUIVO_CENSO))
+    elif args.aproximado:
+        import amostragem
+
+        cronometro.fim_importacao()
+        amostra = amostragem.manter_amostra(capacidade=args.amostra_por_estrato)
+        _exigir_vendas(int(amostra.tamanhos.sum()))
+        resultado = amostragem.METRICAS_APROXIMADAS[nome](amostra, args.confianca, args.erro_alvo)
+    else:
+        importar_dependencias(DEPENDENCIAS_METRICAS[nome])
+        cronometro.fim_importacao()
+        df = carregar_vendas()
+        _exigir_vendas(len(df))
+        resultado = metricas.METRICAS[nome](df)
+
+    if args.json:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    else:
+        _imprimir(f"ANÁLISE {nome.upper()} - MÉTRICAS", resultado)
+
+
+def executar_script(nome, args, cronometro):
+    caminho = _caminho_script(nome)
+    importar_dependencias(_importacoes_do_script(caminho))
+    cronometro.fim_importacao()
+    if nome == 'eda':
+        # O EDA lê e grava arquivos relativos à própria pasta
+        anterior = os.getcwd()
+        os.chdir(os.path.dirname(caminho))
+        try:
+            runpy.run_path('eda.py', run_name='__main__')
+        finally:
+            os.chdir(anterior)
+        return
+    _exigir_vendas(_contar_vendas())
+    runpy.run_path(caminho, run_name='__main__')
+
+
+def executar_relatorio(args, cronometro):
+    import relatorio
+
+    for nome in relatorio.TITULOS:
+        importar_dependencias(DEPENDENCIAS_METRICAS[nome])
+        if not args.no_plots:
+            importar_dependencias(_importacoes_do_script(_caminho_script(nome)))
+    cronometro.fim_importacao()
+    _exigir_vendas(_contar_vendas())
+    caminho = relatorio.gerar_relatorio(diretorio=args.saida, com_graficos=not args.no_plots)
+    print(f"Relatório salvo em '{caminho}'")
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog='analise.py', description='Análises de vendas da rede de varejo')
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument('--fonte', default=None,
+                       help='arquivo, glob ou manifesto de extratos (padrão: VENDAS_FONTE ou o CSV)')
+    comum.add_argument('--from', dest='de', default=None, metavar='DATA',
+                       help='início do período (AAAA, AAAA-MM ou AAAA-MM-DD)')
+    comum.add_argument('--to', dest='ate', default=None, metavar='DATA',
+                       help='fim do período, inclusivo (AAAA, AAAA-MM ou AAAA-MM-DD)')
+    comum.add_argument('--where', dest='onde', action='append', default=[], metavar='CONDICAO',
+                       help="condição como 'regiao=Sul,Norte' ou 'quantidade>=5' (repetível)")
+    comum.add_argument('--no-plots', action='store_true',
+                       help='somente métricas, sem gráficos nem importação de matplotlib/seaborn')
+    comum.add_argument('--aproximado', action='store_true',
+                       help='descritiva/diagnóstica estimadas por amostra estratificada (implica --no-plots)')
+    comum.add_argument('--amostra-por-estrato', type=int, default=2000, metavar='N',
+                       help='vendas guardadas por canal × região × categoria (alvo de latência)')
+    comum.add_argument('--erro-alvo', type=float, default=None, metavar='FRACAO',
+                       help='meia-largura relativa máxima do IC; acima dela a tabela é recalculada exata')
+    comum.add_argument('--confianca', type=float, default=0.95, help='nível dos intervalos de confiança')
+    comum.add_argument('--json', action='store_true', help='métricas em JSON (com --no-plots)')
+    comum.add_argument('--tempo', action='store_true', help='mostra o tempo de importação')
+    comum.add_argument('--orcamento-importacao', type=float, default=None, metavar='MS',
+                       help='falha (código 3) se as importações passarem de MS milissegundos')
+
+    sub = parser.add_subparsers(dest='comando', required=True)
+    for nome in ANALISES:
+        sub.add_parser(nome, parents=[comum], help=f'análise {nome}')
+    rel = sub.add_parser('relatorio', parents=[comum], help='relatório HTML/JSON headless')
+    rel.add_argument('--saida', default='relatorio', help='diretório do relatório')
+    return parser
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    cronometro = Cronometro()
+
+    if args.aproximado:
+        if args.comando not in ('descritiva', 'diagnostica'):
+            parser.error('--aproximado vale só para descritiva e diagnostica')
+        args.no_plots = True
+
+    recorte = {}
+    if args.de or args.ate or args.onde:
+        if args.comando == 'eda':
+            parser.error('--from/--to/--where valem só para as análises de vendas')
+        import particoes
+        try:
+            particoes.Recorte(args.de, args.ate, args.onde)
+        except particoes.ErroRecorte as erro:
+            parser.error(str(erro))
+        recorte = {particoes.VARIAVEL_DE: args.de, particoes.VARIAVEL_ATE: args.ate,
+                   particoes.VARIAVEL_ONDE: ';'.join(args.onde) or None}
+
+    # Scripts, métricas e relatório leem a fonte e o recorte do ambiente
+    with _ambiente(VENDAS_FONTE=args.fonte, **recorte):
+        try:
+            if args.comando == 'relatorio':
+                executar_relatorio(args, cronometro)
+            elif args.no_plots:
+                executar_metricas(args.comando, args, cronometro)
+            else:
+                executar_script(args.comando, args, cronometro)
+        except SemVendas as erro:
+            print(f"✗ {erro}", file=sys.stderr)
+            return 4
+    cronometro.fim()
+
+    if args.tempo or args.orcamento_importacao is not None:
+        print(cronometro.resumo(), file=sys.stderr)
+    if args.orcamento_importacao is not None and cronometro.importacao * 1000 > args.orcamento_importacao:
+        print(f"✗ Orçamento de importação estourado: {cronometro.importacao * 1000:.0f} ms "
+              f"> {args.orcamento_importacao:.0f} ms", file=sys.stderr)
+        return 3
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+================================================================================
+MONITOR DE ANOMALIAS EM STREAMING (FATURAMENTO E MARGEM DIÁRIOS POR SEGMENTO)
+================================================================================
+
+Recebe as vendas em lotes, na ordem em que chegam, e mantém para cada série
+(um canal, uma região ou uma categoria; ou combinações configuradas em
+`familias`) os mesmos agregados diários da análise descritiva:
+
+- faturamento do dia (soma de valor_total);
+- margem do dia (lucro / faturamento × 100; indefinida em dia sem vendas).
+
+Quando um dia fecha, todas as séries são pontuadas de uma vez, com vetores
+NumPy, contra o estado acumulado até o dia anterior:
+
+1. média e variância EWMA (atualização O(1) por série);
+2. mediana e MAD de uma janela circular de `janela` dias (custo fixo por
+   série, independente do tamanho do histórico).
+
+Um ponto vira anomalia quando os dois escores passam dos limiares, depois de
+`aquecimento` dias observados na série. Vendas com data anterior ao dia em
+aberto chegam atrasadas: são contadas e descartadas.
+
+reproduzir() alimenta o monitor com um histórico ordenado por data e mede a
+vazão; `python anomalias.py --sintetico 20000` gera dezenas de milhares de
+séries com quedas injetadas para o benchmark.
+================================================================================
+"""
+
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+FAMILIAS = (('canal_venda',), ('regiao',), ('categoria_produto',))
+METRICAS = ('faturamento', 'margem')
+
+
+class MonitorAnomalias:
+    """Estado EWMA e janelas robustas de todas as séries, atualizado por dia."""
+
+    def __init__(self, familias=FAMILIAS, alfa=0.1, janela=28, aquecimento=14,
+                 limiar_z=3.0, limiar_robusto=3.5):
+        self.familias = [tuple(f) for f in familias]
+        self.alfa = alfa
+        self.janela = janela
+        self.aquecimento = aquecimento
+        self.limiar_z = limiar_z
+        self.limiar_robusto = limiar_robusto
+
+        self.ids = {}
+        self.series = []
+        self.dia_atual = None
+        self.dias_fechados = 0
+        self.eventos = 0
+        self.atrasados = 0
+        self.media = np.zeros((0, 2))
+        self.variancia = np.zeros((0, 2))
+        self.n_obs = np.zeros((0, 2))
+        self.historico = np.zeros((0, janela, 2))
+        self._valor_dia = np.zeros(0)
+        self._custo_dia = np.zeros(0)
+        self._capacidade = 0
+        self._crescer(64)
+
+    # ------------------------------------------------------------------
+    # Estado (vetores com capacidade dobrada conforme surgem séries)
+    # ------------------------------------------------------------------
+    def _crescer(self, n):
+        if n <= self._capacidade:
+            return
+        falta = max(n, 2 * self._capacidade) - self._capacidade
+
+        def estender(atual, valor):
+            return np.concatenate([atual, np.full((falta, *atual.shape[1:]), valor)])
+
+        self.media = estender(self.media, 0.0)
+        self.variancia = estender(self.variancia, 0.0)
+        self.n_obs = estender(self.n_obs, 0.0)
+        self.historico = estender(self.historico, np.nan)
+        self._valor_dia = estender(self._valor_dia, 0.0)
+        self._custo_dia = estender(self._custo_dia, 0.0)
+        self._capacidade += falta
+
+    def _ids_series(self, lote):
+        """Ids globais das séries de cada linha, uma coluna por família."""
+        colunas = []
+        for familia in self.familias:
+            if len(familia) == 1:
+                codigos, unicos = pd.factorize(lote[familia[0]])
+                unicos = [(u,) for u in unicos]
+            else:
+                codigos, unicos = pd.MultiIndex.from_frame(lote[list(familia)]).factorize()
+            mapa = np.empty(len(unicos), dtype=np.intp)
+            for i, chave in enumerate(unicos):
+                chave = (familia, tuple(map(str, chave)))
+                if chave not in self.ids:
+                    self.ids[chave] = len(self.series)
+                    self.series.append(chave)
+                mapa[i] = self.ids[chave]
+            colunas.append(mapa[codigos])
+        self._crescer(len(self.series))
+        return np.column_stack(colunas)
+
+    # ------------------------------------------------------------------
+    # Fluxo de eventos
+    # ------------------------------------------------------------------
+    def processar(self, lote):
+        """Acumula um lote de vendas; retorna as anomalias dos dias que fecharam."""
+        if len(lote) == 0:
+            return _sem_anomalias()
+        ids = self._ids_series(lote)
+        datas = lote['data_venda'].to_numpy(dtype='datetime64[D]')
+        valor = lote['valor_total'].to_numpy(dtype=float)
+        custo = lote['custo_total'].to_numpy(dtype=float)
+        self.eventos += len(lote)
+
+        anomalias = []
+        for dia in np.unique(datas):
+            if self.dia_atual is None:
+                self.dia_atual = dia
+            if dia < self.dia_atual:
+                self.atrasados += int(np.count_nonzero(datas == dia))
+                continue
+            if dia > self.dia_atual:
+                anomalias.append(self._fechar_dia())
+                self.dia_atual = dia
+            mascara = datas == dia
+            ids_dia = ids[mascara]
+            linhas = np.repeat(np.arange(ids_dia.shape[0]), ids_dia.shape[1])
+            ids_dia = ids_dia.ravel()
+            n = self._capacidade
+            self._valor_dia += np.bincount(ids_dia, weights=valor[mascara][linhas], minlength=n)
+            self._custo_dia += np.bincount(ids_dia, weights=custo[mascara][linhas], minlength=n)
+        return pd.concat(anomalias, ignore_index=True) if anomalias else _sem_anomalias()
+
+    def finalizar(self):
+        """Fecha o dia em aberto (fim do histórico ou do expediente)."""
+        if self.dia_atual is None:
+            return _sem_anomalias()
+        return self._fechar_dia()
+
+    def _fechar_dia(self):
+        n = len(self.series)
+        faturamento = self._valor_dia[:n]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            margem = np.where(faturamento > 0,
+                              (faturamento - self._custo_dia[:n]) / faturamento * 100, np.nan)
+        x = np.column_stack([faturamento, margem])
+        validos = ~np.isnan(x)
+
+        media, variancia, n_obs = self.media[:n], self.variancia[:n], self.n_obs[:n]
+        historico = self.historico[:n]
+        with warnings.catch_warnings():
+            # Séries novas ainda têm a janela toda vazia
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mediana = np.nanmedian(historico, axis=1)
+            mad = np.nanmedian(np.abs(historico - mediana[:, None, :]), axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            desvio = np.sqrt(variancia)
+            z = (x - media) / np.maximum(desvio, 1e-9)
+            # Janelas quase constantes (MAD ≈ 0, ex.: séries intermitentes) não geram escores infinitos
+            escala = np.maximum(1.4826 * mad, np.maximum(0.25 * desvio, 0.01 * np.abs(mediana)) + 1e-9)
+            z_robusto = (x - mediana) / escala
+        # Faturamento com mediana zero é intermitente: qualquer venda pareceria um pico
+        intermitente = np.zeros_like(validos)
+        intermitente[:, 0] = ~(mediana[:, 0] > 0)
+        alerta = (validos & ~intermitente & (n_obs >= self.aquecimento)
+                  & (np.abs(z) > self.limiar_z) & (np.abs(z_robusto) > self.limiar_robusto))
+        anomalias = self._anomalias(alerta, x, mediana, z, z_robusto)
+
+        # Atualização incremental (EWMA de West) e janela circular
+        delta = np.where(validos, x - media, 0.0)
+        incremento = self.alfa * delta
+        primeira = validos & (n_obs == 0)
+        media += incremento
+        variancia[:] = np.where(validos, (1 - self.alfa) * (variancia + delta * incremento), variancia)
+        media[primeira] = x[primeira]
+        variancia[primeira] = 0.0
+        n_obs += validos
+        historico[:, self.dias_fechados % self.janela, :] = x
+
+        self.dias_fechados += 1
+        self._valor_dia[:] = 0.0
+        self._custo_dia[:] = 0.0
+        return anomalias
+
+    def _anomalias(self, alerta, x, mediana, z, z_robusto):
+        series, metricas = np.nonzero(alerta)
+        if len(series) == 0:
+            return _sem_anomalias()
+        return pd.DataFrame({
+            'data': pd.Timestamp(self.dia_atual),
+            'familia': ['×'.join(self.series[s][0]) for s in series],
+            'segmento': [' / '.join(self.series[s][1]) for s in series],
+            'metrica': np.array(METRICAS)[metricas],
+            'valor': x[series, metricas],
+            'esperado': mediana[series, metricas],
+            'z_ewma': z[series, metricas],
+            'z_robusto': z_robusto[series, metricas],
+            'direcao': np.where(z_robusto[series, metricas] < 0, 'queda', 'alta'),
+        })
+
+
+def _sem_anomalias():
+    return pd.DataFrame(columns=['data', 'familia', 'segmento', 'metrica', 'valor',
+                                 'esperado', 'z_ewma', 'z_robusto', 'direcao'])
+
+
+# ============================================================================
+# REPRODUÇÃO DO HISTÓRICO (BENCHMARK)
+# ============================================================================
+
+def reproduzir(df, monitor=None, tamanho_lote=10_000):
+    """Alimenta o monitor com o histórico em ordem de data; retorna (anomalias, estatísticas)."""
+    monitor = MonitorAnomalias() if monitor is None else monitor
+    df = df.sort_values('data_venda', kind='stable')
+    partes = []
+    inicio = time.perf_counter()
+    for i in range(0, len(df), tamanho_lote):
+        partes.append(monitor.processar(df.iloc[i:i + tamanho_lote]))
+    partes.append(monitor.finalizar())
+    decorrido = time.perf_counter() - inicio
+    partes = [p for p in partes if len(p)]
+    anomalias = pd.concat(partes, ignore_index=True) if partes else _sem_anomalias()
+    return anomalias, {
+        'eventos': monitor.eventos,
+        'series': len(monitor.series),
+        'dias': monitor.dias_fechados,
+        'atrasados': monitor.atrasados,
+        'segundos': decorrido,
+        'eventos_por_segundo': monitor.eventos / decorrido if decorrido else float('inf'),
+    }
+
+
+def gerar_vendas_sinteticas(n_categorias=20_000, n_dias=120, vendas_por_dia=50_000,
+                            n_quedas=50, semente=42):
+    """Vendas sintéticas com muitas categorias e quedas de 90% injetadas no fim do período.
+
+    Retorna (df, categorias_com_queda, primeiro_dia_da_queda).
+    """
+    rng = np.random.default_rng(semente)
+    n = n_dias * vendas_por_dia
+    dias = pd.date_range('2025-01-01', periods=n_dias, freq='D')
+    dia = np.repeat(np.arange(n_dias), vendas_por_dia)
+    popularidade = rng.pareto(1.5, n_categorias) + 1
+    categoria = rng.choice(n_categorias, n, p=popularidade / popularidade.sum())
+    valor = rng.gamma(2.0, 250.0, n)
+
+    # Só categorias com volume suficiente para a queda ser detectável
+    grandes = np.argsort(popularidade)[::-1][:n_quedas * 4]
+    quedas = rng.choice(grandes, n_quedas, replace=False)
+    inicio_queda = n_dias - 7
+    afetadas = np.isin(categoria, quedas) & (dia >= inicio_queda)
+    valor[afetadas] *= 0.1
+
+    df = pd.DataFrame({
+        'data_venda': dias[dia],
+        'canal_venda': np.array(['App', 'E-commerce', 'Loja Física'])[rng.integers(0, 3, n)],
+        'regiao': np.array(['Centro-Oeste', 'Nordeste', 'Norte', 'Sudeste', 'Sul'])[rng.integers(0, 5, n)],
+        'categoria_produto': np.char.add('Categoria ', np.char.zfill(categoria.astype(str), 5)),
+        'valor_total': valor,
+        'custo_total': valor * rng.uniform(0.5, 0.8, n),
+    })
+    nomes = [f'Categoria {c:05d}' for c in quedas]
+    return df, nomes, dias[inicio_queda]
+
+
+if __name__ == '__main__':
+    import sys
+
+    print("="*80)
+    print("MONITOR DE ANOMALIAS - REPRODUÇÃO DO HISTÓRICO")
+    print("="*80)
+
+    if '--sintetico' in sys.argv:
+        posicao = sys.argv.index('--sintetico')
+        n_categorias = int(sys.argv[posicao + 1]) if len(sys.argv) > posicao + 1 else 20_000
+        df, com_queda, inicio_queda = gerar_vendas_sinteticas(n_categorias)
+        print(f"Vendas sintéticas: {len(df):,} eventos, {n_categorias:,} categorias, "
+              f"{len(com_queda)} quedas injetadas a partir de {inicio_queda:%d/%m/%Y}")
+        anomalias, estatisticas = reproduzir(df, tamanho_lote=100_000)
+    else:
+        from ingestao import carregar_vendas
+
+        df = carregar_vendas()
+        com_queda = None
+        anomalias, estatisticas = reproduzir(df, tamanho_lote=50)
+
+    print(f"\nEventos:          {estatisticas['eventos']:,}")
+    print(f"Séries:           {estatisticas['series']:,}")
+    print(f"Dias fechados:    {estatisticas['dias']}")
+    print(f"Tempo:            {estatisticas['segundos']:.2f}s "
+          f"({estatisticas['eventos_por_segundo']:,.0f} eventos/s)")
+    print(f"Anomalias:        {len(anomalias)}")
+
+    if com_queda is not None:
+        quedas = anomalias[(anomalias['metrica'] == 'faturamento')
+                           & (anomalias['direcao'] == 'queda')
+                           & (anomalias['data'] >= inicio_queda)]
+        detectadas = set(quedas['segmento']) & set(com_queda)
+        print(f"Quedas injetadas detectadas: {len(detectadas)} de {len(com_queda)}")
+    elif len(anomalias):
+        print("\nÚltimas anomalias:")
+        print(anomalias.tail(10).round(2).to_string(index=False))
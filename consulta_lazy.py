@@ -0,0 +1,579 @@
+"""
+================================================================================
+CONSULTA PREGUIÇOSA (LAZY) SOBRE A TABELA DE VENDAS
+================================================================================
+
+As colunas derivadas (lucro, margem_lucro, tem_campanha) são declaradas uma
+única vez em DERIVADAS. Filtros, agrupamentos e agregações apenas montam um
+plano; nada é lido até coletar() ser chamado. Na execução o plano é otimizado:
+
+1. Projeção empurrada para a leitura: só as colunas base usadas são lidas.
+2. Predicados empurrados para a leitura: linhas descartadas antes de qualquer
+   derivação.
+3. Derivação fundida à agregação: as colunas derivadas são calculadas bloco a
+   bloco dentro do acumulador e nunca viram colunas do DataFrame.
+
+Sobre arquivos, o recorte das variáveis VENDAS_DE, VENDAS_ATE e VENDAS_ONDE
+(particoes.Recorte) entra como mais um predicado, e num armazenamento
+particionado as partições que não podem casar nem são abertas, como em
+ingestao.carregar_vendas.
+
+Exemplo:
+    q = (vendas()
+         .filtrar(col('campanha') == 'Natal')
+         .agrupar('canal_venda')
+         .agregar(lucro_total=('lucro', 'sum'), margem=('margem_lucro', 'mean')))
+    print(q.plano())
+    q.coletar()
+================================================================================
+"""
+
+import copy
+import operator
+
+import numpy as np
+import pandas as pd
+
+ARQUIVO_VENDAS = 'vendas_rede_varejo.csv'
+
+COLUNAS_VENDAS = ['data_venda', 'canal_venda', 'regiao', 'categoria_produto',
+                  'quantidade', 'preco_unitario', 'valor_total', 'custo_total',
+                  'campanha', 'satisfacao_cliente']
+
+_OPERADORES = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '&': operator.and_,
+    '|': operator.or_,
+}
+
+
+# ============================================================================
+# EXPRESSÕES
+# ============================================================================
+
+class Expr:
+    """Nó de uma expressão de coluna avaliada de forma vetorizada."""
+
+    def colunas(self):
+        raise NotImplementedError
+
+    def avaliar(self, dados):
+        raise NotImplementedError
+
+    def substituir(self, derivadas):
+        return self
+
+    def _binaria(self, op, outro, invertida=False):
+        outro = outro if isinstance(outro, Expr) else Literal(outro)
+        if invertida:
+            return Binaria(op, outro, self)
+        return Binaria(op, self, outro)
+
+    def __add__(self, outro): return self._binaria('+', outro)
+    def __radd__(self, outro): return self._binaria('+', outro, True)
+    def __sub__(self, outro): return self._binaria('-', outro)
+    def __rsub__(self, outro): return self._binaria('-', outro, True)
+    def __mul__(self, outro): return self._binaria('*', outro)
+    def __rmul__(self, outro): return self._binaria('*', outro, True)
+    def __truediv__(self, outro): return self._binaria('/', outro)
+    def __rtruediv__(self, outro): return self._binaria('/', outro, True)
+    def __eq__(self, outro): return self._binaria('==', outro)
+    def __ne__(self, outro): return self._binaria('!=', outro)
+    def __lt__(self, outro): return self._binaria('<', outro)
+    def __le__(self, outro): return self._binaria('<=', outro)
+    def __gt__(self, outro): return self._binaria('>', outro)
+    def __ge__(self, outro): return self._binaria('>=', outro)
+    def __and__(self, outro): return self._binaria('&', outro)
+    def __or__(self, outro): return self._binaria('|', outro)
+
+    __hash__ = object.__hash__
+
+    def __abs__(self):
+        return Absoluto(self)
+
+    def isin(self, valores):
+        return Pertence(self, tuple(valores))
+
+    def como(self, tipo):
+        return Conversao(self, tipo)
+
+
+class Coluna(Expr):
+    def __init__(self, nome):
+        self.nome = nome
+
+    def colunas(self):
+        return {self.nome}
+
+    def avaliar(self, dados):
+        return dados[self.nome]
+
+    def substituir(self, derivadas):
+        if self.nome in derivadas:
+            return derivadas[self.nome].substituir(derivadas)
+        return self
+
+    def __repr__(self):
+        return self.nome
+
+
+class Literal(Expr):
+    def __init__(self, valor):
+        self.valor = valor
+
+    def colunas(self):
+        return set()
+
+    def avaliar(self, dados):
+        return self.valor
+
+    def __repr__(self):
+        return repr(self.valor)
+
+
+class Binaria(Expr):
+    def __init__(self, op, esquerda, direita):
+        self.op = op
+        self.esquerda = esquerda
+        self.direita = direita
+
+    def colunas(self):
+        return self.esquerda.colunas() | self.direita.colunas()
+
+    def avaliar(self, dados):
+        a = self.esquerda.avaliar(dados)
+        b = self.direita.avaliar(dados)
+        a, b = _alinhar_datas(a, b)
+        return _OPERADORES[self.op](a, b)
+
+    def substituir(self, derivadas):
+        return Binaria(self.op, self.esquerda.substituir(derivadas),
+                       self.direita.substituir(derivadas))
+
+    def __repr__(self):
+        return f'({self.esquerda!r} {self.op} {self.direita!r})'
+
+
+class Pertence(Expr):
+    def __init__(self, expr, valores):
+        self.expr = expr
+        self.valores = valores
+
+    def colunas(self):
+        return self.expr.colunas()
+
+    def avaliar(self, dados):
+        x = self.expr.avaliar(dados)
+        if isinstance(x, pd.Series) and isinstance(x.dtype, pd.CategoricalDtype):
+            # Domínio conferido uma vez por categoria; códigos -1 (ausentes) caem no False final
+            pertence = np.append(x.cat.categories.isin(self.valores), False)
+            return pd.Series(pertence[x.cat.codes.to_numpy()], index=x.index)
+        if isinstance(x, pd.Series):
+            return x.isin(self.valores)
+        return pd.Series(x).isin(self.valores).to_numpy()
+
+    def substituir(self, derivadas):
+        return Pertence(self.expr.substituir(derivadas), self.valores)
+
+    def __repr__(self):
+        return f'{self.expr!r} in {list(self.valores)!r}'
+
+
+class Absoluto(Expr):
+    def __init__(self, expr):
+        self.expr = expr
+
+    def colunas(self):
+        return self.expr.colunas()
+
+    def avaliar(self, dados):
+        return abs(self.expr.avaliar(dados))
+
+    def substituir(self, derivadas):
+        return Absoluto(self.expr.substituir(derivadas))
+
+    def __repr__(self):
+        return f'abs{self.expr!r}'
+
+
+class Conversao(Expr):
+    def __init__(self, expr, tipo):
+        self.expr = expr
+        self.tipo = tipo
+
+    def colunas(self):
+        return self.expr.colunas()
+
+    def avaliar(self, dados):
+        return self.expr.avaliar(dados).astype(self.tipo)
+
+    def substituir(self, derivadas):
+        return Conversao(self.expr.substituir(derivadas), self.tipo)
+
+    def __repr__(self):
+        return f'{self.tipo.__name__}{self.expr!r}'
+
+
+def _alinhar_datas(a, b):
+    # Permite comparar colunas de data com literais 'AAAA-MM-DD'
+    if isinstance(b, str) and getattr(a, 'dtype', None) is not None and a.dtype.kind == 'M':
+        b = np.datetime64(b)
+    if isinstance(a, str) and getattr(b, 'dtype', None) is not None and b.dtype.kind == 'M':
+        a = np.datetime64(a)
+    return a, b
+
+
+def col(nome):
+    return Coluna(nome)
+
+
+def lit(valor):
+    return Literal(valor)
+
+
+# Colunas derivadas, declaradas uma única vez para todas as análises
+DERIVADAS = {
+    'lucro': col('valor_total') - col('custo_total'),
+    'margem_lucro': (col('lucro') / col('valor_total')) * 100,
+    'tem_campanha': (col('campanha') != 'Nenhuma').como(int),
+}
+
+
+def derivar_coluna(df, nome, derivadas=DERIVADAS):
+    """Avalia uma coluna derivada diretamente sobre um DataFrame já carregado."""
+    return derivadas[nome].substituir(derivadas).avaliar(df)
+
+
+# ============================================================================
+# ACUMULADOR DE AGREGAÇÕES (FUNDIDO COM A DERIVAÇÃO)
+# ============================================================================
+
+_FUNCOES = ('sum', 'mean', 'count', 'std', 'min', 'max')
+
+
+class _Acumulador:
+    """Estado parcial de uma agregação por grupo, combinável entre blocos."""
+
+    def __init__(self, funcao):
+        if funcao not in _FUNCOES:
+            raise ValueError(f"Função de agregação desconhecida: {funcao!r} "
+                             f"(use uma de {', '.join(_FUNCOES)})")
+        self.funcao = funcao
+        self.contagem = np.zeros(0)
+        self.media = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.soma = np.zeros(0)
+        self.minimo = np.zeros(0)
+        self.maximo = np.zeros(0)
+
+    def _crescer(self, n):
+        falta = n - len(self.contagem)
+        if falta <= 0:
+            return
+        self.contagem = np.concatenate([self.contagem, np.zeros(falta)])
+        self.media = np.concatenate([self.media, np.zeros(falta)])
+        self.m2 = np.concatenate([self.m2, np.zeros(falta)])
+        self.soma = np.concatenate([self.soma, np.zeros(falta)])
+        self.minimo = np.concatenate([self.minimo, np.full(falta, np.inf)])
+        self.maximo = np.concatenate([self.maximo, np.full(falta, -np.inf)])
+
+    def atualizar(self, codigos, valores, n_grupos):
+        self._crescer(n_grupos)
+        valores = np.asarray(valores, dtype=float)
+        validos = ~np.isnan(valores)
+        codigos, valores = codigos[validos], valores[validos]
+
+        n_b = np.bincount(codigos, minlength=n_grupos).astype(float)
+        soma_b = np.bincount(codigos, weights=valores, minlength=n_grupos)
+        self.soma += soma_b
+
+        if self.funcao in ('mean', 'std'):
+            # Combinação de médias e M2 por bloco (Chan et al.)
+            media_b = np.divide(soma_b, n_b, out=np.zeros(n_grupos), where=n_b > 0)
+            m2_b = np.bincount(codigos, weights=(valores - media_b[codigos]) ** 2,
+                               minlength=n_grupos)
+            n_total = self.contagem + n_b
+            delta = media_b - self.media
+            peso = np.divide(n_b, n_total, out=np.zeros(n_grupos), where=n_total > 0)
+            self.media = self.media + delta * peso
+            self.m2 = self.m2 + m2_b + delta ** 2 * self.contagem * peso
+        elif self.funcao == 'min':
+            np.minimum.at(self.minimo, codigos, valores)
+        elif self.funcao == 'max':
+            np.maximum.at(self.maximo, codigos, valores)
+
+        self.contagem += n_b
+
+    def resultado(self):
+        vazio = self.contagem == 0
+        if self.funcao == 'sum':
+            return self.soma
+        if self.funcao == 'count':
+            return self.contagem.astype(int)
+        if self.funcao == 'mean':
+            return np.where(vazio, np.nan, self.media)
+        if self.funcao == 'std':
+            return np.where(self.contagem > 1,
+                            self.m2 / np.maximum(self.contagem - 1, 1), np.nan) ** 0.5
+        if self.funcao == 'min':
+            return np.where(vazio, np.nan, self.minimo)
+        return np.where(vazio, np.nan, self.maximo)
+
+
+# ============================================================================
+# PLANO DE CONSULTA
+# ============================================================================
+
+class Consulta:
+    """Plano preguiçoso de filtros, agrupamentos e agregações sobre as vendas."""
+
+    def __init__(self, fonte=None, derivadas=None, tamanho_bloco=None):
+        self.fonte = fonte
+        self.derivadas = dict(DERIVADAS if derivadas is None else derivadas)
+        self.tamanho_bloco = tamanho_bloco
+        self.filtros = []
+        self.chaves = []
+        self.agregacoes = {}
+        self.projecao = None
+
+    def _copiar(self):
+        nova = copy.copy(self)
+        nova.derivadas = dict(self.derivadas)
+        nova.filtros = list(self.filtros)
+        nova.chaves = list(self.chaves)
+        nova.agregacoes = dict(self.agregacoes)
+        return nova
+
+    # ------------------------------------------------------------------
+    # Construção do plano
+    # ------------------------------------------------------------------
+    def derivar(self, **expressoes):
+        nova = self._copiar()
+        nova.derivadas.update(expressoes)
+        return nova
+
+    def filtrar(self, predicado):
+        nova = self._copiar()
+        nova.filtros.append(predicado)
+        return nova
+
+    def selecionar(self, *colunas):
+        nova = self._copiar()
+        nova.projecao = list(colunas)
+        return nova
+
+    def agrupar(self, *chaves):
+        nova = self._copiar()
+        nova.chaves = list(chaves)
+        return nova
+
+    def agregar(self, **agregacoes):
+        """Recebe saida=(coluna_ou_expressao, funcao), como em DataFrame.agg."""
+        nova = self._copiar()
+        for saida, (alvo, funcao) in agregacoes.items():
+            if funcao not in _FUNCOES:
+                raise ValueError(f"Função de agregação desconhecida: {funcao!r} "
+                                 f"(use uma de {', '.join(_FUNCOES)})")
+            nova.agregacoes[saida] = (alvo, funcao)
+        return nova
+
+    # ------------------------------------------------------------------
+    # Otimização
+    # ------------------------------------------------------------------
+    def _resolver(self, alvo):
+        expr = alvo if isinstance(alvo, Expr) else col(alvo)
+        return expr.substituir(self.derivadas)
+
+    def _recorte(self):
+        """Recorte das variáveis de ambiente (VENDAS_DE/ATE/ONDE); não vale para DataFrames."""
+        if isinstance(self.fonte, pd.DataFrame):
+            return None
+        from particoes import Recorte
+        recorte = Recorte.do_ambiente()
+        return None if recorte.vazio else recorte
+
+    def _arquivos(self, recorte):
+        # Armazenamento particionado: só as partições que podem casar com o recorte
+        import particoes
+        from ingestao import fonte_padrao, listar_arquivos
+        fonte = fonte_padrao() if self.fonte is None else self.fonte
+        if particoes.e_particionado(fonte):
+            return particoes.podar(fonte, recorte)
+        return listar_arquivos(fonte)
+
+    def _otimizar(self, recorte=None):
+        # Todos os predicados viram uma única máscara avaliada logo após a leitura
+        predicado = None
+        filtros = self.filtros if recorte is None else [recorte.expr(), *self.filtros]
+        for filtro in filtros:
+            filtro = self._resolver(filtro)
+            predicado = filtro if predicado is None else (predicado & filtro)
+
+        chaves = [(str(c), self._resolver(c)) for c in self.chaves]
+        if self.agregacoes:
+            saidas = {nome: (self._resolver(alvo), funcao)
+                      for nome, (alvo, funcao) in self.agregacoes.items()}
+        else:
+            projecao = self.projecao if self.projecao is not None else [
+                c for c in COLUNAS_VENDAS]
+            saidas = {nome: (self._resolver(nome), None) for nome in projecao}
+
+        necessarias = set()
+        if predicado is not None:
+            necessarias |= predicado.colunas()
+        for _, expr in chaves:
+            necessarias |= expr.colunas()
+        for expr, _ in saidas.values():
+            necessarias |= expr.colunas()
+
+        desconhecidas = necessarias - set(COLUNAS_VENDAS)
+        if desconhecidas:
+            raise KeyError(f"Colunas inexistentes na tabela de vendas: {sorted(desconhecidas)}")
+
+        colunas = [c for c in COLUNAS_VENDAS if c in necessarias]
+        return predicado, chaves, saidas, colunas
+
+    def plano(self):
+        """Descreve o plano otimizado, do topo (resultado) até a leitura."""
+        recorte = self._recorte()
+        predicado, chaves, saidas, colunas = self._otimizar(recorte)
+        if isinstance(self.fonte, pd.DataFrame):
+            fonte = 'DataFrame em memória'
+        else:
+            arquivos = self._arquivos(recorte)
+            fonte = arquivos[0] if len(arquivos) == 1 else f"{len(arquivos)} arquivos"
+        linhas = []
+        if self.agregacoes:
+            por = ', '.join(nome for nome, _ in chaves) or '(total)'
+            linhas.append(f"AGREGAR por [{por}] (derivação fundida)")
+            for nome, (expr, funcao) in saidas.items():
+                linhas.append(f"    {nome} = {funcao}{expr!r}")
+        else:
+            linhas.append("PROJETAR")
+            for nome, (expr, _) in saidas.items():
+                linhas.append(f"    {nome} = {expr!r}")
+        if predicado is not None:
+            linhas.append(f"  FILTRAR {predicado!r} (empurrado para a leitura)")
+        linhas.append(f"    LER {fonte} colunas={colunas}")
+        return '\n'.join(linhas)
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+    def _blocos(self, colunas, recorte=None):
+        if isinstance(self.fonte, pd.DataFrame):
+            df = self.fonte
+            passo = self.tamanho_bloco or max(len(df), 1)
+            for inicio in range(0, len(df), passo):
+                yield df.iloc[inicio:inicio + passo][colunas]
+            return
+
+        # Arquivo, glob ou manifesto: cada extrato é lido só com as colunas usadas
+        for caminho in self._arquivos(recorte):
+            leitor = pd.read_csv(caminho, sep=';', decimal=',',
+                                 usecols=lambda c: c.strip() in colunas,
+                                 chunksize=self.tamanho_bloco)
+            for bloco in ([leitor] if self.tamanho_bloco is None else leitor):
+                bloco.columns = bloco.columns.str.strip()
+                if 'data_venda' in bloco.columns:
+                    bloco['data_venda'] = pd.to_datetime(bloco['data_venda'])
+                yield bloco
+
+    def coletar(self):
+        recorte = self._recorte()
+        predicado, chaves, saidas, colunas = self._otimizar(recorte)
+
+        if not self.agregacoes:
+            partes = []
+            for bloco in self._blocos(colunas, recorte):
+                dados = {c: bloco[c].to_numpy() for c in colunas}
+                if predicado is not None:
+                    mascara = np.asarray(predicado.avaliar(dados), dtype=bool)
+                    dados = {c: v[mascara] for c, v in dados.items()}
+                partes.append(pd.DataFrame({nome: expr.avaliar(dados)
+                                            for nome, (expr, _) in saidas.items()}))
+            if not partes:
+                return pd.DataFrame(columns=list(saidas))
+            return pd.concat(partes, ignore_index=True)
+
+        ids = {}
+        acumuladores = {nome: _Acumulador(funcao) for nome, (_, funcao) in saidas.items()}
+
+        for bloco in self._blocos(colunas, recorte):
+            dados = {c: bloco[c].to_numpy() for c in colunas}
+            if predicado is not None:
+                mascara = np.asarray(predicado.avaliar(dados), dtype=bool)
+                dados = {c: v[mascara] for c, v in dados.items()}
+            n_linhas = len(next(iter(dados.values()))) if dados else 0
+            if n_linhas == 0:
+                continue
+
+            # Códigos de grupo locais ao bloco -> ids globais
+            if chaves:
+                arrays = [np.asarray(expr.avaliar(dados)) for _, expr in chaves]
+                if len(arrays) == 1:
+                    codigos, unicos = pd.factorize(arrays[0])
+                    unicos = [(u,) for u in unicos]
+                else:
+                    codigos, unicos = pd.MultiIndex.from_arrays(arrays).factorize()
+                    unicos = list(unicos)
+                validos = codigos >= 0
+                mapa = np.array([ids.setdefault(u, len(ids)) for u in unicos], dtype=np.intp)
+                codigos_globais = mapa[codigos[validos]] if len(mapa) else codigos[validos]
+            else:
+                validos = np.ones(n_linhas, dtype=bool)
+                ids.setdefault((), 0)
+                codigos_globais = np.zeros(n_linhas, dtype=np.intp)
+
+            for nome, (expr, _) in saidas.items():
+                valores = expr.avaliar(dados)
+                valores = np.broadcast_to(np.asarray(valores, dtype=float), (n_linhas,))
+                acumuladores[nome].atualizar(codigos_globais, valores[validos], len(ids))
+
+        resultado = pd.DataFrame({nome: acc.resultado()[:len(ids)]
+                                  if len(acc.contagem) else np.zeros(len(ids))
+                                  for nome, acc in acumuladores.items()})
+        if chaves:
+            nomes = [nome for nome, _ in chaves]
+            tuplas = list(ids)
+            if len(nomes) == 1:
+                indice = pd.Index([t[0] for t in tuplas], name=nomes[0])
+            else:
+                indice = pd.MultiIndex.from_tuples(tuplas, names=nomes)
+            resultado.index = indice
+            return resultado.sort_index()
+        return resultado
+
+
+def vendas(fonte=None, tamanho_bloco=None):
+    """Ponto de entrada: consulta preguiçosa sobre a tabela de vendas.
+
+    `fonte` pode ser um DataFrame, um arquivo, um glob, um manifesto ou uma
+    lista de arquivos (ver ingestao.listar_arquivos); None usa a fonte padrão.
+    """
+    return Consulta(fonte, tamanho_bloco=tamanho_bloco)
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("CONSULTA PREGUIÇOSA - LUCRO E MARGEM POR CANAL")
+    print("="*80)
+
+    consulta = (vendas()
+                .agrupar('canal_venda')
+                .agregar(lucro_total=('lucro', 'sum'),
+                         lucro_medio=('lucro', 'mean'),
+                         margem_media=('margem_lucro', 'mean'),
+                         vendas=('lucro', 'count')))
+    print("\nPlano otimizado:")
+    print(consulta.plano())
+    print("\n", consulta.coletar().round(2))
@@ -0,0 +1,208 @@
+"""
+================================================================================
+IMPACTO DAS CAMPANHAS (UPLIFT) COM INTERVALOS BOOTSTRAP
+================================================================================
+
+Estima o efeito de cada campanha contra 'Nenhuma' numa regressão com efeitos
+fixos de canal, região e categoria:
+
+    medida ~ campanha + canal_venda + regiao + categoria_produto
+
+Como todas as variáveis explicativas são categóricas, o ajuste depende apenas
+de contagem e soma da medida em cada célula (combinação de níveis). Isso
+permite:
+
+1. Bootstrap exato por matriz de índices: cada bloco de réplicas sorteia uma
+   matriz de índices, acumula contagem/soma por célula com um único bincount
+   e resolve todas as equações normais do bloco de uma vez.
+2. Bootstrap por células (método 'celulas'): sorteia diretamente as contagens
+   multinomiais e as somas por célula (aproximação normal), com custo que
+   independe do número de linhas. Usado automaticamente em bases grandes.
+
+Os blocos de réplicas são distribuídos num pool de processos.
+================================================================================
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from consulta_lazy import vendas
+
+DIMENSOES_CONTROLE = ('canal_venda', 'regiao', 'categoria_produto')
+CAMPANHA_BASE = 'Nenhuma'
+
+# Acima deste número de (réplicas × linhas) o modo 'auto' usa o método por células
+LIMITE_INDICES = 2e8
+
+_dados_trabalhador = {}
+
+
+# ============================================================================
+# 1. CÉLULAS E MATRIZ DE DELINEAMENTO
+# ============================================================================
+
+def _preparar(df, medida):
+    dimensoes = ['campanha', *DIMENSOES_CONTROLE]
+    codigos, celulas = pd.MultiIndex.from_frame(df[dimensoes]).factorize()
+    celulas = celulas.set_names(dimensoes).to_frame(index=False)
+
+    niveis_campanha = [CAMPANHA_BASE] + sorted(
+        c for c in celulas['campanha'].unique() if c != CAMPANHA_BASE)
+    if CAMPANHA_BASE not in set(celulas['campanha']):
+        raise ValueError(f"Não há vendas sem campanha ('{CAMPANHA_BASE}') para comparar")
+
+    colunas = [np.ones(len(celulas))]
+    for nivel in niveis_campanha[1:]:
+        colunas.append((celulas['campanha'] == nivel).to_numpy(float))
+    for dimensao in DIMENSOES_CONTROLE:
+        for nivel in sorted(celulas[dimensao].unique())[1:]:
+            colunas.append((celulas[dimensao] == nivel).to_numpy(float))
+    X = np.column_stack(colunas)
+
+    y = np.asarray(df[medida], dtype=float)
+    return codigos.astype(np.intp), y, X, niveis_campanha[1:]
+
+
+def _resolver_lote(X, contagens, somas, ridge=1e-8):
+    """Resolve em lote (X' N X) b = X' s para cada linha de contagens/somas."""
+    XtNX = np.einsum('bc,cp,cq->bpq', contagens, X, X)
+    XtS = somas @ X
+    XtNX += ridge * np.eye(X.shape[1])
+    return np.linalg.solve(XtNX, XtS[..., None])[..., 0]
+
+
+# ============================================================================
+# 2. BOOTSTRAP (EXECUTADO NOS PROCESSOS DO POOL)
+# ============================================================================
+
+def _iniciar_trabalhador(codigos, y, X):
+    n_celulas = X.shape[0]
+    _dados_trabalhador['codigos'] = codigos
+    _dados_trabalhador['y'] = y
+    _dados_trabalhador['X'] = X
+    contagem = np.bincount(codigos, minlength=n_celulas).astype(float)
+    soma = np.bincount(codigos, weights=y, minlength=n_celulas)
+    soma_quad = np.bincount(codigos, weights=y ** 2, minlength=n_celulas)
+    media = np.divide(soma, contagem, out=np.zeros(n_celulas), where=contagem > 0)
+    variancia = np.divide(soma_quad, contagem, out=np.zeros(n_celulas),
+                          where=contagem > 0) - media ** 2
+    _dados_trabalhador['media'] = media
+    _dados_trabalhador['variancia'] = np.maximum(variancia, 0.0)
+    _dados_trabalhador['proporcao'] = contagem / contagem.sum()
+
+
+def _replicas_indices(semente, n_replicas, elementos_por_lote=4_000_000):
+    codigos, y, X = (_dados_trabalhador[k] for k in ('codigos', 'y', 'X'))
+    n, n_celulas = len(y), X.shape[0]
+    tamanho_lote = max(1, elementos_por_lote // n)
+    rng = np.random.default_rng(semente)
+    resultados = []
+    for inicio in range(0, n_replicas, tamanho_lote):
+        b = min(tamanho_lote, n_replicas - inicio)
+        indices = rng.integers(0, n, size=(b, n))
+        # Célula global = réplica * n_celulas + célula da linha sorteada
+        chave = (np.arange(b)[:, None] * n_celulas + codigos[indices]).ravel()
+        contagens = np.bincount(chave, minlength=b * n_celulas).reshape(b, n_celulas)
+        somas = np.bincount(chave, weights=y[indices].ravel(),
+                            minlength=b * n_celulas).reshape(b, n_celulas)
+        resultados.append(_resolver_lote(X, contagens.astype(float), somas))
+    return np.vstack(resultados)
+
+
+def _replicas_celulas(semente, n_replicas):
+    X, media, variancia, proporcao = (_dados_trabalhador[k] for k in
+                                      ('X', 'media', 'variancia', 'proporcao'))
+    n = len(_dados_trabalhador['y'])
+    rng = np.random.default_rng(semente)
+    contagens = rng.multinomial(n, proporcao, size=n_replicas).astype(float)
+    somas = rng.normal(contagens * media, np.sqrt(contagens * variancia))
+    return _resolver_lote(X, contagens, somas)
+
+
+def _executar_bootstrap(metodo, semente, n_replicas):
+    if metodo == 'indices':
+        return _replicas_indices(semente, n_replicas)
+    return _replicas_celulas(semente, n_replicas)
+
+
+# ============================================================================
+# 3. ESTIMADOR
+# ============================================================================
+
+def estimar_uplift(df=None, medida='lucro', n_replicas=10000, confianca=0.95,
+                   metodo='auto', n_processos=None, semente=42):
+    """Uplift de cada campanha vs 'Nenhuma', com IC bootstrap percentil."""
+    if df is None:
+        df = vendas().selecionar(
+            'campanha', *DIMENSOES_CONTROLE, medida).coletar()
+    elif medida not in df.columns:
+        df = vendas(df).selecionar('campanha', *DIMENSOES_CONTROLE, medida).coletar()
+
+    codigos, y, X, campanhas = _preparar(df, medida)
+    n_celulas = X.shape[0]
+    contagem = np.bincount(codigos, minlength=n_celulas).astype(float)
+    soma = np.bincount(codigos, weights=y, minlength=n_celulas)
+    estimativa = _resolver_lote(X, contagem[None, :], soma[None, :])[0]
+
+    if metodo == 'auto':
+        metodo = 'indices' if n_replicas * len(y) <= LIMITE_INDICES else 'celulas'
+    if metodo not in ('indices', 'celulas'):
+        raise ValueError(f"Método de bootstrap desconhecido: {metodo!r}")
+
+    n_processos = n_processos or os.cpu_count() or 1
+    n_tarefas = min(n_processos * 4, n_replicas)
+    tamanhos = np.diff(np.linspace(0, n_replicas, n_tarefas + 1).astype(int))
+    sementes = np.random.SeedSequence(semente).spawn(n_tarefas)
+
+    if n_processos == 1:
+        _iniciar_trabalhador(codigos, y, X)
+        partes = [_executar_bootstrap(metodo, s, t) for s, t in zip(sementes, tamanhos)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_processos, initializer=_iniciar_trabalhador,
+                                 initargs=(codigos, y, X)) as executor:
+            partes = list(executor.map(_executar_bootstrap, [metodo] * n_tarefas,
+                                       sementes, tamanhos))
+    replicas = np.vstack(partes)[:, 1:1 + len(campanhas)]
+
+    alfa = (1 - confianca) / 2
+    inferior, superior = np.quantile(replicas, [alfa, 1 - alfa], axis=0)
+    n_por_campanha = df['campanha'].value_counts()
+    resultado = pd.DataFrame({
+        'uplift': estimativa[1:1 + len(campanhas)],
+        'erro_padrao': replicas.std(axis=0, ddof=1),
+        'ic_inferior': inferior,
+        'ic_superior': superior,
+        'n_vendas': [int(n_por_campanha.get(c, 0)) for c in campanhas],
+    }, index=pd.Index(campanhas, name='campanha'))
+    resultado['significativo'] = (resultado['ic_inferior'] > 0) | (resultado['ic_superior'] < 0)
+    resultado.attrs.update(medida=medida, metodo=metodo, n_replicas=n_replicas,
+                           confianca=confianca)
+    return resultado.sort_values('uplift', ascending=False)
+
+
+if __name__ == '__main__':
+    import time
+
+    print("="*80)
+    print("IMPACTO DAS CAMPANHAS - UPLIFT vs 'NENHUMA'")
+    print("="*80)
+    print("Controles: canal de venda, região e categoria de produto")
+
+    for medida in ('lucro', 'valor_total'):
+        inicio = time.perf_counter()
+        resultado = estimar_uplift(medida=medida)
+        decorrido = time.perf_counter() - inicio
+
+        print("\n" + "="*80)
+        print(f"UPLIFT EM {medida.upper()} (IC {resultado.attrs['confianca']:.0%}, "
+              f"{resultado.attrs['n_replicas']} réplicas, método '{resultado.attrs['metodo']}')")
+        print("="*80)
+        for campanha, linha in resultado.iterrows():
+            marca = '✓' if linha['significativo'] else '✗'
+            print(f"{marca} {campanha:22s}: R$ {linha['uplift']:10,.2f}  "
+                  f"[{linha['ic_inferior']:10,.2f} ; {linha['ic_superior']:10,.2f}]  "
+                  f"n={linha['n_vendas']}")
+        print(f"\nTempo: {decorrido:.2f}s")
@@ -0,0 +1,214 @@
+"""
+================================================================================
+INGESTÃO DE EXTRATOS DE VENDAS PARTICIONADOS (POR LOJA, REGIÃO OU MÊS)
+================================================================================
+
+Aceita como fonte:
+- um arquivo CSV;
+- um padrão glob ('extratos/**/*.csv');
+- um manifesto (.txt com um caminho por linha, ou .json com uma lista);
+- uma lista de caminhos (ou vários deles separados por os.pathsep).
+
+Os arquivos são decodificados em paralelo num pool de processos: enquanto o
+processo principal junta os blocos já prontos, os trabalhadores continuam
+lendo os próximos arquivos. Cada arquivo é conferido contra o esquema da
+tabela de vendas antes de entrar no resultado, que é devolvido como uma
+única tabela lógica para todas as análises.
+
+A fonte padrão pode ser trocada sem editar os scripts pela variável de
+ambiente VENDAS_FONTE. Com VENDAS_VALIDAR=1 (ou validar=True) cada
+trabalhador também aplica as regras de validacao.py ao extrato que acabou de
+ler; as linhas reprovadas vão para o arquivo de quarentena.
+
+A fonte também pode ser um armazenamento particionado por mês (diretório com
+zonas.json, ver particoes.py). Um recorte (parâmetro `recorte` ou variáveis
+VENDAS_DE, VENDAS_ATE e VENDAS_ONDE) descarta pelos mapas de zona as
+partições que não podem casar antes de lê-las, e filtra as linhas das demais
+logo após a leitura, dentro de cada trabalhador.
+================================================================================
+"""
+
+import functools
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import particoes
+import validacao
+from consulta_lazy import ARQUIVO_VENDAS, COLUNAS_VENDAS
+
+VARIAVEL_FONTE = 'VENDAS_FONTE'
+VARIAVEL_VALIDAR = 'VENDAS_VALIDAR'
+
+COLUNAS_NUMERICAS = ['quantidade', 'preco_unitario', 'valor_total', 'custo_total',
+                     'satisfacao_cliente']
+# Dimensões com poucos valores distintos: lidas como categoria, a validação de
+# domínio e os agrupamentos trabalham sobre os códigos
+COLUNAS_CATEGORICAS = ['canal_venda', 'regiao', 'categoria_produto', 'campanha']
+
+
+class ErroEsquema(ValueError):
+    """Um extrato não corresponde ao esquema esperado da tabela de vendas."""
+
+
+def fonte_padrao():
+    return os.environ.get(VARIAVEL_FONTE, ARQUIVO_VENDAS)
+
+
+# ============================================================================
+# 1. RESOLUÇÃO DA FONTE
+# ============================================================================
+
+def listar_arquivos(fonte=None):
+    """Resolve arquivo, glob, manifesto ou lista para uma lista ordenada de caminhos."""
+    fonte = fonte_padrao() if fonte is None else fonte
+    if isinstance(fonte, (list, tuple)):
+        return [str(caminho) for caminho in fonte]
+
+    fonte = str(fonte)
+    if particoes.e_particionado(fonte):
+        return particoes.podar(fonte)
+    if os.pathsep in fonte:
+        return [caminho for parte in fonte.split(os.pathsep) if parte
+                for caminho in listar_arquivos(parte)]
+    if fonte.endswith('.json') and os.path.isfile(fonte):
+        with open(fonte, encoding='utf-8') as f:
+            caminhos = json.load(f)
+        base = os.path.dirname(fonte)
+        return [os.path.join(base, c) for c in caminhos]
+    if fonte.endswith('.txt') and os.path.isfile(fonte):
+        with open(fonte, encoding='utf-8') as f:
+            caminhos = [linha.strip() for linha in f if linha.strip() and not linha.startswith('#')]
+        base = os.path.dirname(fonte)
+        return [os.path.join(base, c) for c in caminhos]
+    if glob.has_magic(fonte):
+        caminhos = sorted(glob.glob(fonte, recursive=True))
+        if not caminhos:
+            raise FileNotFoundError(f"Nenhum arquivo corresponde a '{fonte}'")
+        return caminhos
+    return [fonte]
+
+
+# ============================================================================
+# 2. LEITURA E VERIFICAÇÃO DE ESQUEMA (EXECUTADA NOS TRABALHADORES)
+# ============================================================================
+
+def verificar_esquema(df, caminho='<DataFrame>'):
+    faltando = [c for c in COLUNAS_VENDAS if c not in df.columns]
+    sobrando = [c for c in df.columns if c not in COLUNAS_VENDAS]
+    if faltando or sobrando:
+        raise ErroEsquema(f"{caminho}: colunas faltando {faltando}, inesperadas {sobrando}")
+    nao_numericas = [c for c in COLUNAS_NUMERICAS if not pd.api.types.is_numeric_dtype(df[c])]
+    if nao_numericas:
+        raise ErroEsquema(f"{caminho}: colunas que deveriam ser numéricas: {nao_numericas}")
+    if not pd.api.types.is_datetime64_any_dtype(df['data_venda']):
+        raise ErroEsquema(f"{caminho}: 'data_venda' não é uma data")
+
+
+def ler_arquivo(caminho, recorte=None):
+    """Lê um extrato no formato das análises (';' e vírgula decimal) e confere o esquema."""
+    df = pd.read_csv(caminho, sep=';', decimal=',',
+                     dtype=dict.fromkeys(COLUNAS_CATEGORICAS, 'category'))
+    df.columns = df.columns.str.strip()
+    for coluna in COLUNAS_CATEGORICAS:
+        # Cabeçalhos com espaços escapam do dtype da leitura
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype('category')
+    if 'data_venda' in df.columns:
+        try:
+            df['data_venda'] = pd.to_datetime(df['data_venda'], format='%Y-%m-%d')
+        except (ValueError, TypeError) as erro:
+            raise ErroEsquema(f"{caminho}: 'data_venda' inválida ({erro})") from erro
+    verificar_esquema(df, caminho)
+    df = df[COLUNAS_VENDAS]
+    return df if recorte is None else recorte.aplicar(df)
+
+
+def ler_e_validar_arquivo(caminho, recorte=None):
+    validas, quarentena, contagens = validacao.validar(ler_arquivo(caminho, recorte), n_threads=1)
+    quarentena.insert(0, 'arquivo_origem', caminho)
+    return validas, quarentena, contagens
+
+
+def _tabela_vazia():
+    df = pd.DataFrame({c: pd.Series(dtype=float if c in COLUNAS_NUMERICAS else str)
+                       for c in COLUNAS_VENDAS})
+    df['quantidade'] = df['quantidade'].astype('int64')
+    df['data_venda'] = pd.to_datetime(df['data_venda'])
+    return df
+
+
+# ============================================================================
+# 3. CARGA PARALELA
+# ============================================================================
+
+def carregar_vendas(fonte=None, n_processos=None, validar=None,
+                    arquivo_quarentena=validacao.ARQUIVO_QUARENTENA, recorte=None):
+    """Carrega todos os extratos da fonte como uma única tabela de vendas.
+
+    Com validação, df.attrs['validacao'] traz as contagens por regra e o
+    número de linhas enviadas para `arquivo_quarentena`. `recorte`
+    (particoes.Recorte) restringe período e segmentos; None usa o das
+    variáveis de ambiente.
+    """
+    fonte = fonte_padrao() if fonte is None else fonte
+    recorte = particoes.Recorte.do_ambiente() if recorte is None else recorte
+    if particoes.e_particionado(fonte):
+        caminhos = particoes.podar(fonte, recorte)
+    else:
+        caminhos = listar_arquivos(fonte)
+    if validar is None:
+        validar = os.environ.get(VARIAVEL_VALIDAR, '') not in ('', '0')
+    if not caminhos:
+        # Nenhuma partição pode casar com o recorte: nada é lido
+        df = _tabela_vazia()
+        if validar:
+            df.attrs['validacao'] = {'contagens': dict.fromkeys(validacao.REGRAS, 0),
+                                     'reprovadas': 0, 'arquivo_quarentena': None}
+        return df
+    n_processos = min(n_processos or os.cpu_count() or 1, len(caminhos))
+    leitor = ler_e_validar_arquivo if validar else ler_arquivo
+    if not recorte.vazio:
+        leitor = functools.partial(leitor, recorte=recorte)
+
+    if n_processos <= 1:
+        partes = [leitor(c) for c in caminhos]
+    else:
+        # chunksize pequeno mantém todos os trabalhadores ocupados lendo à frente
+        lote = max(1, len(caminhos) // (n_processos * 4))
+        with ProcessPoolExecutor(max_workers=n_processos) as executor:
+            partes = list(executor.map(leitor, caminhos, chunksize=lote))
+
+    if not validar:
+        return partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+
+    validas = [p[0] for p in partes]
+    df = validas[0] if len(validas) == 1 else pd.concat(validas, ignore_index=True)
+    quarentena = pd.concat([p[1] for p in partes], ignore_index=True)
+    contagens = {regra: sum(p[2][regra] for p in partes) for regra in validacao.REGRAS}
+    validacao.gravar_quarentena(quarentena, arquivo_quarentena)
+    df.attrs['validacao'] = {'contagens': contagens, 'reprovadas': len(quarentena),
+                             'arquivo_quarentena': arquivo_quarentena if len(quarentena) else None}
+    return df
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    fonte = sys.argv[1] if len(sys.argv) > 1 else None
+    inicio = time.perf_counter()
+    caminhos = listar_arquivos(fonte)
+    df = carregar_vendas(caminhos)
+    decorrido = time.perf_counter() - inicio
+
+    print("="*80)
+    print("INGESTÃO DE EXTRATOS DE VENDAS")
+    print("="*80)
+    print(f"Arquivos lidos:   {len(caminhos)}")
+    print(f"Registros:        {len(df)}")
+    print(f"Período:          {df['data_venda'].min():%d/%m/%Y} a {df['data_venda'].max():%d/%m/%Y}")
+    print(f"Tempo de ingestão: {decorrido:.2f}s ({len(caminhos) / decorrido:.1f} arquivos/s)")
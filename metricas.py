@@ -0,0 +1,324 @@
+"""
+================================================================================
+MÉTRICAS ESTRUTURADAS DAS ANÁLISES DE VENDAS
+================================================================================
+
+Os cálculos das análises descritiva, diagnóstica, preditiva, prescritiva e
+da EDA ficam aqui (calcular_*, *_censo): os scripts analise-*.py e EDA/eda.py
+imprimem e desenham a partir deles, e as funções metricas_* devolvem os
+mesmos números como dicionários serializáveis em JSON. Não importa
+matplotlib/seaborn; sklearn e scipy só são importados pelas funções que os
+usam.
+================================================================================
+"""
+
+import numpy as np
+import pandas as pd
+
+from consulta_lazy import vendas, derivar_coluna
+
+
+def _tabela(df):
+    # DataFrame -> {linha: {coluna: valor}}, com tipos nativos do Python
+    return {str(indice): {str(c): _nativo(v) for c, v in linha.items()}
+            for indice, linha in df.iterrows()}
+
+
+def _nativo(valor):
+    if isinstance(valor, (np.integer,)):
+        return int(valor)
+    if isinstance(valor, (np.floating, float)):
+        return None if np.isnan(valor) else float(valor)
+    if isinstance(valor, pd.Timestamp):
+        return valor.strftime('%Y-%m-%d')
+    return valor
+
+
+# ============================================================================
+# DESCRITIVA
+# ============================================================================
+
+def calcular_descritiva(df):
+    """Tabelas e números da análise descritiva (script e métricas usam os mesmos)."""
+    canal = df.groupby('canal_venda').agg(
+        valor_total=('valor_total', 'sum'), quantidade=('quantidade', 'sum')
+    ).sort_values('valor_total', ascending=False)
+    categorias = df.groupby('categoria_produto').agg(
+        valor_total=('valor_total', 'sum'), quantidade=('quantidade', 'sum'),
+        custo_total=('custo_total', 'sum')
+    ).sort_values('valor_total', ascending=False)
+    categorias['margem_lucro'] = ((categorias['valor_total'] - categorias['custo_total'])
+                                  / categorias['valor_total'] * 100)
+    return {
+        'faturamento_diario': df.groupby('data_venda')['valor_total'].sum(),
+        'faturamento_total': df['valor_total'].sum(),
+        'canal': canal,
+        'regiao': df.groupby('regiao')['valor_total'].sum().sort_values(ascending=False),
+        'categorias': categorias,
+        'satisfacao_media': df['satisfacao_cliente'].mean(),
+        'ticket_medio': df['valor_total'].mean(),
+        'total_transacoes': len(df),
+        'produto_mais_vendido': df.groupby('categoria_produto')['quantidade'].sum().idxmax(),
+    }
+
+
+def metricas_descritiva(df):
+    calculo = calcular_descritiva(df)
+    faturamento_diario = calculo['faturamento_diario']
+    return {
+        'faturamento_medio_diario': _nativo(faturamento_diario.mean()),
+        'faturamento_total': _nativo(calculo['faturamento_total']),
+        'dias_com_vendas': int(len(faturamento_diario)),
+        'por_canal': _tabela(calculo['canal']),
+        'por_regiao': {str(k): _nativo(v) for k, v in calculo['regiao'].items()},
+        'por_categoria': _tabela(calculo['categorias']),
+        'margem_lucro_media_geral': _nativo(calculo['categorias']['margem_lucro'].mean()),
+        'satisfacao_media': _nativo(calculo['satisfacao_media']),
+        'ticket_medio': _nativo(calculo['ticket_medio']),
+        'total_transacoes': int(calculo['total_transacoes']),
+        'produto_mais_vendido': str(calculo['produto_mais_vendido']),
+    }
+
+
+# ============================================================================
+# DIAGNÓSTICA
+# ============================================================================
+
+VARIAVEIS_CORRELACAO = ['lucro', 'quantidade', 'preco_unitario', 'valor_total', 'custo_total',
+                        'satisfacao_cliente']
+
+
+def calcular_diagnostica(df):
+    """Lucro, correlações e tabelas por dimensão da análise diagnóstica."""
+    from scipy import stats
+
+    lucro = derivar_coluna(df, 'lucro')
+    margem = derivar_coluna(df, 'margem_lucro')
+    correlacao = df.assign(lucro=lucro)[VARIAVEIS_CORRELACAO].corr()
+    r, p_valor = stats.pearsonr(df['satisfacao_cliente'], df['valor_total'])
+
+    def por(dimensao):
+        return (vendas(df).agrupar(dimensao)
+                .agregar(lucro_total=('lucro', 'sum'), lucro_medio=('lucro', 'mean'),
+                         margem_media=('margem_lucro', 'mean'),
+                         satisfacao_media=('satisfacao_cliente', 'mean'),
+                         valor_total=('valor_total', 'sum'), quantidade=('quantidade', 'sum'))
+                .coletar().astype({'quantidade': 'int64'}))
+
+    canal, categoria, regiao = por('canal_venda'), por('categoria_produto'), por('regiao')
+    return {
+        'lucro': lucro,
+        'margem_lucro': margem,
+        'correlacao': correlacao,
+        'correlacao_lucro': correlacao['lucro'].drop('lucro').sort_values(ascending=False),
+        'correlacao_satisfacao_valor': r,
+        'p_valor_satisfacao_valor': p_valor,
+        'por_canal': canal,
+        'por_categoria': categoria,
+        'por_campanha': por('campanha').sort_values('lucro_total', ascending=False),
+        'melhor_canal': canal['lucro_total'].idxmax(),
+        'pior_canal': canal['lucro_total'].idxmin(),
+        'melhor_categoria': categoria['lucro_total'].idxmax(),
+        'melhor_regiao': regiao['lucro_total'].idxmax(),
+    }
+
+
+def metricas_diagnostica(df):
+    calculo = calcular_diagnostica(df)
+    lucro = calculo['lucro']
+    return {
+        'periodo': [_nativo(df['data_venda'].min()), _nativo(df['data_venda'].max())],
+        'lucro_total': _nativo(lucro.sum()),
+        'lucro_medio': _nativo(lucro.mean()),
+        'margem_lucro_media': _nativo(calculo['margem_lucro'].mean()),
+        'desvio_padrao_lucro': _nativo(lucro.std()),
+        'correlacao_com_lucro': {str(k): _nativo(v) for k, v in calculo['correlacao_lucro'].items()},
+        'correlacao_satisfacao_valor': _nativo(calculo['correlacao_satisfacao_valor']),
+        'p_valor_satisfacao_valor': _nativo(calculo['p_valor_satisfacao_valor']),
+        'por_canal': _tabela(calculo['por_canal']),
+        'por_categoria': _tabela(calculo['por_categoria']),
+        'por_campanha': _tabela(calculo['por_campanha']),
+        'melhor_canal': str(calculo['melhor_canal']),
+        'pior_canal': str(calculo['pior_canal']),
+        'melhor_categoria': str(calculo['melhor_categoria']),
+        'melhor_regiao': str(calculo['melhor_regiao']),
+    }
+
+
+# ============================================================================
+# PREDITIVA
+# ============================================================================
+
+def calcular_preditiva(df):
+    """Regressão valor_total ~ quantidade + preco_unitario + tem_campanha, com teste 80/20."""
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+    from sklearn.model_selection import train_test_split
+
+    X = pd.DataFrame({'quantidade': df['quantidade'], 'preco_unitario': df['preco_unitario'],
+                      'tem_campanha': derivar_coluna(df, 'tem_campanha')})
+    y = df['valor_total']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    modelo = LinearRegression().fit(X_train, y_train)
+    y_pred = modelo.predict(X_test)
+    return {
+        'modelo': modelo,
+        'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test,
+        'y_pred': y_pred,
+        'r2': r2_score(y_test, y_pred),
+        'mae': mean_absolute_error(y_test, y_pred),
+        'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
+    }
+
+
+def metricas_preditiva(df):
+    calculo = calcular_preditiva(df)
+    modelo = calculo['modelo']
+    return {
+        'n_treino': int(len(calculo['X_train'])),
+        'n_teste': int(len(calculo['X_test'])),
+        'coeficientes': {c: _nativo(v) for c, v in zip(calculo['X_train'].columns, modelo.coef_)},
+        'intercepto': _nativo(modelo.intercept_),
+        'r2': _nativo(calculo['r2']),
+        'mae': _nativo(calculo['mae']),
+        'rmse': _nativo(calculo['rmse']),
+    }
+
+
+# ============================================================================
+# PRESCRITIVA
+# ============================================================================
+
+def calcular_prescritiva(df):
+    """Cenário atual, grade quantidade × preço e alocação ótima do orçamento."""
+    from sklearn.linear_model import LinearRegression
+
+    from alocacao_orcamento import otimizar_alocacao, resposta_segmentos
+
+    # Lucro e margem agregados direto do plano, sem colunas derivadas no DataFrame
+    cenario = vendas(df).agregar(
+        faturamento=('valor_total', 'sum'), lucro=('lucro', 'sum'),
+        margem_lucro=('margem_lucro', 'mean')).coletar().iloc[0]
+
+    X = np.column_stack([df['quantidade'], df['preco_unitario'],
+                         derivar_coluna(df, 'tem_campanha')])
+    y = df['valor_total'].to_numpy()
+    modelo = LinearRegression().fit(X, y)
+
+    # Grade 20 × 20 (linhas = preço, colunas = quantidade) com campanha, avaliada de uma vez;
+    # custo estimado em 60% do faturamento
+    qtd_range = np.linspace(5, 30, 20)
+    preco_range = np.linspace(100, 3000, 20)
+    precos, qtds = np.meshgrid(preco_range, qtd_range, indexing='ij')
+    entrada = np.column_stack([qtds.ravel(), precos.ravel(), np.ones(qtds.size)])
+    matriz_lucro = (modelo.predict(entrada) - entrada[:, 0] * entrada[:, 1] * 0.6).reshape(precos.shape)
+    i, j = np.unravel_index(matriz_lucro.argmax(), matriz_lucro.shape)
+
+    segmentos = resposta_segmentos(df)
+    alocacao, precos_sombra, resumo = otimizar_alocacao(segmentos)
+    return {
+        'cenario': cenario,
+        'modelo': modelo,
+        'r2_modelo': modelo.score(X, y),
+        'qtd_range': qtd_range,
+        'preco_range': preco_range,
+        'matriz_lucro': matriz_lucro,
+        'quantidade_otima': qtd_range[j],
+        'preco_otimo': preco_range[i],
+        'lucro_maximo_previsto': matriz_lucro[i, j],
+        'segmentos': segmentos,
+        'alocacao': alocacao,
+        'investidos': alocacao[alocacao['investimento'] > 0.005],
+        'precos_sombra': precos_sombra,
+        'alocacao_resumo': resumo,
+    }
+
+
+def metricas_prescritiva(df):
+    calculo = calcular_prescritiva(df)
+    cenario = calculo['cenario']
+    return {
+        'faturamento_total': _nativo(cenario['faturamento']),
+        'lucro_total': _nativo(cenario['lucro']),
+        'margem_lucro_media': _nativo(cenario['margem_lucro']),
+        'r2_modelo': _nativo(calculo['r2_modelo']),
+        'quantidade_otima': _nativo(calculo['quantidade_otima']),
+        'preco_otimo': _nativo(calculo['preco_otimo']),
+        'lucro_maximo_previsto': _nativo(calculo['lucro_maximo_previsto']),
+        'alocacao_resumo': {k: _nativo(v) for k, v in calculo['alocacao_resumo'].items()},
+        'alocacao_segmentos': _tabela(calculo['investidos'][['investimento', 'lucro_incremental',
+                                                             'preco_sombra_capacidade']]),
+        'alocacao_precos_sombra': _tabela(calculo['precos_sombra']),
+    }
+
+
+# ============================================================================
+# EDA - CENSO IBGE 2022
+# ============================================================================
+
+ARQUIVO_CENSO = 'EDA/censo_ibge_2022.tsv'
+COLUNAS_CENSO = ['Ano', 'Municipio', 'Domicilios', 'Moradores', 'Media_Moradores']
+NUMERICAS_CENSO = ['Domicilios', 'Moradores', 'Media_Moradores']
+
+
+def preparar_censo(df):
+    """Renomeia as colunas e converte Media_Moradores (vírgula decimal) para número."""
+    df = df.copy()
+    df.columns = COLUNAS_CENSO
+    df['Media_Moradores'] = pd.to_numeric(
+        df['Media_Moradores'].astype(str).str.replace(',', '.'), errors='coerce')
+    return df
+
+
+def corrigir_censo(df):
+    """Preenche as médias ausentes com Moradores / Domicilios (Media_Moradores_Calculada)."""
+    df = df.copy()
+    df['Media_Moradores_Calculada'] = df['Moradores'] / df['Domicilios']
+    df['Media_Moradores'] = df['Media_Moradores'].fillna(df['Media_Moradores_Calculada'])
+    return df
+
+
+def estatisticas_censo(df):
+    """Posição, dispersão e outliers pelo método IQR de cada variável numérica."""
+    estatisticas = {}
+    for coluna in NUMERICAS_CENSO:
+        serie = df[coluna]
+        q1, q3 = serie.quantile(0.25), serie.quantile(0.75)
+        iqr = q3 - q1
+        inferior, superior = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+        estatisticas[coluna] = {
+            'media': serie.mean(), 'mediana': serie.median(), 'desvio_padrao': serie.std(),
+            'cv_percentual': serie.std() / serie.mean() * 100,
+            'minimo': serie.min(), 'maximo': serie.max(),
+            'q1': q1, 'q3': q3, 'iqr': iqr, 'limite_inferior': inferior, 'limite_superior': superior,
+            'outliers_iqr': int(((serie < inferior) | (serie > superior)).sum()),
+        }
+    return estatisticas
+
+
+def inconsistencias_censo(df):
+    """Municípios cuja média fornecida difere da calculada em mais de 0,01."""
+    diferenca = (df['Media_Moradores'] - df['Media_Moradores_Calculada']).abs()
+    return df.assign(Diferenca_Media=diferenca)[diferenca > 0.01]
+
+
+def metricas_eda(caminho=ARQUIVO_CENSO):
+    df = preparar_censo(pd.read_csv(caminho, sep='\t', encoding='utf-8'))
+    nulos = df.isnull().sum()
+    df = corrigir_censo(df)
+    return {
+        'registros': int(len(df)),
+        'valores_nulos': {str(k): int(v) for k, v in nulos.items()},
+        'estatisticas': {coluna: {k: _nativo(v) for k, v in valores.items()}
+                         for coluna, valores in estatisticas_censo(df).items()},
+        'correlacao': _tabela(df[NUMERICAS_CENSO].corr()),
+        'inconsistencias_media': int(len(inconsistencias_censo(df))),
+    }
+
+
+METRICAS = {
+    'descritiva': metricas_descritiva,
+    'diagnostica': metricas_diagnostica,
+    'preditiva': metricas_preditiva,
+    'prescritiva': metricas_prescritiva,
+}
@@ -0,0 +1,158 @@
+"""
+================================================================================
+MODELOS SEGMENTADOS: UMA REGRESSÃO POR CANAL × REGIÃO × CATEGORIA
+================================================================================
+
+Ajusta o mesmo modelo da análise preditiva
+
+    valor_total ~ quantidade + preco_unitario + tem_campanha
+
+separadamente para cada combinação de segmentos, sem laço de ajustes do
+sklearn:
+
+1. Uma ordenação pelas chaves de segmento agrupa as linhas contíguas.
+2. X'X e X'y de todos os segmentos saem de um np.add.reduceat.
+3. Todas as equações normais são resolvidas juntas (np.linalg.solve em lote).
+
+Segmentos pequenos são encolhidos em direção ao modelo global: o modelo
+global entra como `tau` observações fictícias (prior com precisão
+tau · X'X/N), e segmentos com menos de `min_obs` vendas usam o global direto.
+A previsão é uma consulta a uma tabela de coeficientes por segmento.
+================================================================================
+"""
+
+import numpy as np
+import pandas as pd
+
+from consulta_lazy import derivar_coluna
+
+DIMENSOES_SEGMENTO = ('canal_venda', 'regiao', 'categoria_produto')
+FEATURES = ('quantidade', 'preco_unitario', 'tem_campanha')
+
+
+def matriz_modelo(df):
+    """Matriz [1, quantidade, preco_unitario, tem_campanha] do modelo de valor_total."""
+    return np.column_stack([np.ones(len(df)), df['quantidade'], df['preco_unitario'],
+                            derivar_coluna(df, 'tem_campanha')]).astype(float)
+
+
+class ModeloSegmentado:
+    """Coeficientes por segmento com encolhimento para o modelo global."""
+
+    def __init__(self, dimensoes=DIMENSOES_SEGMENTO, tau=30.0, min_obs=5):
+        self.dimensoes = list(dimensoes)
+        self.tau = tau
+        self.min_obs = min_obs
+        self.coef_global = None
+        self.tabela = None
+
+    # ------------------------------------------------------------------
+    # Ajuste
+    # ------------------------------------------------------------------
+    def ajustar(self, df, alvo='valor_total'):
+        X = matriz_modelo(df)
+        y = df[alvo].to_numpy(dtype=float)
+        n, p = X.shape
+
+        XtX_global = X.T @ X
+        coef_global = np.linalg.solve(XtX_global + 1e-9 * np.eye(p), X.T @ y)
+
+        # Uma ordenação: linhas de cada segmento ficam contíguas
+        codigos, segmentos = pd.MultiIndex.from_frame(df[self.dimensoes]).factorize()
+        ordem = np.argsort(codigos, kind='stable')
+        codigos_ord = codigos[ordem]
+        inicios = np.r_[0, np.flatnonzero(np.diff(codigos_ord)) + 1]
+        X_ord, y_ord = X[ordem], y[ordem]
+
+        XtX = np.add.reduceat(X_ord[:, :, None] * X_ord[:, None, :], inicios, axis=0)
+        Xty = np.add.reduceat(X_ord * y_ord[:, None], inicios, axis=0)
+        n_seg = np.diff(np.r_[inicios, n])
+
+        # Prior: tau observações "típicas" da base inteira com os coeficientes globais
+        precisao_prior = self.tau * XtX_global / n
+        A = XtX + precisao_prior + 1e-9 * np.eye(p)
+        b = Xty + precisao_prior @ coef_global
+        coef = np.linalg.solve(A, b[..., None])[..., 0]
+        coef[n_seg < self.min_obs] = coef_global
+
+        self.coef_global = coef_global
+        indice = segmentos[codigos_ord[inicios]].set_names(self.dimensoes)
+        self.tabela = pd.DataFrame(coef, index=indice,
+                                   columns=['intercepto', *FEATURES])
+        self.tabela['n_vendas'] = n_seg
+        self.tabela['peso_segmento'] = np.where(n_seg < self.min_obs, 0.0,
+                                                n_seg / (n_seg + self.tau))
+        self.tabela = self.tabela.sort_index()
+        return self
+
+    # ------------------------------------------------------------------
+    # Previsão por tabela de consulta
+    # ------------------------------------------------------------------
+    def prever(self, df):
+        posicoes = self.tabela.index.get_indexer(pd.MultiIndex.from_frame(df[self.dimensoes]))
+        coef = self.tabela[['intercepto', *FEATURES]].to_numpy()
+        # Segmento nunca visto: índice -1 aponta para a linha extra com o modelo global
+        coef = np.vstack([coef, self.coef_global])
+        return np.einsum('ij,ij->i', matriz_modelo(df), coef[posicoes])
+
+    def metricas(self, df, alvo='valor_total'):
+        """R², MAE e RMSE por segmento e no total, sobre o DataFrame informado."""
+        y = df[alvo].to_numpy(dtype=float)
+        erro = y - self.prever(df)
+        avaliacao = pd.DataFrame({'y': y, 'erro': erro, 'abs': np.abs(erro), 'quad': erro ** 2})
+        chaves = [df[d].to_numpy() for d in self.dimensoes]
+        g = avaliacao.groupby(chaves)
+        resultado = pd.DataFrame({
+            'n': g['y'].size(),
+            'mae': g['abs'].mean(),
+            'rmse': np.sqrt(g['quad'].mean()),
+            'r2': 1 - g['quad'].sum() / (g['y'].var(ddof=0) * g['y'].size()),
+        })
+        resultado.index.names = self.dimensoes
+        total = {'n': len(y), 'mae': np.abs(erro).mean(), 'rmse': np.sqrt((erro ** 2).mean()),
+                 'r2': 1 - (erro ** 2).sum() / ((y - y.mean()) ** 2).sum()}
+        return resultado, total
+
+
+def prever_global(coef_global, df):
+    return matriz_modelo(df) @ coef_global
+
+
+if __name__ == '__main__':
+    import time
+
+    from ingestao import carregar_vendas
+
+    df = carregar_vendas()
+
+    print("="*80)
+    print("MODELOS SEGMENTADOS - CANAL × REGIÃO × CATEGORIA")
+    print("="*80)
+
+    # Divisão 80/20, como na análise preditiva
+    rng = np.random.default_rng(42)
+    teste = rng.random(len(df)) < 0.2
+    treino_df, teste_df = df[~teste], df[teste]
+
+    inicio = time.perf_counter()
+    modelo = ModeloSegmentado().ajustar(treino_df)
+    decorrido = time.perf_counter() - inicio
+    print(f"\nSegmentos ajustados: {len(modelo.tabela)} em {decorrido * 1000:.1f} ms")
+    print(f"Segmentos com menos de {modelo.min_obs} vendas (modelo global): "
+          f"{(modelo.tabela['n_vendas'] < modelo.min_obs).sum()}")
+
+    por_segmento, total = modelo.metricas(teste_df)
+    y = teste_df['valor_total'].to_numpy()
+    erro_global = y - prever_global(modelo.coef_global, teste_df)
+    r2_global = 1 - (erro_global ** 2).sum() / ((y - y.mean()) ** 2).sum()
+
+    print("\n" + "="*80)
+    print("AVALIAÇÃO NO CONJUNTO DE TESTE")
+    print("="*80)
+    print(f"R² modelo global:      {r2_global:.4f}")
+    print(f"R² modelos segmentados: {total['r2']:.4f}")
+    print(f"MAE segmentado:        R$ {total['mae']:,.2f}")
+    print(f"RMSE segmentado:       R$ {total['rmse']:,.2f}")
+
+    print("\nCoeficientes dos 5 maiores segmentos:")
+    print(modelo.tabela.sort_values('n_vendas', ascending=False).head().round(2).to_string())
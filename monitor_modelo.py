@@ -0,0 +1,353 @@
+"""
+================================================================================
+MONITORAMENTO EM STREAMING DO MODELO DE VALOR_TOTAL
+================================================================================
+
+O modelo da análise preditiva (valor_total ~ quantidade + preco_unitario +
+tem_campanha) é treinado uma vez e gravado em JSON com a linha de base:
+
+- histogramas de bordas fixas (decis do treino) de quantidade, preço
+  unitário, participação de campanha e resíduos;
+- MAE e RMSE de referência.
+
+Cada lote novo é pontuado com o modelo gravado e alimenta esboços
+combináveis: somas para as métricas de erro (MAE, RMSE, viés, R²),
+histogramas de bordas fixas (basta somar contagens) e as estatísticas
+suficientes X'X e X'y. As métricas e o drift (PSI contra a linha de base)
+são avaliados numa janela dos últimos lotes, mesclando os esboços.
+
+Quando o PSI de alguma variável ou a razão RMSE/RMSE de referência passa do
+limiar, o retreino é disparado (após um retreino, só quando a janela volta
+a estar completa): os coeficientes saem das equações normais
+já acumuladas na janela, sem reler os dados, e a linha de base passa a ser a
+própria janela. A linha de base dos resíduos, que depende do modelo, é
+refeita depois: a primeira janela completa pontuada pelo modelo novo vira a
+referência (bordas reescaladas pelo novo RMSE) e, até lá, o PSI dos resíduos
+fica NaN. O custo por lote é uma passada vetorizada pelo lote; o retreino é
+um sistema 4 × 4.
+================================================================================
+"""
+
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from modelos_segmentados import FEATURES, matriz_modelo
+
+ARQUIVO_MODELO = 'modelo_valor_total.json'
+
+
+# ============================================================================
+# 1. ESBOÇOS COMBINÁVEIS
+# ============================================================================
+
+class Histograma:
+    """Histograma de bordas fixas; dois histogramas com as mesmas bordas se somam."""
+
+    def __init__(self, bordas, contagens=None):
+        self.bordas = np.asarray(bordas, dtype=float)
+        self.contagens = (np.zeros(len(self.bordas) + 1) if contagens is None
+                          else np.asarray(contagens, dtype=float))
+
+    @classmethod
+    def por_quantis(cls, valores, n_faixas=10):
+        bordas = np.unique(np.quantile(valores, np.linspace(0, 1, n_faixas + 1)[1:-1]))
+        return cls(bordas).atualizar(valores)
+
+    def atualizar(self, valores):
+        # Faixas abertas nas pontas: (-inf, b0], (b0, b1], ..., (bn, inf)
+        self.contagens += np.bincount(np.searchsorted(self.bordas, valores, side='left'),
+                                      minlength=len(self.contagens))
+        return self
+
+    def mesclar(self, outro):
+        return Histograma(self.bordas, self.contagens + outro.contagens)
+
+    def vazio(self):
+        return Histograma(self.bordas)
+
+    def proporcoes(self):
+        return self.contagens / max(self.contagens.sum(), 1)
+
+    def para_dict(self):
+        return {'bordas': self.bordas.tolist(), 'contagens': self.contagens.tolist()}
+
+
+def psi(base, atual, epsilon=1e-4):
+    """Population Stability Index entre dois histogramas com as mesmas bordas."""
+    p = np.maximum(base.proporcoes(), epsilon)
+    q = np.maximum(atual.proporcoes(), epsilon)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+class EstatisticasLote:
+    """Somas combináveis de um lote: erros, alvo e equações normais."""
+
+    def __init__(self, n_coef):
+        self.n = 0
+        self.soma_erro = self.soma_abs = self.soma_quad = 0.0
+        self.soma_y = self.soma_y2 = 0.0
+        self.XtX = np.zeros((n_coef, n_coef))
+        self.Xty = np.zeros(n_coef)
+        self.yty = 0.0
+
+    def atualizar(self, X1, y, erro):
+        self.n += len(y)
+        self.soma_erro += erro.sum()
+        self.soma_abs += np.abs(erro).sum()
+        self.soma_quad += (erro ** 2).sum()
+        self.soma_y += y.sum()
+        self.soma_y2 += (y ** 2).sum()
+        self.XtX += X1.T @ X1
+        self.Xty += X1.T @ y
+        self.yty += y @ y
+        return self
+
+    def mesclar(self, outro):
+        total = EstatisticasLote(len(self.Xty))
+        for nome in ('n', 'soma_erro', 'soma_abs', 'soma_quad', 'soma_y', 'soma_y2', 'yty'):
+            setattr(total, nome, getattr(self, nome) + getattr(outro, nome))
+        total.XtX = self.XtX + outro.XtX
+        total.Xty = self.Xty + outro.Xty
+        return total
+
+    def metricas(self):
+        n = max(self.n, 1)
+        sst = self.soma_y2 - self.soma_y ** 2 / n
+        return {
+            'n': self.n,
+            'mae': self.soma_abs / n,
+            'rmse': float(np.sqrt(self.soma_quad / n)),
+            'vies': self.soma_erro / n,
+            'r2': 1 - self.soma_quad / sst if sst > 0 else float('nan'),
+        }
+
+
+# ============================================================================
+# 2. MODELO PERSISTIDO
+# ============================================================================
+
+class ModeloPersistido:
+    """Coeficientes, linha de base de drift e erros de referência, gravados em JSON."""
+
+    def __init__(self, coef, referencia, base, versao=1, treinado_em=None, n_treino=0):
+        self.coef = np.asarray(coef, dtype=float)
+        self.referencia = referencia
+        self.base = base
+        self.versao = versao
+        self.treinado_em = treinado_em or time.strftime('%Y-%m-%d %H:%M:%S')
+        self.n_treino = n_treino
+
+    @classmethod
+    def treinar(cls, treino, teste=None):
+        """Ajusta como a análise preditiva; a referência de erro vem do teste (ou do treino)."""
+        from sklearn.linear_model import LinearRegression
+
+        X1 = matriz_modelo(treino)
+        y = treino['valor_total'].to_numpy(dtype=float)
+        regressao = LinearRegression().fit(X1[:, 1:], y)
+        coef = np.r_[regressao.intercept_, regressao.coef_]
+
+        avaliacao = treino if teste is None else teste
+        X1_aval = matriz_modelo(avaliacao)
+        erro = avaliacao['valor_total'].to_numpy(dtype=float) - X1_aval @ coef
+        referencia = {'mae': float(np.abs(erro).mean()), 'rmse': float(np.sqrt((erro ** 2).mean()))}
+        base = {nome: Histograma.por_quantis(X1[:, i + 1]) for i, nome in enumerate(FEATURES[:2])}
+        # Participação de campanha: duas faixas fixas (sem / com campanha)
+        base['tem_campanha'] = Histograma([0.5]).atualizar(X1[:, 3])
+        base['residuos'] = Histograma.por_quantis(erro)
+        return cls(coef, referencia, base, n_treino=len(treino))
+
+    def prever(self, X1):
+        return X1 @ self.coef
+
+    def salvar(self, caminho=ARQUIVO_MODELO):
+        dados = {
+            'versao': self.versao, 'treinado_em': self.treinado_em, 'n_treino': self.n_treino,
+            'features': list(FEATURES), 'intercepto': self.coef[0],
+            'coeficientes': dict(zip(FEATURES, self.coef[1:].tolist())),
+            'referencia': self.referencia,
+            'base': {nome: h.para_dict() for nome, h in self.base.items()},
+        }
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+        return caminho
+
+    @classmethod
+    def carregar(cls, caminho=ARQUIVO_MODELO):
+        with open(caminho, encoding='utf-8') as f:
+            dados = json.load(f)
+        coef = [dados['intercepto'], *(dados['coeficientes'][f] for f in FEATURES)]
+        base = {nome: Histograma(h['bordas'], h['contagens']) for nome, h in dados['base'].items()}
+        return cls(coef, dados['referencia'], base, dados['versao'], dados['treinado_em'],
+                   dados['n_treino'])
+
+
+# ============================================================================
+# 3. MONITOR
+# ============================================================================
+
+class MonitorModelo:
+    """Pontua lotes, mantém a janela de esboços e decide quando retreinar."""
+
+    def __init__(self, modelo, janela=5, limiar_psi=0.2, limiar_rmse=1.5, min_obs=200,
+                 retreinar=True, caminho_modelo=None):
+        self.modelo = modelo
+        self.janela = deque(maxlen=janela)
+        self.limiar_psi = limiar_psi
+        self.limiar_rmse = limiar_rmse
+        self.min_obs = min_obs
+        self.retreinar = retreinar
+        self.caminho_modelo = caminho_modelo
+        self.total = EstatisticasLote(len(modelo.coef))
+        # Depois de um retreino, só uma janela completa pontuada pelo modelo novo pode dispará-lo
+        self.retreinado = False
+        # Resíduos acumulados do modelo em uso (recomeça a cada retreino)
+        self.residuos_total = modelo.base['residuos'].vazio()
+
+    def processar(self, lote):
+        """Pontua um lote; retorna um registro com métricas, drift e a decisão de retreino."""
+        inicio = time.perf_counter()
+        X1 = matriz_modelo(lote)
+        y = lote['valor_total'].to_numpy(dtype=float)
+        erro = y - self.modelo.prever(X1)
+
+        estatisticas = EstatisticasLote(X1.shape[1]).atualizar(X1, y, erro)
+        esbocos = {nome: self.modelo.base[nome].vazio().atualizar(X1[:, i + 1])
+                   for i, nome in enumerate(FEATURES)}
+        esbocos['residuos'] = self.modelo.base['residuos'].vazio().atualizar(erro)
+        self.janela.append((estatisticas, esbocos))
+        self.total = self.total.mesclar(estatisticas)
+        self.residuos_total = self.residuos_total.mesclar(esbocos['residuos'])
+
+        # Janela = mescla dos esboços dos últimos lotes
+        soma = estatisticas
+        histogramas = dict(esbocos)
+        for anteriores, esbocos_anteriores in list(self.janela)[:-1]:
+            soma = soma.mesclar(anteriores)
+            histogramas = {nome: h.mesclar(esbocos_anteriores[nome]) for nome, h in histogramas.items()}
+
+        metricas = soma.metricas()
+        desvios = {nome: psi(self.modelo.base[nome], histogramas[nome]) for nome in FEATURES}
+        base_residuos = self.modelo.base['residuos']
+        if base_residuos.contagens.sum():
+            desvios['residuos'] = psi(base_residuos, histogramas['residuos'])
+        else:
+            # Modelo recém-retreinado: a primeira janela completa vira a referência dos resíduos
+            desvios['residuos'] = float('nan')
+            if len(self.janela) == self.janela.maxlen:
+                self.modelo.base['residuos'] = histogramas['residuos']
+                if self.caminho_modelo:
+                    self.modelo.salvar(self.caminho_modelo)
+        razao_rmse = metricas['rmse'] / self.modelo.referencia['rmse']
+        motivos = [f"PSI {nome} = {valor:.2f}" for nome, valor in desvios.items()
+                   if nome in FEATURES and valor > self.limiar_psi]
+        if razao_rmse > self.limiar_rmse:
+            motivos.append(f"RMSE {razao_rmse:.2f}× a referência")
+        janela_completa = not self.retreinado or len(self.janela) == self.janela.maxlen
+        disparar = bool(motivos) and soma.n >= self.min_obs and janela_completa
+
+        registro = {
+            'versao_modelo': self.modelo.versao,
+            'lote': estatisticas.metricas(),
+            'janela': metricas,
+            'psi': desvios,
+            'razao_rmse': razao_rmse,
+            'retreino': disparar,
+            'motivos': motivos,
+        }
+        if disparar and self.retreinar:
+            self._retreinar(soma, histogramas)
+        registro['segundos'] = time.perf_counter() - inicio
+        return registro
+
+    def _retreinar(self, soma, histogramas):
+        """Novos coeficientes pelas equações normais da janela; a janela vira a linha de base das features."""
+        p = len(soma.Xty)
+        coef = np.linalg.solve(soma.XtX + 1e-9 * np.eye(p), soma.Xty)
+        sse = soma.yty - 2 * coef @ soma.Xty + coef @ soma.XtX @ coef
+        rmse = float(np.sqrt(max(sse, 0.0) / soma.n))
+        referencia = {'mae': rmse * np.sqrt(2 / np.pi), 'rmse': rmse}  # MAE de resíduos ~normais
+        base = {nome: h for nome, h in histogramas.items() if nome in FEATURES}
+        # Resíduos do modelo antigo não servem de referência: faixas reescaladas, sem contagens
+        escala = rmse / self.modelo.referencia['rmse'] if self.modelo.referencia['rmse'] else 1.0
+        base['residuos'] = Histograma(self.modelo.base['residuos'].bordas * escala)
+        self.modelo = ModeloPersistido(coef, referencia, base, self.modelo.versao + 1,
+                                       n_treino=soma.n)
+        self.janela.clear()
+        self.retreinado = True
+        self.residuos_total = base['residuos'].vazio()
+        if self.caminho_modelo:
+            self.modelo.salvar(self.caminho_modelo)
+
+
+if __name__ == '__main__':
+    import sys
+
+    from ingestao import carregar_vendas
+
+    simular_deriva = '--simular-deriva' in sys.argv
+    df = carregar_vendas().sort_values('data_venda', kind='stable').reset_index(drop=True)
+
+    print("="*80)
+    print("MONITORAMENTO DO MODELO DE VALOR_TOTAL")
+    print("="*80)
+
+    # Treino nos primeiros 6 meses, como o modelo estaria em produção
+    meses = df['data_venda'].dt.to_period('M')
+    corte = meses.min() + 6
+    historico, novos = df[meses < corte], df[meses >= corte].copy()
+    if simular_deriva:
+        # Reajuste de preços: tíquetes ~60% maiores a partir do 9º mês
+        afetados = novos['data_venda'].dt.to_period('M') >= meses.min() + 8
+        for coluna in ('preco_unitario', 'valor_total', 'custo_total'):
+            novos.loc[afetados, coluna] *= 1.6
+
+    modelo = ModeloPersistido.treinar(historico)
+    caminho = modelo.salvar()
+    print(f"Modelo treinado com {modelo.n_treino} vendas e salvo em '{caminho}' "
+          f"(RMSE de referência R$ {modelo.referencia['rmse']:,.2f})")
+
+    monitor = MonitorModelo(ModeloPersistido.carregar(caminho), janela=3, min_obs=100,
+                            caminho_modelo=caminho)
+    print(f"\n{'Lote':8s} {'n':>5s} {'MAE':>10s} {'RMSE':>10s} {'RMSE/ref':>9s} "
+          f"{'PSI qtd':>8s} {'PSI preço':>9s} {'PSI camp':>8s} {'PSI res':>8s} {'ms':>6s}  decisão")
+    tempos = []
+    for mes, lote in novos.groupby(novos['data_venda'].dt.to_period('M')):
+        registro = monitor.processar(lote)
+        tempos.append(registro['segundos'])
+        janela, desvios = registro['janela'], registro['psi']
+        if registro['retreino']:
+            decisao = f"RETREINO → v{monitor.modelo.versao} ({'; '.join(registro['motivos'])})"
+        elif registro['motivos']:
+            decisao = f"aguardando janela completa ({'; '.join(registro['motivos'])})"
+        else:
+            decisao = 'ok'
+        print(f"{str(mes):8s} {registro['lote']['n']:>5d} {janela['mae']:>10,.2f} "
+              f"{janela['rmse']:>10,.2f} {registro['razao_rmse']:>9.2f} "
+              f"{desvios['quantidade']:>8.3f} {desvios['preco_unitario']:>9.3f} "
+              f"{desvios['tem_campanha']:>8.3f} {desvios['residuos']:>8.3f} "
+              f"{registro['segundos'] * 1000:>6.2f}  {decisao}")
+
+    # Custo de referência: reajuste completo sobre todo o histórico disponível
+    inicio = time.perf_counter()
+    ModeloPersistido.treinar(df)
+    tempo_refit = time.perf_counter() - inicio
+    print(f"\nCusto médio por lote: {np.mean(tempos) * 1000:.2f} ms | "
+          f"reajuste completo: {tempo_refit * 1000:.2f} ms")
+    residuos = monitor.residuos_total
+    if residuos.contagens.sum():
+        print(f"\nHistograma dos resíduos do modelo v{monitor.modelo.versao} (faixas da linha de base):")
+        limites = [-np.inf, *residuos.bordas, np.inf]
+        for i, proporcao in enumerate(residuos.proporcoes()):
+            print(f"  ({limites[i]:>10,.0f}, {limites[i + 1]:>10,.0f}]  {proporcao:6.1%}  {'█' * int(proporcao * 100)}")
+    else:
+        print(f"\nModelo v{monitor.modelo.versao} ainda não pontuou lotes: sem histograma de resíduos")
+    total = monitor.total.metricas()
+    print(f"Acumulado desde o início: MAE R$ {total['mae']:,.2f} | RMSE R$ {total['rmse']:,.2f} | "
+          f"R² {total['r2']:.4f}")
@@ -0,0 +1,208 @@
+"""
+================================================================================
+ANÁLISES EM LOTE PARA VÁRIAS REDES DE VAREJO (MULTI-TENANT)
+================================================================================
+
+Roda a suíte completa (descritiva, diagnóstica, preditiva e prescritiva) para
+cada rede, com os próprios extratos de vendas, num pool de processos:
+
+- cada rede grava só no próprio diretório (<saida>/<rede>/relatorio.html e
+  relatorio.json, com as figuras embutidas); nada vai para o diretório de
+  trabalho, então execuções paralelas não se sobrescrevem;
+- pandas, matplotlib, seaborn, sklearn e scipy são importados e os scripts
+  compilados uma vez no processo principal, antes do pool; os trabalhadores
+  herdam tudo por fork (ou repetem a preparação no inicializador, em
+  plataformas sem fork) e reutilizam esse estado em todas as redes que
+  processam;
+- uma rede com erro não interrompe as demais: o erro vai para o resumo.
+
+Ao final grava <saida>/resumo_redes.csv e .json, uma linha por rede com os
+principais números de cada análise, e informa a vazão em redes por hora.
+
+Uso:
+    python multi_redes.py redes.json               # {"rede": "fonte", ...}
+    python multi_redes.py norte=dados/norte.csv sul='dados/sul/*.csv'
+    python multi_redes.py extratos/*.csv           # rede = nome do arquivo
+    opções: --saida redes --processos N --sem-graficos
+================================================================================
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+DIRETORIO_SAIDA = 'redes'
+ANALISES = ('descritiva', 'diagnostica', 'preditiva', 'prescritiva')
+
+# Números de cada relatório que entram no resumo entre redes: coluna -> (análise, chave)
+RESUMO = {
+    'transacoes': ('descritiva', 'total_transacoes'),
+    'faturamento_total': ('descritiva', 'faturamento_total'),
+    'ticket_medio': ('descritiva', 'ticket_medio'),
+    'satisfacao_media': ('descritiva', 'satisfacao_media'),
+    'produto_mais_vendido': ('descritiva', 'produto_mais_vendido'),
+    'lucro_total': ('diagnostica', 'lucro_total'),
+    'margem_lucro_media': ('diagnostica', 'margem_lucro_media'),
+    'melhor_canal': ('diagnostica', 'melhor_canal'),
+    'melhor_regiao': ('diagnostica', 'melhor_regiao'),
+    'r2_modelo': ('preditiva', 'r2'),
+    'lucro_liquido_alocacao': ('prescritiva', 'alocacao_resumo', 'lucro_liquido'),
+}
+
+
+# ============================================================================
+# 1. REDES
+# ============================================================================
+
+def ler_redes(entradas):
+    """Converte manifestos JSON, pares rede=fonte e caminhos em {rede: fonte}."""
+    redes = {}
+    for entrada in entradas:
+        if entrada.endswith('.json') and os.path.isfile(entrada):
+            with open(entrada, encoding='utf-8') as f:
+                base = os.path.dirname(entrada)
+                redes.update({nome: os.path.join(base, fonte) for nome, fonte in json.load(f).items()})
+        elif '=' in entrada:
+            nome, fonte = entrada.split('=', 1)
+            redes[nome.strip()] = fonte.strip()
+        else:
+            for caminho in sorted(glob.glob(entrada)) or [entrada]:
+                nome = os.path.splitext(os.path.basename(os.path.normpath(caminho)))[0]
+                redes[nome] = caminho
+    return redes
+
+
+# ============================================================================
+# 2. TRABALHADORES
+# ============================================================================
+
+def preparar_trabalhador():
+    """Importa as bibliotecas pesadas e compila os scripts uma única vez por processo."""
+    import warnings
+
+    import seaborn  # noqa: F401  (os scripts o importam; fica em sys.modules)
+    import scipy.stats  # noqa: F401
+    import sklearn.linear_model  # noqa: F401
+    import sklearn.model_selection  # noqa: F401
+
+    import relatorio
+
+    warnings.filterwarnings('ignore')
+    for nome in ANALISES:
+        relatorio.compilar_script(nome)
+
+
+def analisar_rede(rede, fonte, diretorio, com_graficos=True):
+    """Gera o relatório de uma rede no próprio diretório; retorna o resumo da rede."""
+    import relatorio
+
+    inicio = time.perf_counter()
+    anterior = os.getcwd()
+    resultado = {'rede': rede, 'fonte': fonte}
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        # Qualquer arquivo relativo gravado pelos scripts cai no diretório da rede
+        os.chdir(diretorio)
+        relatorio.gerar_relatorio(fonte, '.', ANALISES, com_graficos)
+        with open('relatorio.json', encoding='utf-8') as f:
+            metricas = json.load(f)
+        for coluna, caminho in RESUMO.items():
+            valor = metricas
+            for chave in caminho:
+                valor = valor.get(chave) if isinstance(valor, dict) else None
+            resultado[coluna] = valor
+        resultado['status'] = 'ok'
+    except Exception as erro:
+        resultado['status'] = 'erro'
+        resultado['erro'] = f"{type(erro).__name__}: {erro}"
+        with open(os.path.join(diretorio, 'erro.txt'), 'w', encoding='utf-8') as f:
+            f.write(traceback.format_exc())
+    finally:
+        os.chdir(anterior)
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+# ============================================================================
+# 3. ORQUESTRAÇÃO
+# ============================================================================
+
+def executar_redes(redes, saida=DIRETORIO_SAIDA, n_processos=None, com_graficos=True):
+    """Distribui as redes no pool; retorna (resumo DataFrame, estatísticas)."""
+    import pandas as pd
+
+    saida = os.path.abspath(saida)
+    # Caminhos absolutos: os trabalhadores mudam de diretório
+    redes = {nome: fonte if os.path.isabs(fonte) else os.path.abspath(fonte)
+             for nome, fonte in redes.items()}
+    n_processos = min(n_processos or os.cpu_count() or 1, len(redes)) or 1
+
+    inicio = time.perf_counter()
+    preparar_trabalhador()
+    metodos = multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context('fork' if 'fork' in metodos else None)
+    linhas = []
+    with ProcessPoolExecutor(max_workers=n_processos, mp_context=contexto,
+                             initializer=None if 'fork' in metodos else preparar_trabalhador) as executor:
+        tarefas = {executor.submit(analisar_rede, nome, fonte, os.path.join(saida, nome),
+                                   com_graficos): nome
+                   for nome, fonte in redes.items()}
+        for tarefa in as_completed(tarefas):
+            linha = tarefa.result()
+            linhas.append(linha)
+            marca = '✓' if linha['status'] == 'ok' else '✗'
+            print(f"{marca} {linha['rede']} ({linha['segundos']:.1f}s)", file=sys.stderr)
+    decorrido = time.perf_counter() - inicio
+
+    resumo = pd.DataFrame(linhas).set_index('rede').sort_index()
+    os.makedirs(saida, exist_ok=True)
+    resumo.to_csv(os.path.join(saida, 'resumo_redes.csv'), sep=';', decimal=',')
+    resumo.reset_index().to_json(os.path.join(saida, 'resumo_redes.json'), orient='records',
+                                 force_ascii=False, indent=2)
+    concluidas = int((resumo['status'] == 'ok').sum())
+    estatisticas = {
+        'redes': len(redes),
+        'concluidas': concluidas,
+        'com_erro': len(redes) - concluidas,
+        'processos': n_processos,
+        'segundos': decorrido,
+        'redes_por_hora': concluidas / decorrido * 3600 if decorrido else float('inf'),
+    }
+    return resumo, estatisticas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Suíte de análises para várias redes de varejo')
+    parser.add_argument('redes', nargs='+', help='manifesto .json, rede=fonte ou caminhos/globs')
+    parser.add_argument('--saida', default=DIRETORIO_SAIDA, help='diretório com uma pasta por rede')
+    parser.add_argument('--processos', type=int, default=None, help='tamanho do pool')
+    parser.add_argument('--sem-graficos', action='store_true', help='só métricas, sem rodar os scripts')
+    args = parser.parse_args(argv)
+
+    redes = ler_redes(args.redes)
+    if not redes:
+        parser.error('nenhuma rede informada')
+    resumo, estatisticas = executar_redes(redes, args.saida, args.processos, not args.sem_graficos)
+
+    print("="*80)
+    print("RESUMO ENTRE REDES")
+    print("="*80)
+    colunas = [c for c in ('transacoes', 'faturamento_total', 'lucro_total', 'margem_lucro_media',
+                           'satisfacao_media', 'r2_modelo', 'melhor_canal', 'status')
+               if c in resumo.columns]
+    print(resumo[colunas].round(2).to_string())
+    print(f"\nRedes concluídas: {estatisticas['concluidas']} de {estatisticas['redes']} "
+          f"({estatisticas['processos']} processos, {estatisticas['segundos']:.1f}s)")
+    print(f"Vazão: {estatisticas['redes_por_hora']:,.0f} redes/hora")
+    print(f"Resumo salvo em '{os.path.join(args.saida, 'resumo_redes.csv')}'")
+    return 0 if estatisticas['com_erro'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
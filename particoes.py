@@ -0,0 +1,303 @@
+"""
+================================================================================
+ARMAZENAMENTO PARTICIONADO POR MÊS COM MAPAS DE ZONA
+================================================================================
+
+particionar() grava a tabela de vendas como um extrato por mês de
+data_venda (vendas_AAAA-MM.csv) e um manifesto zonas.json com o mapa de
+zona de cada partição:
+
+- número de linhas;
+- mínimo e máximo de data_venda e de cada medida numérica;
+- conjunto de valores presentes em cada dimensão.
+
+Um Recorte (período + condições) é comparado com os mapas de zona antes de
+qualquer leitura: partições que não podem conter linhas do recorte nem são
+abertas. Nas partições restantes as linhas são filtradas logo após a leitura.
+
+Os recortes chegam às análises pelas variáveis de ambiente VENDAS_DE,
+VENDAS_ATE e VENDAS_ONDE (condições separadas por ';'), lidas por
+ingestao.carregar_vendas, ou pelas opções --from/--to/--where de analise.py.
+
+Condições aceitas em --where / VENDAS_ONDE:
+    regiao=Sul,Norte        valor em uma lista
+    campanha!=Nenhuma       valor fora de uma lista
+    quantidade>=5           comparação (=, !=, <, <=, >, >=) com um número
+    data_venda<2025-07-01   comparação com uma data AAAA-MM-DD
+
+Uso:
+    python particoes.py [FONTE] [DESTINO]
+================================================================================
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from consulta_lazy import COLUNAS_VENDAS, DERIVADAS, col
+
+ARQUIVO_ZONAS = 'zonas.json'
+DIRETORIO_PARTICOES = 'vendas_particionadas'
+
+VARIAVEL_DE = 'VENDAS_DE'
+VARIAVEL_ATE = 'VENDAS_ATE'
+VARIAVEL_ONDE = 'VENDAS_ONDE'
+
+DIMENSOES = ('canal_venda', 'regiao', 'categoria_produto', 'campanha')
+MEDIDAS = ('quantidade', 'preco_unitario', 'valor_total', 'custo_total', 'satisfacao_cliente')
+
+_CONDICAO = re.compile(r'^\s*(\w+)\s*(>=|<=|!=|==|=|>|<)\s*(.*?)\s*$')
+_COMPARACOES = {
+    '>': lambda minimo, maximo, v: maximo > v,
+    '>=': lambda minimo, maximo, v: maximo >= v,
+    '<': lambda minimo, maximo, v: minimo < v,
+    '<=': lambda minimo, maximo, v: minimo <= v,
+}
+
+
+class ErroRecorte(ValueError):
+    """Período ou condição de recorte inválidos."""
+
+
+def _exigir_ordem(coluna, op):
+    # Dimensões são categorias sem ordem: só igualdade e diferença fazem sentido
+    if op in _COMPARACOES and coluna in DIMENSOES:
+        raise ErroRecorte(f"'{coluna}{op}' inválido: dimensões aceitam apenas = e !=")
+
+
+# ============================================================================
+# 1. RECORTES (PERÍODO + CONDIÇÕES)
+# ============================================================================
+
+class Condicao:
+    """Uma comparação `coluna op valores` sobre a tabela de vendas."""
+
+    def __init__(self, coluna, op, valores):
+        if coluna not in COLUNAS_VENDAS and coluna not in DERIVADAS:
+            raise ErroRecorte(f"Coluna desconhecida no recorte: {coluna!r}")
+        _exigir_ordem(coluna, op)
+        if op in _COMPARACOES and len(valores) != 1:
+            raise ErroRecorte(f"'{coluna}{op}' aceita um único valor")
+        self.coluna = coluna
+        self.op = '=' if op == '==' else op
+        self.valores = tuple(self._converter(v) for v in valores)
+
+    @classmethod
+    def interpretar(cls, texto):
+        casamento = _CONDICAO.match(texto)
+        if not casamento or not casamento.group(3):
+            raise ErroRecorte(f"Condição inválida: {texto!r} (ex.: regiao=Sul,Norte ou quantidade>=5)")
+        coluna, op, valores = casamento.groups()
+        return cls(coluna, op, [v.strip() for v in valores.split(',') if v.strip()])
+
+    def _converter(self, valor):
+        if self.coluna == 'data_venda':
+            try:
+                return pd.Timestamp(valor).strftime('%Y-%m-%d')
+            except ValueError as erro:
+                raise ErroRecorte(f"Data inválida em {self.coluna}: {valor!r}") from erro
+        if self.coluna in DIMENSOES:
+            return valor
+        try:
+            return float(valor)
+        except ValueError as erro:
+            raise ErroRecorte(f"Valor numérico inválido em {self.coluna}: {valor!r}") from erro
+
+    def expr(self):
+        coluna = col(self.coluna)
+        valores = self.valores
+        if self.coluna == 'data_venda':
+            valores = tuple(np.datetime64(v) for v in valores)
+        if self.op == '=':
+            return coluna.isin(valores) if len(valores) > 1 else coluna == valores[0]
+        if self.op == '!=':
+            condicao = coluna != valores[0]
+            for valor in valores[1:]:
+                condicao = condicao & (coluna != valor)
+            return condicao
+        return coluna._binaria(self.op, valores[0])
+
+    def pode_casar(self, zona):
+        """False só quando o mapa de zona prova que nenhuma linha da partição atende."""
+        if self.coluna in zona['valores']:
+            presentes = set(zona['valores'][self.coluna])
+            if self.op == '=':
+                return not presentes.isdisjoint(self.valores)
+            if self.op == '!=':
+                return not presentes <= set(self.valores)
+            _exigir_ordem(self.coluna, self.op)
+            return True
+        if self.coluna in zona['intervalos']:
+            minimo, maximo = zona['intervalos'][self.coluna]
+            if minimo is None:
+                return True
+            if self.op == '=':
+                return any(minimo <= v <= maximo for v in self.valores)
+            if self.op == '!=':
+                return not (minimo == maximo and minimo in self.valores)
+            _exigir_ordem(self.coluna, self.op)
+            return _COMPARACOES[self.op](minimo, maximo, self.valores[0])
+        # Colunas derivadas não têm mapa de zona: a partição precisa ser lida
+        return True
+
+    def __repr__(self):
+        return f"{self.coluna}{self.op}{','.join(map(str, self.valores))}"
+
+
+class Recorte:
+    """Período [de, ate] e condições; vazio quando nada foi pedido."""
+
+    def __init__(self, de=None, ate=None, onde=()):
+        if isinstance(onde, str):
+            onde = [parte for parte in onde.split(';') if parte.strip()]
+        self.condicoes = [c if isinstance(c, Condicao) else Condicao.interpretar(c) for c in onde]
+        # AAAA, AAAA-MM ou AAAA-MM-DD: o período cobre o ano/mês inteiro
+        if de:
+            self.condicoes.insert(0, Condicao('data_venda', '>=', [_periodo(de).start_time]))
+        if ate:
+            self.condicoes.insert(1 if de else 0,
+                                  Condicao('data_venda', '<=', [_periodo(ate).end_time]))
+
+    @classmethod
+    def do_ambiente(cls):
+        return cls(os.environ.get(VARIAVEL_DE), os.environ.get(VARIAVEL_ATE),
+                   os.environ.get(VARIAVEL_ONDE, ''))
+
+    @property
+    def vazio(self):
+        return not self.condicoes
+
+    def expr(self):
+        predicado = None
+        for condicao in self.condicoes:
+            predicado = condicao.expr() if predicado is None else predicado & condicao.expr()
+        return predicado.substituir(DERIVADAS) if predicado is not None else None
+
+    def pode_casar(self, zona):
+        return all(c.pode_casar(zona) for c in self.condicoes)
+
+    def aplicar(self, df):
+        if self.vazio:
+            return df
+        predicado = self.expr()
+        dados = {c: df[c] for c in predicado.colunas()}
+        mascara = pd.Series(predicado.avaliar(dados)).to_numpy(dtype=bool)
+        return df if mascara.all() else df[mascara].reset_index(drop=True)
+
+    def __repr__(self):
+        return ' e '.join(map(repr, self.condicoes)) or '(tudo)'
+
+
+def _periodo(texto):
+    try:
+        return pd.Period(str(texto))
+    except ValueError as erro:
+        raise ErroRecorte(f"Período inválido: {texto!r} (use AAAA, AAAA-MM ou AAAA-MM-DD)") from erro
+
+
+# ============================================================================
+# 2. MAPAS DE ZONA E PODA DE PARTIÇÕES
+# ============================================================================
+
+def mapa_de_zona(df):
+    intervalos = {}
+    for coluna in ('data_venda', *MEDIDAS):
+        serie = df[coluna].dropna()
+        if serie.empty:
+            intervalos[coluna] = [None, None]
+        elif coluna == 'data_venda':
+            intervalos[coluna] = [serie.min().strftime('%Y-%m-%d'), serie.max().strftime('%Y-%m-%d')]
+        else:
+            intervalos[coluna] = [float(serie.min()), float(serie.max())]
+    return {
+        'linhas': int(len(df)),
+        'intervalos': intervalos,
+        'valores': {d: sorted(map(str, df[d].dropna().unique())) for d in DIMENSOES},
+    }
+
+
+def e_particionado(fonte):
+    """True para um diretório com zonas.json ou para o próprio zonas.json."""
+    if not isinstance(fonte, (str, os.PathLike)):
+        return False
+    fonte = os.fspath(fonte)
+    if os.path.basename(fonte) == ARQUIVO_ZONAS:
+        return os.path.isfile(fonte)
+    return os.path.isfile(os.path.join(fonte, ARQUIVO_ZONAS))
+
+
+def carregar_zonas(fonte):
+    """Lê o manifesto; os caminhos das partições voltam absolutos a partir do diretório."""
+    fonte = os.fspath(fonte)
+    manifesto = fonte if os.path.basename(fonte) == ARQUIVO_ZONAS else os.path.join(fonte, ARQUIVO_ZONAS)
+    with open(manifesto, encoding='utf-8') as f:
+        particoes = json.load(f)['particoes']
+    base = os.path.dirname(manifesto)
+    for particao in particoes:
+        particao['caminho'] = os.path.join(base, particao['arquivo'])
+    return particoes
+
+
+def podar(fonte, recorte=None):
+    """Caminhos das partições que podem conter linhas do recorte (sem abrir nenhuma)."""
+    particoes = carregar_zonas(fonte)
+    if recorte is None or recorte.vazio:
+        return [p['caminho'] for p in particoes]
+    return [p['caminho'] for p in particoes if recorte.pode_casar(p)]
+
+
+def particionar(fonte=None, destino=DIRETORIO_PARTICOES):
+    """Grava a fonte como uma partição por mês de data_venda mais o zonas.json."""
+    from ingestao import carregar_vendas
+
+    df = carregar_vendas(fonte, recorte=Recorte())
+    os.makedirs(destino, exist_ok=True)
+    particoes = []
+    for mes, parte in df.groupby(df['data_venda'].dt.to_period('M'), sort=True):
+        arquivo = f'vendas_{mes}.csv'
+        saida = parte.assign(data_venda=parte['data_venda'].dt.strftime('%Y-%m-%d'))
+        saida.to_csv(os.path.join(destino, arquivo), sep=';', decimal=',', index=False)
+        particoes.append({'arquivo': arquivo, 'mes': str(mes), **mapa_de_zona(parte)})
+
+    # Substituição atômica: leitores nunca veem um manifesto pela metade
+    manifesto = os.path.join(destino, ARQUIVO_ZONAS)
+    with open(manifesto + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'particoes': particoes}, f, ensure_ascii=False, indent=1)
+    os.replace(manifesto + '.tmp', manifesto)
+    return manifesto
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    from ingestao import carregar_vendas
+
+    fonte = sys.argv[1] if len(sys.argv) > 1 else None
+    destino = sys.argv[2] if len(sys.argv) > 2 else DIRETORIO_PARTICOES
+
+    print("="*80)
+    print("PARTICIONAMENTO MENSAL COM MAPAS DE ZONA")
+    print("="*80)
+
+    particionar(fonte, destino)
+    particoes = carregar_zonas(destino)
+    print(f"Partições gravadas em '{destino}': {len(particoes)} "
+          f"({sum(p['linhas'] for p in particoes)} registros)")
+
+    recortes = {
+        'Histórico completo': Recorte(),
+        'Q4 2025': Recorte('2025-10', '2025-12'),
+        'Sul, Q4 2025': Recorte('2025-10', '2025-12', ['regiao=Sul']),
+        'Vendas acima de R$ 20 mil': Recorte(onde=['valor_total>20000']),
+    }
+    print(f"\n{'Recorte':30s} {'Partições':>10s} {'Registros':>10s} {'Tempo':>9s}")
+    for nome, recorte in recortes.items():
+        inicio = time.perf_counter()
+        df = carregar_vendas(destino, n_processos=1, recorte=recorte)
+        decorrido = time.perf_counter() - inicio
+        lidas = len(podar(destino, recorte))
+        print(f"{nome:30s} {lidas:>4d} de {len(particoes):<3d} {len(df):>10d} {decorrido * 1000:>7.1f}ms")
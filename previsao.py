@@ -0,0 +1,184 @@
+"""
+================================================================================
+PREVISÃO DO FATURAMENTO DIÁRIO POR SÉRIE (CANAL × REGIÃO)
+================================================================================
+
+Monta painéis diários (uma linha por série, uma coluna por dia) a partir da
+tabela de vendas e ajusta modelos leves em todas as séries de uma vez. Cada
+modelo é um kernel NumPy que opera sobre a matriz inteira (séries × dias);
+blocos de séries podem ser processados em paralelo por threads.
+
+Modelos disponíveis:
+1. sazonal_ingenuo        - repete a última semana observada
+2. suavizacao_exponencial - SES com alfa escolhido por série numa grade
+3. regressao_calendario   - mínimos quadrados em tendência + dia da semana
+
+O backtest usa origem móvel (rolling origin) e informa MAE, sMAPE e a vazão
+em séries por segundo.
+================================================================================
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from consulta_lazy import vendas
+
+
+# ============================================================================
+# 1. PAINEL DIÁRIO
+# ============================================================================
+
+def montar_painel(fonte=None, dimensoes=('canal_venda', 'regiao'),
+                  medida='valor_total'):
+    """Retorna um DataFrame séries × dias com a soma diária da medida (0 sem vendas)."""
+    diario = (vendas(fonte)
+              .agrupar(*dimensoes, 'data_venda')
+              .agregar(valor=(medida, 'sum'))
+              .coletar()['valor'])
+    painel = diario.unstack('data_venda', fill_value=0.0)
+    dias = pd.date_range(painel.columns.min(), painel.columns.max(), freq='D')
+    return painel.reindex(columns=dias, fill_value=0.0)
+
+
+# ============================================================================
+# 2. KERNELS DE PREVISÃO (VETORIZADOS SOBRE AS SÉRIES)
+# ============================================================================
+
+def prever_sazonal_ingenuo(Y, datas, horizonte, periodo=7):
+    ultima_estacao = Y[:, -periodo:]
+    repeticoes = int(np.ceil(horizonte / periodo))
+    return np.tile(ultima_estacao, repeticoes)[:, :horizonte]
+
+
+def prever_suavizacao_exponencial(Y, datas, horizonte,
+                                  alfas=(0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9)):
+    n_series, n_dias = Y.shape
+    melhor_erro = np.full(n_series, np.inf)
+    melhor_nivel = Y[:, 0].astype(float)
+
+    for alfa in alfas:
+        nivel = Y[:, 0].astype(float)
+        erro = np.zeros(n_series)
+        for t in range(1, n_dias):
+            residuo = Y[:, t] - nivel
+            erro += residuo ** 2
+            nivel = nivel + alfa * residuo
+        melhor = erro < melhor_erro
+        melhor_erro = np.where(melhor, erro, melhor_erro)
+        melhor_nivel = np.where(melhor, nivel, melhor_nivel)
+
+    return np.repeat(melhor_nivel[:, None], horizonte, axis=1)
+
+
+def _calendario(datas, n_total):
+    # Intercepto, tendência e dummies de dia da semana (segunda como base)
+    t = np.arange(len(datas)) / n_total
+    dia_semana = np.asarray(datas.dayofweek)
+    X = np.column_stack([np.ones(len(datas)), t] +
+                        [(dia_semana == d).astype(float) for d in range(1, 7)])
+    return X
+
+
+def prever_regressao_calendario(Y, datas, horizonte, ridge=1e-3):
+    n_dias = Y.shape[1]
+    futuras = pd.date_range(datas[-1] + pd.Timedelta(days=1), periods=horizonte, freq='D')
+    todas = datas.append(futuras)
+    X = _calendario(todas, n_dias)
+    X_hist, X_fut = X[:n_dias], X[n_dias:]
+
+    # Uma única solução com todas as séries como lados direitos
+    A = X_hist.T @ X_hist + ridge * np.eye(X.shape[1])
+    B = np.linalg.solve(A, X_hist.T @ Y.T)
+    return (X_fut @ B).T
+
+
+MODELOS = {
+    'sazonal_ingenuo': prever_sazonal_ingenuo,
+    'suavizacao_exponencial': prever_suavizacao_exponencial,
+    'regressao_calendario': prever_regressao_calendario,
+}
+
+
+def _em_blocos(kernel, Y, datas, horizonte, n_threads=None, tamanho_bloco=2048):
+    if n_threads is None or n_threads <= 1 or len(Y) <= tamanho_bloco:
+        return kernel(Y, datas, horizonte)
+    blocos = [Y[i:i + tamanho_bloco] for i in range(0, len(Y), tamanho_bloco)]
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        partes = list(executor.map(lambda b: kernel(b, datas, horizonte), blocos))
+    return np.vstack(partes)
+
+
+# ============================================================================
+# 3. PREVISÃO E BACKTEST
+# ============================================================================
+
+def prever(painel, horizonte=14, modelo='regressao_calendario', n_threads=None):
+    """Previsão para os próximos `horizonte` dias de todas as séries do painel."""
+    if modelo not in MODELOS:
+        raise ValueError(f"Modelo desconhecido: {modelo!r} (use um de {', '.join(MODELOS)})")
+    Y = painel.to_numpy(dtype=float)
+    previsto = _em_blocos(MODELOS[modelo], Y, painel.columns, horizonte, n_threads)
+    futuras = pd.date_range(painel.columns[-1] + pd.Timedelta(days=1),
+                            periods=horizonte, freq='D')
+    return pd.DataFrame(np.maximum(previsto, 0.0), index=painel.index, columns=futuras)
+
+
+def backtest(painel, horizonte=7, n_origens=4, modelos=None, n_threads=None):
+    """Backtest com origem móvel: cada origem treina até o corte e prevê `horizonte` dias."""
+    modelos = list(MODELOS) if modelos is None else modelos
+    Y = painel.to_numpy(dtype=float)
+    datas = painel.columns
+    n_dias = Y.shape[1]
+    origens = [n_dias - horizonte * (k + 1) for k in reversed(range(n_origens))]
+    if origens[0] < 14:
+        raise ValueError("Histórico curto demais para o número de origens pedido")
+
+    linhas = []
+    for nome in modelos:
+        erros_abs, smapes = [], []
+        inicio = time.perf_counter()
+        for origem in origens:
+            real = Y[:, origem:origem + horizonte]
+            previsto = np.maximum(_em_blocos(MODELOS[nome], Y[:, :origem], datas[:origem],
+                                             horizonte, n_threads), 0.0)
+            erros_abs.append(np.abs(real - previsto).mean())
+            denominador = np.abs(real) + np.abs(previsto)
+            smapes.append(np.mean(np.divide(2 * np.abs(real - previsto), denominador,
+                                            out=np.zeros_like(real), where=denominador > 0)))
+        decorrido = time.perf_counter() - inicio
+        linhas.append({
+            'modelo': nome,
+            'mae': float(np.mean(erros_abs)),
+            'smape': float(np.mean(smapes)) * 100,
+            'series_por_segundo': len(Y) * len(origens) / max(decorrido, 1e-9),
+        })
+    return pd.DataFrame(linhas).set_index('modelo')
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("PREVISÃO DE FATURAMENTO DIÁRIO POR CANAL × REGIÃO")
+    print("="*80)
+
+    painel = montar_painel()
+    print(f"\nSéries: {len(painel)} | Dias: {painel.shape[1]} "
+          f"({painel.columns[0]:%d/%m/%Y} a {painel.columns[-1]:%d/%m/%Y})")
+
+    print("\n" + "="*80)
+    print("1. BACKTEST (ORIGEM MÓVEL, HORIZONTE DE 7 DIAS)")
+    print("="*80)
+    resultado = backtest(painel)
+    print("\n", resultado.round(2))
+    melhor_modelo = resultado['mae'].idxmin()
+    print(f"\n✓ Melhor modelo (MAE): {melhor_modelo}")
+
+    print("\n" + "="*80)
+    print("2. PREVISÃO DOS PRÓXIMOS 14 DIAS")
+    print("="*80)
+    previsao = prever(painel, horizonte=14, modelo=melhor_modelo)
+    total_por_canal = previsao.sum(axis=1).groupby(level='canal_venda').sum()
+    for canal, valor in total_por_canal.items():
+        print(f"{canal:20s}: R$ {valor:14,.2f}")
@@ -0,0 +1,263 @@
+"""
+================================================================================
+RELATÓRIO EM LOTE (HEADLESS) - HTML ÚNICO + MÉTRICAS EM JSON
+================================================================================
+
+Executa as análises sem janela gráfica e monta um único relatório:
+
+- relatorio.html : uma seção por análise, com as métricas em tabelas, as
+                   figuras embutidas e a saída de console original;
+- relatorio.json : as mesmas métricas como dados estruturados.
+
+Cada seção é gravada (e o arquivo descarregado no disco) assim que fica
+pronta, de modo que o HTML pode ser acompanhado durante a execução. As
+figuras são capturadas no lugar de plt.savefig/plt.show e embutidas no
+formato que ficar menor entre PNG otimizado, WebP e SVG.
+
+Uso:
+    python relatorio.py [arquivo, glob ou manifesto] [diretorio_saida]
+================================================================================
+"""
+
+import base64
+import contextlib
+import functools
+import html
+import io
+import json
+import os
+import sys
+import time
+
+from ingestao import VARIAVEL_FONTE, carregar_vendas, listar_arquivos
+from metricas import METRICAS
+
+DIRETORIO_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+
+_CABECALHO = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>{titulo}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em auto; max-width: 1100px; color: #222; }}
+h1 {{ border-bottom: 3px solid #45B7D1; }}
+section {{ margin-bottom: 3em; }}
+table {{ border-collapse: collapse; margin: 1em 0; font-size: 0.9em; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: right; }}
+th {{ background: #f0f0f0; }}
+img, svg {{ max-width: 100%; height: auto; }}
+pre {{ background: #f7f7f7; padding: 1em; overflow-x: auto; font-size: 0.8em; }}
+</style>
+</head>
+<body>
+<h1>{titulo}</h1>
+<p>Gerado em {data}</p>
+"""
+
+_RODAPE = "</body>\n</html>\n"
+
+
+# ============================================================================
+# 1. FIGURAS
+# ============================================================================
+
+def _pyplot():
+    # matplotlib só é carregado quando há figuras: gerar_relatorio(com_graficos=False) não o importa
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def codificar_figura(fig, dpi=100):
+    """Renderiza a figura no formato mais compacto; retorna (formato, bytes)."""
+    candidatos = []
+    for formato, opcoes in (('png', {'pil_kwargs': {'optimize': True}}),
+                            ('webp', {'pil_kwargs': {'quality': 85, 'method': 6}}),
+                            ('svg', {})):
+        buffer = io.BytesIO()
+        try:
+            fig.savefig(buffer, format=formato, dpi=dpi, bbox_inches='tight', **opcoes)
+        except (ValueError, TypeError, OSError):
+            continue  # formato indisponível nesta instalação (ex.: Pillow sem WebP)
+        candidatos.append((len(buffer.getvalue()), formato, buffer.getvalue()))
+    _, formato, dados = min(candidatos)
+    return formato, dados
+
+
+def _html_figura(formato, dados, legenda):
+    if formato == 'svg':
+        svg = dados.decode('utf-8')
+        svg = svg[svg.index('<svg'):]
+        return f"<figure>{svg}<figcaption>{html.escape(legenda)}</figcaption></figure>\n"
+    mime = 'image/png' if formato == 'png' else 'image/webp'
+    b64 = base64.b64encode(dados).decode('ascii')
+    return (f'<figure><img alt="{html.escape(legenda)}" src="data:{mime};base64,{b64}">'
+            f"<figcaption>{html.escape(legenda)}</figcaption></figure>\n")
+
+
+@contextlib.contextmanager
+def capturar_figuras():
+    """Substitui plt.savefig/plt.show: as figuras vão para a lista, não para o disco."""
+    plt = _pyplot()
+    figuras = []
+    savefig_original, show_original = plt.savefig, plt.show
+
+    def savefig(nome, *args, **kwargs):
+        figuras.append((os.path.basename(str(nome)), plt.gcf()))
+
+    plt.savefig = savefig
+    plt.show = lambda *args, **kwargs: None
+    try:
+        yield figuras
+    finally:
+        plt.savefig, plt.show = savefig_original, show_original
+
+
+@contextlib.contextmanager
+def _fonte_dos_scripts(fonte):
+    # Os scripts leem a fonte padrão; aponta-a para os mesmos extratos do relatório
+    anterior = os.environ.get(VARIAVEL_FONTE)
+    if fonte is not None:
+        # Texto vai como está: um armazenamento particionado continua podando pelo recorte
+        os.environ[VARIAVEL_FONTE] = fonte if isinstance(fonte, str) else os.pathsep.join(listar_arquivos(fonte))
+    try:
+        yield
+    finally:
+        if anterior is None:
+            os.environ.pop(VARIAVEL_FONTE, None)
+        else:
+            os.environ[VARIAVEL_FONTE] = anterior
+
+
+@functools.lru_cache(maxsize=None)
+def compilar_script(nome):
+    """Código compilado de analise-<nome>.py, reaproveitado entre execuções."""
+    caminho = os.path.join(DIRETORIO_SCRIPTS, f'analise-{nome}.py')
+    with open(caminho, encoding='utf-8') as f:
+        return compile(f.read(), caminho, 'exec')
+
+
+def executar_script(nome, fonte=None):
+    """Roda analise-<nome>.py sem janela; retorna (saida_console, figuras)."""
+    codigo = compilar_script(nome)
+    saida = io.StringIO()
+    with _fonte_dos_scripts(fonte), capturar_figuras() as figuras, \
+            contextlib.redirect_stdout(saida):
+        exec(codigo, {'__name__': '__main__', '__file__': codigo.co_filename})
+    return saida.getvalue(), figuras
+
+
+# ============================================================================
+# 2. RELATÓRIO EM STREAMING
+# ============================================================================
+
+def _html_valor(valor):
+    if isinstance(valor, float):
+        return f"{valor:,.4f}" if abs(valor) < 10 else f"{valor:,.2f}"
+    return html.escape(str(valor))
+
+
+def _html_metricas(metricas):
+    escalares = {k: v for k, v in metricas.items() if not isinstance(v, dict)}
+    partes = ['<table>']
+    for chave, valor in escalares.items():
+        partes.append(f"<tr><th>{html.escape(chave)}</th><td>{_html_valor(valor)}</td></tr>")
+    partes.append('</table>')
+
+    for chave, valor in metricas.items():
+        if not isinstance(valor, dict):
+            continue
+        partes.append(f"<h3>{html.escape(chave)}</h3><table>")
+        linhas = list(valor.items())
+        if linhas and isinstance(linhas[0][1], dict):
+            colunas = list(linhas[0][1])
+            partes.append('<tr><th></th>' + ''.join(f"<th>{html.escape(c)}</th>" for c in colunas) + '</tr>')
+            for rotulo, linha in linhas:
+                partes.append(f"<tr><th>{html.escape(rotulo)}</th>" +
+                              ''.join(f"<td>{_html_valor(linha[c])}</td>" for c in colunas) + '</tr>')
+        else:
+            for rotulo, v in linhas:
+                partes.append(f"<tr><th>{html.escape(rotulo)}</th><td>{_html_valor(v)}</td></tr>")
+        partes.append('</table>')
+    return '\n'.join(partes) + '\n'
+
+
+class Relatorio:
+    """Relatório HTML gravado seção a seção, com espelho das métricas em JSON."""
+
+    def __init__(self, caminho_html, caminho_json=None, titulo='Relatório de Vendas'):
+        self.caminho_html = caminho_html
+        self.caminho_json = caminho_json or os.path.splitext(caminho_html)[0] + '.json'
+        self.titulo = titulo
+        self.metricas = {}
+        self._arquivo = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho_html)), exist_ok=True)
+        self._arquivo = open(self.caminho_html, 'w', encoding='utf-8')
+        self._gravar(_CABECALHO.format(titulo=html.escape(self.titulo),
+                                       data=time.strftime('%d/%m/%Y %H:%M')))
+        return self
+
+    def __exit__(self, *exc):
+        self._gravar(_RODAPE)
+        self._arquivo.close()
+        return False
+
+    def _gravar(self, texto):
+        self._arquivo.write(texto)
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+
+    def _gravar_json(self):
+        # Substituição atômica: o JSON no disco está sempre completo
+        temporario = self.caminho_json + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.metricas, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho_json)
+
+    def adicionar_secao(self, nome, titulo, metricas, figuras=(), console=None):
+        self.metricas[nome] = metricas
+        partes = [f'<section id="{html.escape(nome)}">\n<h2>{html.escape(titulo)}</h2>\n',
+                  _html_metricas(metricas)]
+        for legenda, fig in figuras:
+            partes.append(_html_figura(*codificar_figura(fig), legenda))
+            _pyplot().close(fig)
+        if console:
+            partes.append(f"<details><summary>Saída do console</summary>"
+                          f"<pre>{html.escape(console)}</pre></details>\n")
+        partes.append('</section>\n')
+        self._gravar(''.join(partes))
+        self._gravar_json()
+
+
+TITULOS = {
+    'descritiva': 'Análise Descritiva',
+    'diagnostica': 'Análise Diagnóstica',
+    'preditiva': 'Análise Preditiva',
+    'prescritiva': 'Análise Prescritiva',
+}
+
+
+def gerar_relatorio(fonte=None, diretorio='relatorio', analises=tuple(TITULOS),
+                    com_graficos=True):
+    """Gera relatorio.html e relatorio.json em `diretorio`, uma seção por análise."""
+    df = carregar_vendas(fonte)
+    caminho = os.path.join(diretorio, 'relatorio.html')
+    with Relatorio(caminho) as relatorio:
+        for nome in analises:
+            inicio = time.perf_counter()
+            metricas = METRICAS[nome](df)
+            console, figuras = executar_script(nome, fonte) if com_graficos else (None, [])
+            relatorio.adicionar_secao(nome, TITULOS[nome], metricas, figuras, console)
+            print(f"✓ {TITULOS[nome]} ({time.perf_counter() - inicio:.1f}s)", file=sys.stderr)
+    return caminho
+
+
+if __name__ == '__main__':
+    fonte = sys.argv[1] if len(sys.argv) > 1 else None
+    diretorio = sys.argv[2] if len(sys.argv) > 2 else 'relatorio'
+    caminho = gerar_relatorio(fonte, diretorio)
+    print(f"Relatório salvo em '{caminho}'")
@@ -0,0 +1,325 @@
+"""
+================================================================================
+SERVIDOR DE ANÁLISE (DAEMON) COM OS DADOS DE VENDAS EM MEMÓRIA
+================================================================================
+
+Carrega a tabela de vendas e ajusta o modelo de valor_total uma única vez e
+responde consultas ad hoc por HTTP em localhost, sem pagar a importação das
+bibliotecas nem a leitura do CSV a cada pergunta.
+
+Rotas (GET, respostas em JSON):
+
+  /consulta   filtros por dimensão (valores separados por vírgula), período e
+              agrupamento, ex.:
+              /consulta?categoria_produto=Beleza&regiao=Norte&canal_venda=App
+                       &campanha=Natal&medidas=margem_lucro:mean,lucro:sum
+              /consulta?agrupar=canal_venda,regiao&de=2025-10-01&ate=2025-12-31
+  /prever     previsão "e se" do modelo, ex.:
+              /prever?quantidade=10,20&preco_unitario=500,1500&tem_campanha=1
+  /saude      versão dos dados, número de linhas e estatísticas do cache
+
+Os filtros usam índices invertidos (valor -> posições das linhas) montados na
+carga; as respostas ficam num cache LRU. Um verificador em segundo plano
+recarrega tudo quando os arquivos da fonte mudam, trocando o estado de uma
+vez e invalidando o cache.
+
+Uso:
+    python servidor.py [--porta 8765] [--fonte 'extratos/*.csv']
+================================================================================
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+from consulta_lazy import vendas, derivar_coluna
+from ingestao import carregar_vendas, listar_arquivos
+
+DIMENSOES = ('canal_venda', 'regiao', 'categoria_produto', 'campanha')
+MEDIDAS_PADRAO = 'valor_total:sum,lucro:sum,margem_lucro:mean,satisfacao_cliente:mean'
+FEATURES_MODELO = ('quantidade', 'preco_unitario', 'tem_campanha')
+
+
+class ErroConsulta(ValueError):
+    """Parâmetros inválidos numa requisição; vira resposta HTTP 400."""
+
+
+# ============================================================================
+# 1. ESTADO EM MEMÓRIA (DADOS, ÍNDICES E MODELO)
+# ============================================================================
+
+class Estado:
+    """Tabela, índices invertidos e modelo de uma versão dos dados (imutável)."""
+
+    def __init__(self, fonte, versao):
+        self.fonte = fonte
+        self.versao = versao
+        self.assinatura = assinatura_fonte(fonte)
+        self.df = carregar_vendas(fonte)
+        self.datas = self.df['data_venda'].to_numpy()
+
+        self.indices = {}
+        for dimensao in DIMENSOES:
+            posicoes = self.df.groupby(dimensao, sort=False).indices
+            self.indices[dimensao] = {str(valor): np.sort(p) for valor, p in posicoes.items()}
+
+        X = np.column_stack([self.df['quantidade'], self.df['preco_unitario'],
+                             derivar_coluna(self.df, 'tem_campanha')])
+        self.modelo = LinearRegression().fit(X, self.df['valor_total'])
+        self.r2 = float(self.modelo.score(X, self.df['valor_total']))
+
+    def linhas(self, filtros, de=None, ate=None):
+        """Posições das linhas que atendem a todos os filtros (interseção de índices)."""
+        selecionadas = None
+        # Menores listas primeiro: a interseção encolhe mais rápido
+        listas = []
+        for dimensao, valores in filtros.items():
+            indice = self.indices[dimensao]
+            partes = [indice.get(v, np.empty(0, dtype=np.intp)) for v in valores]
+            listas.append(np.sort(np.concatenate(partes)) if len(partes) > 1 else partes[0])
+        for posicoes in sorted(listas, key=len):
+            selecionadas = posicoes if selecionadas is None else np.intersect1d(
+                selecionadas, posicoes, assume_unique=True)
+        if selecionadas is None:
+            selecionadas = np.arange(len(self.df))
+        if de is not None or ate is not None:
+            datas = self.datas[selecionadas]
+            mascara = np.ones(len(selecionadas), dtype=bool)
+            if de is not None:
+                mascara &= datas >= np.datetime64(de)
+            if ate is not None:
+                mascara &= datas <= np.datetime64(ate)
+            selecionadas = selecionadas[mascara]
+        return selecionadas
+
+
+def assinatura_fonte(fonte):
+    """Caminhos, tamanhos e datas de modificação: muda quando algum extrato muda."""
+    assinatura = []
+    for caminho in listar_arquivos(fonte):
+        try:
+            info = os.stat(caminho)
+            assinatura.append((caminho, info.st_size, info.st_mtime_ns))
+        except FileNotFoundError:
+            assinatura.append((caminho, None, None))
+    return tuple(assinatura)
+
+
+# ============================================================================
+# 2. CACHE LRU
+# ============================================================================
+
+class CacheLRU:
+    def __init__(self, capacidade=1024):
+        self.capacidade = capacidade
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave):
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave]
+            self.falhas += 1
+            return None
+
+    def guardar(self, chave, valor):
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+# ============================================================================
+# 3. CONSULTAS
+# ============================================================================
+
+def _lista(parametros, nome, padrao=None):
+    valores = parametros.get(nome)
+    if not valores:
+        return padrao
+    return [v.strip() for valor in valores for v in valor.split(',') if v.strip()]
+
+
+def responder_consulta(estado, parametros):
+    filtros = {d: _lista(parametros, d) for d in DIMENSOES if _lista(parametros, d)}
+    agrupar = _lista(parametros, 'agrupar', [])
+    invalidos = [d for d in agrupar if d not in DIMENSOES]
+    if invalidos:
+        raise ErroConsulta(f"Agrupamento inválido: {invalidos} (use {', '.join(DIMENSOES)})")
+
+    medidas = {}
+    for item in _lista(parametros, 'medidas', MEDIDAS_PADRAO.split(',')):
+        alvo, _, funcao = item.partition(':')
+        medidas[f"{alvo}_{funcao or 'sum'}"] = (alvo, funcao or 'sum')
+
+    de = (parametros.get('de') or [None])[0]
+    ate = (parametros.get('ate') or [None])[0]
+    try:
+        posicoes = estado.linhas(filtros, de, ate)
+    except ValueError as erro:
+        raise ErroConsulta(f"Data inválida (use AAAA-MM-DD): {erro}") from erro
+    if len(posicoes) == 0:
+        return {'n_vendas': 0, 'linhas': []}
+
+    try:
+        consulta = vendas(estado.df.iloc[posicoes]).agrupar(*agrupar).agregar(**medidas)
+        resultado = consulta.coletar()
+    except (KeyError, ValueError) as erro:
+        raise ErroConsulta(str(erro.args[0]) if erro.args else str(erro)) from erro
+
+    resultado = resultado.reset_index() if agrupar else resultado
+    linhas = json.loads(resultado.to_json(orient='records', force_ascii=False))
+    return {'n_vendas': int(len(posicoes)), 'linhas': linhas}
+
+
+def responder_previsao(estado, parametros):
+    try:
+        colunas = [np.array(_lista(parametros, f, ['0']), dtype=float) for f in FEATURES_MODELO]
+    except ValueError as erro:
+        raise ErroConsulta(f"Valores numéricos inválidos: {erro}") from erro
+    try:
+        colunas = np.broadcast_arrays(*colunas)
+    except ValueError as erro:
+        tamanhos = ', '.join(f"{f}={len(c)}" for f, c in zip(FEATURES_MODELO, colunas))
+        raise ErroConsulta(f"Listas de tamanhos incompatíveis ({tamanhos}): "
+                           f"use o mesmo tamanho ou um único valor") from erro
+    X = np.column_stack(colunas)
+    previsto = estado.modelo.predict(X)
+    return {
+        'r2_modelo': estado.r2,
+        'previsoes': [dict(zip(FEATURES_MODELO, linha.tolist()), valor_total_previsto=float(v))
+                      for linha, v in zip(X, previsto)],
+    }
+
+
+# ============================================================================
+# 4. SERVIDOR
+# ============================================================================
+
+class ServidorAnalise(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, fonte=None, capacidade_cache=1024, intervalo_recarga=5.0):
+        self.fonte = fonte
+        self.estado = Estado(fonte, versao=1)
+        self.cache = CacheLRU(capacidade_cache)
+        self.intervalo_recarga = intervalo_recarga
+        self._parar = threading.Event()
+        super().__init__(endereco, ManipuladorAnalise)
+        if intervalo_recarga:
+            threading.Thread(target=self._vigiar_fonte, daemon=True).start()
+
+    def _vigiar_fonte(self):
+        while not self._parar.wait(self.intervalo_recarga):
+            atual = self.estado
+            try:
+                if assinatura_fonte(self.fonte) == atual.assinatura:
+                    continue
+                novo = Estado(self.fonte, versao=atual.versao + 1)
+            except Exception as erro:  # extrato sendo gravado: tenta de novo no próximo ciclo
+                print(f"✗ Recarga adiada: {erro}")
+                continue
+            # Troca atômica: requisições em andamento terminam com o estado antigo
+            self.estado = novo
+            self.cache.limpar()
+            print(f"✓ Dados recarregados (versão {novo.versao}, {len(novo.df)} registros)")
+
+    def server_close(self):
+        self._parar.set()
+        super().server_close()
+
+
+class ManipuladorAnalise(BaseHTTPRequestHandler):
+    rotas = {'/consulta': responder_consulta, '/prever': responder_previsao}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        estado = self.server.estado
+
+        if url.path == '/saude':
+            cache = self.server.cache
+            return self._enviar(200, {'versao': estado.versao, 'registros': len(estado.df),
+                                      'cache': {'itens': len(cache), 'acertos': cache.acertos,
+                                                'falhas': cache.falhas}})
+        if url.path not in self.rotas:
+            return self._enviar(404, {'erro': f"Rota desconhecida: {url.path}"})
+
+        parametros = parse_qs(url.query)
+        chave = (estado.versao, url.path,
+                 tuple(sorted((k, tuple(v)) for k, v in parametros.items())))
+        resposta = self.server.cache.obter(chave)
+        if resposta is None:
+            try:
+                resposta = self.rotas[url.path](estado, parametros)
+            except ErroConsulta as erro:
+                return self._enviar(400, {'erro': str(erro)})
+            except Exception as erro:
+                # Falha inesperada: o cliente recebe 500 em vez de uma conexão derrubada
+                traceback.print_exc()
+                return self._enviar(500, {'erro': f"Erro interno: {type(erro).__name__}: {erro}"})
+            resposta['versao'] = estado.versao
+            self.server.cache.guardar(chave, resposta)
+        self._enviar(200, resposta)
+
+    def _enviar(self, status, corpo):
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Servidor de análise de vendas em memória')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--fonte', default=None, help='arquivo, glob ou manifesto de extratos')
+    parser.add_argument('--cache', type=int, default=1024, help='capacidade do cache LRU')
+    parser.add_argument('--intervalo-recarga', type=float, default=5.0,
+                        help='segundos entre verificações da fonte (0 desativa)')
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    servidor = ServidorAnalise((args.host, args.porta), args.fonte, args.cache,
+                               args.intervalo_recarga)
+    print("="*80)
+    print("SERVIDOR DE ANÁLISE DE VENDAS")
+    print("="*80)
+    print(f"Registros em memória: {len(servidor.estado.df)} "
+          f"(carga em {time.perf_counter() - inicio:.2f}s)")
+    print(f"Ouvindo em http://{args.host}:{args.porta}  (Ctrl+C para encerrar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+================================================================================
+TESTES DE SIGNIFICÂNCIA EM LOTE PARA AS COMPARAÇÕES ENTRE GRUPOS
+================================================================================
+
+Para cada par (dimensão, medida) roda:
+1. ANOVA de um fator (F)            - sobre médias e variâncias por grupo
+2. Kruskal-Wallis (H)               - sobre somas de postos por grupo
+3. Comparações par a par            - Welch (t) e Dunn (z)
+
+Tudo sai de um único conjunto de estatísticas suficientes por grupo
+(n, soma, soma dos quadrados e soma dos postos), calculado uma vez. As
+estatísticas de todos os testes são montadas em vetores e os p-valores saem
+de uma chamada vetorizada por distribuição, com correção para comparações
+múltiplas (Holm, Bonferroni ou Benjamini-Hochberg) dentro de cada família.
+================================================================================
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from consulta_lazy import vendas
+
+DIMENSOES = ('canal_venda', 'regiao', 'categoria_produto', 'campanha')
+MEDIDAS = ('lucro', 'margem_lucro', 'valor_total', 'quantidade',
+           'preco_unitario', 'satisfacao_cliente')
+
+
+# ============================================================================
+# 1. ESTATÍSTICAS SUFICIENTES
+# ============================================================================
+
+def estatisticas_grupos(df, dimensoes=DIMENSOES, medidas=MEDIDAS):
+    """Calcula n, soma, soma dos quadrados e soma dos postos por grupo, uma vez."""
+    M = df[list(medidas)].to_numpy(dtype=float)
+    postos = stats.rankdata(M, axis=0)
+
+    # Fator de correção de empates do Kruskal-Wallis, por medida
+    N = len(M)
+    empates = np.empty(len(medidas))
+    for j in range(len(medidas)):
+        _, t = np.unique(M[:, j], return_counts=True)
+        empates[j] = (t ** 3 - t).sum()
+    correcao_empates = 1 - empates / (N ** 3 - N)
+
+    grupos = {}
+    for dimensao in dimensoes:
+        codigos, niveis = pd.factorize(df[dimensao], sort=True)
+        k = len(niveis)
+        n = np.bincount(codigos, minlength=k).astype(float)
+        soma = np.column_stack([np.bincount(codigos, weights=M[:, j], minlength=k)
+                                for j in range(len(medidas))])
+        soma_quad = np.column_stack([np.bincount(codigos, weights=M[:, j] ** 2, minlength=k)
+                                     for j in range(len(medidas))])
+        soma_postos = np.column_stack([np.bincount(codigos, weights=postos[:, j], minlength=k)
+                                       for j in range(len(medidas))])
+        grupos[dimensao] = {
+            'niveis': list(niveis), 'n': n, 'soma': soma,
+            'soma_quad': soma_quad, 'soma_postos': soma_postos,
+        }
+    return {'N': N, 'medidas': list(medidas), 'correcao_empates': correcao_empates,
+            'grupos': grupos}
+
+
+# ============================================================================
+# 2. CORREÇÃO PARA COMPARAÇÕES MÚLTIPLAS
+# ============================================================================
+
+def ajustar_p_valores(p, familias, metodo='holm'):
+    """Ajusta p-valores dentro de cada família (vetorizado por ordenação)."""
+    p = np.asarray(p, dtype=float)
+    familias = pd.factorize(pd.Series(familias))[0]
+    ordem = np.lexsort((p, familias))
+    p_ord, fam_ord = p[ordem], familias[ordem]
+
+    tamanho = np.bincount(fam_ord)[fam_ord]
+    inicio_familia = np.r_[0, np.flatnonzero(np.diff(fam_ord)) + 1]
+    posicao = np.arange(len(p)) - np.repeat(inicio_familia, np.diff(np.r_[inicio_familia, len(p)]))
+
+    if metodo == 'bonferroni':
+        ajustado = p_ord * tamanho
+    elif metodo == 'holm':
+        ajustado = pd.Series((tamanho - posicao) * p_ord).groupby(fam_ord).cummax().to_numpy()
+    elif metodo == 'bh':
+        bruto = pd.Series(p_ord * tamanho / (posicao + 1))
+        ajustado = bruto[::-1].groupby(fam_ord[::-1]).cummin()[::-1].to_numpy()
+    else:
+        raise ValueError(f"Método de correção desconhecido: {metodo!r} (use holm, bonferroni ou bh)")
+
+    resultado = np.empty_like(p)
+    resultado[ordem] = np.minimum(ajustado, 1.0)
+    return resultado
+
+
+# ============================================================================
+# 3. TESTES EM LOTE
+# ============================================================================
+
+def testes_globais(estatisticas):
+    """ANOVA e Kruskal-Wallis para todos os pares (dimensão, medida)."""
+    N = estatisticas['N']
+    medidas = estatisticas['medidas']
+    linhas, F, gl1, gl2, H, gl_h = [], [], [], [], [], []
+
+    for dimensao, g in estatisticas['grupos'].items():
+        n = g['n'][:, None]
+        k = len(g['niveis'])
+        media = g['soma'] / n
+        media_geral = g['soma'].sum(axis=0) / N
+        sq_entre = (n * (media - media_geral) ** 2).sum(axis=0)
+        sq_dentro = (g['soma_quad'] - g['soma'] ** 2 / n).sum(axis=0)
+        # Dimensão fixada pelo recorte (um só nível): F indefinido, fica NaN
+        with np.errstate(divide='ignore', invalid='ignore'):
+            F.append((sq_entre / (k - 1)) / (sq_dentro / (N - k)))
+        gl1.append(np.full(len(medidas), k - 1))
+        gl2.append(np.full(len(medidas), N - k))
+
+        h = (12 / (N * (N + 1)) * (g['soma_postos'] ** 2 / n).sum(axis=0)
+             - 3 * (N + 1)) / estatisticas['correcao_empates']
+        H.append(h)
+        gl_h.append(np.full(len(medidas), k - 1))
+        linhas.extend((dimensao, medida) for medida in medidas)
+
+    F, gl1, gl2 = np.concatenate(F), np.concatenate(gl1), np.concatenate(gl2)
+    H, gl_h = np.concatenate(H), np.concatenate(gl_h)
+    resultado = pd.DataFrame(linhas, columns=['dimensao', 'medida'])
+    resultado['F'] = F
+    resultado['p_anova'] = stats.f.sf(F, gl1, gl2)
+    resultado['H'] = H
+    resultado['p_kruskal'] = stats.chi2.sf(H, gl_h)
+    return resultado
+
+
+def testes_pareados(estatisticas, correcao='holm'):
+    """Welch (t) e Dunn (z) para todos os pares de níveis de cada dimensão."""
+    N = estatisticas['N']
+    medidas = estatisticas['medidas']
+    m = len(medidas)
+    blocos = []
+
+    for dimensao, g in estatisticas['grupos'].items():
+        a, b = np.triu_indices(len(g['niveis']), k=1)
+        n = g['n'][:, None]
+        media = g['soma'] / n
+        var = (g['soma_quad'] - g['soma'] ** 2 / n) / np.maximum(n - 1, 1)
+        posto_medio = g['soma_postos'] / n
+        blocos.append({
+            'dimensao': np.repeat(dimensao, len(a) * m),
+            'grupo_a': np.repeat(np.array(g['niveis'], dtype=object)[a], m),
+            'grupo_b': np.repeat(np.array(g['niveis'], dtype=object)[b], m),
+            'medida': np.tile(medidas, len(a)),
+            'n_a': np.repeat(g['n'][a], m), 'n_b': np.repeat(g['n'][b], m),
+            'media_a': media[a].ravel(), 'media_b': media[b].ravel(),
+            'var_a': var[a].ravel(), 'var_b': var[b].ravel(),
+            'posto_a': posto_medio[a].ravel(), 'posto_b': posto_medio[b].ravel(),
+            'correcao_empates': np.tile(estatisticas['correcao_empates'], len(a)),
+        })
+
+    c = {chave: np.concatenate([bloco[chave] for bloco in blocos]) for chave in blocos[0]}
+
+    # Welch
+    ep_a, ep_b = c['var_a'] / c['n_a'], c['var_b'] / c['n_b']
+    t = (c['media_a'] - c['media_b']) / np.sqrt(ep_a + ep_b)
+    gl = (ep_a + ep_b) ** 2 / (ep_a ** 2 / (c['n_a'] - 1) + ep_b ** 2 / (c['n_b'] - 1))
+    p_welch = 2 * stats.t.sf(np.abs(t), gl)
+
+    # Dunn
+    z = (c['posto_a'] - c['posto_b']) / np.sqrt(
+        N * (N + 1) / 12 * c['correcao_empates'] * (1 / c['n_a'] + 1 / c['n_b']))
+    p_dunn = 2 * stats.norm.sf(np.abs(z))
+
+    resultado = pd.DataFrame({
+        'dimensao': c['dimensao'], 'medida': c['medida'],
+        'grupo_a': c['grupo_a'], 'grupo_b': c['grupo_b'],
+        'diferenca': c['media_a'] - c['media_b'],
+        't': t, 'p_welch': p_welch, 'z': z, 'p_dunn': p_dunn,
+    })
+    familias = resultado['dimensao'] + '|' + resultado['medida']
+    resultado['p_welch_ajustado'] = ajustar_p_valores(p_welch, familias, correcao)
+    resultado['p_dunn_ajustado'] = ajustar_p_valores(p_dunn, familias, correcao)
+    return resultado
+
+
+def testar_tudo(df=None, dimensoes=DIMENSOES, medidas=MEDIDAS, correcao='holm'):
+    """Atalho: estatísticas suficientes + testes globais + testes pareados."""
+    if df is None:
+        df = vendas().selecionar(*dimensoes, *medidas).coletar()
+    estatisticas = estatisticas_grupos(df, dimensoes, medidas)
+    globais = testes_globais(estatisticas)
+    globais['p_anova_ajustado'] = ajustar_p_valores(globais['p_anova'], globais['dimensao'], correcao)
+    globais['p_kruskal_ajustado'] = ajustar_p_valores(globais['p_kruskal'], globais['dimensao'], correcao)
+    return globais, testes_pareados(estatisticas, correcao)
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("TESTES DE SIGNIFICÂNCIA - DIMENSÕES × MEDIDAS")
+    print("="*80)
+
+    globais, pareados = testar_tudo()
+    print(f"\nTestes globais: {len(globais) * 2} | Testes pareados: {len(pareados) * 2}")
+    print("\n", globais.round(4).to_string(index=False))
+
+    significativos = pareados[pareados['p_welch_ajustado'] < 0.05]
+    print("\n" + "-"*80)
+    print(f"Pares significativos (Welch, Holm, p < 0.05): {len(significativos)}")
+    print("-"*80)
+    if len(significativos) > 0:
+        print(significativos[['dimensao', 'medida', 'grupo_a', 'grupo_b',
+                              'diferenca', 'p_welch_ajustado']].round(4).to_string(index=False))
@@ -0,0 +1,161 @@
+"""
+================================================================================
+VALIDAÇÃO DE INTEGRIDADE DAS TRANSAÇÕES DE VENDAS
+================================================================================
+
+Regras declarativas, escritas como expressões de coluna (consulta_lazy), que
+cada linha válida precisa satisfazer:
+
+- VALOR_INCONSISTENTE       valor_total ≈ quantidade × preco_unitario
+- CUSTO_ACIMA_DO_VALOR      custo_total <= valor_total
+- QUANTIDADE_INVALIDA       quantidade > 0
+- PRECO_INVALIDO            preco_unitario > 0
+- SATISFACAO_FORA_DA_FAIXA  1 <= satisfacao_cliente <= 10
+- CANAL_DESCONHECIDO / REGIAO_DESCONHECIDA / CATEGORIA_DESCONHECIDA /
+  CAMPANHA_DESCONHECIDA     valor fora do domínio conhecido
+
+Todas as regras são avaliadas sobre o mesmo bloco de colunas (uma passada);
+as falhas viram uma máscara de bits por linha, convertida em códigos de
+motivo só para as linhas reprovadas. Blocos grandes são validados em
+paralelo por threads. As linhas reprovadas vão para um arquivo de quarentena
+com os motivos; a contagem de ocorrências por regra acompanha o resultado.
+================================================================================
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from consulta_lazy import col
+
+CANAIS = ('App', 'E-commerce', 'Loja Física')
+REGIOES = ('Centro-Oeste', 'Nordeste', 'Norte', 'Sudeste', 'Sul')
+CATEGORIAS = ('Alimentos', 'Beleza', 'Eletrodomésticos', 'Moda', 'Tecnologia')
+CAMPANHAS = ('Nenhuma', 'Natal', 'Black Friday', 'Dia das Mães', 'Aniversário da Loja')
+
+# Tolerância de arredondamento para valor_total × (quantidade × preço)
+TOLERANCIA_ABSOLUTA = 0.05
+TOLERANCIA_RELATIVA = 0.001
+
+REGRAS = {
+    'VALOR_INCONSISTENTE': abs(col('valor_total') - col('quantidade') * col('preco_unitario'))
+                           <= TOLERANCIA_ABSOLUTA + TOLERANCIA_RELATIVA * abs(col('valor_total')),
+    'CUSTO_ACIMA_DO_VALOR': col('custo_total') <= col('valor_total'),
+    'QUANTIDADE_INVALIDA': col('quantidade') > 0,
+    'PRECO_INVALIDO': col('preco_unitario') > 0,
+    'SATISFACAO_FORA_DA_FAIXA': (col('satisfacao_cliente') >= 1) & (col('satisfacao_cliente') <= 10),
+    'CANAL_DESCONHECIDO': col('canal_venda').isin(CANAIS),
+    'REGIAO_DESCONHECIDA': col('regiao').isin(REGIOES),
+    'CATEGORIA_DESCONHECIDA': col('categoria_produto').isin(CATEGORIAS),
+    'CAMPANHA_DESCONHECIDA': col('campanha').isin(CAMPANHAS),
+}
+
+ARQUIVO_QUARENTENA = 'vendas_quarentena.csv'
+
+
+def _validar_bloco(bloco, regras):
+    colunas = set().union(*(regra.colunas() for regra in regras.values()))
+    # Colunas de texto ficam como Series: categorias conferem o domínio pelos códigos
+    dados = {c: bloco[c].to_numpy() if pd.api.types.is_numeric_dtype(bloco[c]) else bloco[c]
+             for c in colunas}
+    mascara = np.zeros(len(bloco), dtype=np.int64)
+    contagens = []
+    for bit, regra in enumerate(regras.values()):
+        # NaN em qualquer operando faz a comparação falhar: a linha é reprovada
+        reprovada = ~np.asarray(regra.avaliar(dados), dtype=bool)
+        contagens.append(int(np.count_nonzero(reprovada)))
+        mascara |= reprovada.astype(np.int64) << bit
+    return mascara, contagens
+
+
+def validar(df, regras=None, n_threads=None, tamanho_bloco=250_000):
+    """Separa linhas válidas e reprovadas; retorna (validas, quarentena, contagens)."""
+    regras = REGRAS if regras is None else regras
+    nomes = list(regras)
+
+    blocos = [df.iloc[i:i + tamanho_bloco] for i in range(0, len(df), tamanho_bloco)] or [df]
+    n_threads = min(n_threads or os.cpu_count() or 1, len(blocos))
+    if n_threads <= 1:
+        resultados = [_validar_bloco(b, regras) for b in blocos]
+    else:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            resultados = list(executor.map(lambda b: _validar_bloco(b, regras), blocos))
+    mascara = np.concatenate([m for m, _ in resultados])
+    contagens = dict(zip(nomes, np.sum([c for _, c in resultados], axis=0).tolist()))
+
+    reprovadas = mascara != 0
+    if not reprovadas.any():
+        # Caso comum: nada a separar, nenhuma cópia da tabela
+        return df, df.iloc[:0].assign(motivos=pd.Series(dtype=object)), contagens
+
+    quarentena = df[reprovadas].copy()
+    # Códigos de motivo montados uma vez por combinação distinta de falhas
+    combinacoes, inverso = np.unique(mascara[reprovadas], return_inverse=True)
+    motivos = np.array(['|'.join(n for bit, n in enumerate(nomes) if m >> bit & 1)
+                        for m in combinacoes], dtype=object)
+    quarentena['motivos'] = motivos[inverso]
+
+    validas = df[~reprovadas].reset_index(drop=True)
+    for coluna in validas.columns:
+        # Valores fora do domínio saíram com a quarentena; suas categorias também
+        if isinstance(validas[coluna].dtype, pd.CategoricalDtype):
+            validas[coluna] = validas[coluna].cat.remove_unused_categories()
+    return validas, quarentena, contagens
+
+
+def gravar_quarentena(quarentena, caminho=ARQUIVO_QUARENTENA):
+    """Grava as linhas reprovadas no formato dos extratos, com a coluna de motivos.
+
+    O arquivo reflete só a última carga: é substituído a cada execução e
+    removido quando nada foi reprovado.
+    """
+    if len(quarentena) == 0:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        return None
+    saida = quarentena.copy()
+    if 'data_venda' in saida.columns and pd.api.types.is_datetime64_any_dtype(saida['data_venda']):
+        saida['data_venda'] = saida['data_venda'].dt.strftime('%Y-%m-%d')
+    # Substituição atômica: leitores nunca veem um arquivo pela metade
+    temporario = caminho + '.tmp'
+    saida.to_csv(temporario, sep=';', decimal=',', index=False)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def resumo_validacao(contagens, n_linhas, n_reprovadas):
+    linhas = [f"Linhas verificadas: {n_linhas}",
+              f"Linhas em quarentena: {n_reprovadas} ({n_reprovadas / max(n_linhas, 1):.2%})"]
+    for regra, total in contagens.items():
+        if total:
+            linhas.append(f"  {regra:28s}: {total}")
+    return '\n'.join(linhas)
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    from ingestao import carregar_vendas
+
+    fonte = sys.argv[1] if len(sys.argv) > 1 else None
+
+    print("="*80)
+    print("VALIDAÇÃO DE INTEGRIDADE DAS VENDAS")
+    print("="*80)
+
+    inicio = time.perf_counter()
+    df = carregar_vendas(fonte)
+    tempo_ingestao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    validas, quarentena, contagens = validar(df)
+    tempo_validacao = time.perf_counter() - inicio
+
+    print(resumo_validacao(contagens, len(df), len(quarentena)))
+    print(f"\nIngestão: {tempo_ingestao:.3f}s | Validação: {tempo_validacao:.3f}s "
+          f"({tempo_validacao / tempo_ingestao:.1%} da ingestão)")
+    if gravar_quarentena(quarentena):
+        print(f"✓ Linhas reprovadas salvas em '{ARQUIVO_QUARENTENA}'")